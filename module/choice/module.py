@@ -48,6 +48,11 @@ def make(i):
               (custom_explore)   - enforce exploration params from command line
 
               (all)              - if 'yes', select all
+
+              (constraint_attempts) - max number of attempts to select vector which satisfies constraints
+                                      (requires, conflicts, only_with in choices_desc - see "check_constraints"); 100 by default;
+                                      error is returned if all attempts fail
+              (skip_constraints)    - if 'yes', do not check constraints (internal, used for above attempts)
             }
 
     Output: {
@@ -65,6 +70,7 @@ def make(i):
 
     """
 
+    import copy
     from random import Random
 
     o=i.get('out','')
@@ -151,7 +157,23 @@ def make(i):
 
            dvsame=''
            xupdate=False
-           for c in range(len(cc)-1,-1,-1):
+
+           nc=len(cc)
+           if tp=='indexed-loop':
+              # Exhaustive exploration via mixed-radix index of all vectors of this group
+              # (index is kept in choices_selection even if type is enforced from command line)
+              st=t
+              if cx<len(csel): st=csel[cx]
+
+              r=make_by_index({'choices_desc':cdesc, 'choices':cc, 'selection':t, 'state':st, 'custom_explore':cexp})
+              if r['return']>0: return r
+
+              ccur[cx]=r['choices_current']
+              if r['wrapped']: xupdate=True
+
+              nc=0 # vector is already selected
+
+           for c in range(nc-1,-1,-1):
                cn=cc[c]
 
                qt=cdesc.get(cn,{})
@@ -301,6 +323,7 @@ def make(i):
                   # See our work on Collective Mind (2014/2015)
                   #
                   # NOTE: moved to external customized autotuner plugins (see autotune pipeline --custom_autotuner)
+                  #       (see script:autotuner.adaptive)
 #                  elif tp=='machine-learning-based' or tp=='model-based' or tp=='adaptive' or tp=='plugin-based' or tp=='customized': 
 
                   else:
@@ -314,6 +337,41 @@ def make(i):
 
         t['cur_iter']=ci
 
+    # Select again if vector of choices does not satisfy constraints between choices
+    # (to avoid wasting autotuning iterations on failed compilations)
+    if not update and al!='yes' and i.get('skip_constraints','')!='yes':
+       na=i.get('constraint_attempts','')
+       if na=='': na=100
+       na=int(na)
+
+       attempt=1
+       while True:
+          r=check_constraints({'choices_desc':cdesc, 'choices_order':corder, 'choices_current':ccur, 'pipeline':pipeline})
+          if r['return']>0: return r
+
+          if r['valid']=='yes':
+             break
+
+          if attempt>=na:
+             return {'return':1, 'error':'could not select vector of choices satisfying constraints after '+str(na)+' attempt(s) ('+r['reason']+')'}
+
+          ii=copy.copy(i)
+          ii['choices_current']=ccur
+          ii['random_module']=my_random
+          ii['pipeline']={}
+          ii['out']=''
+          ii['skip_constraints']='yes'
+
+          r=make(ii)
+          if r['return']>0: return r
+
+          ccur=r['choices_current']
+          attempt+=1
+
+          if r['finish']:
+             update=True
+             break
+
     corder1=[]
     ccur1={}
 
@@ -366,6 +424,475 @@ def make(i):
 
     return {'return':0, 'choices_current':ccur, 'choices_order':corder1, 'choices':ccur1, 'pipeline':pipeline, 'finish':finish}
 
+##############################################################################
+# Check constraints between choices from their descriptions
+
+def check_constraints(i):
+    """
+    Input:  {
+              choices_desc       - dict with description of choices (flat format) where each choice may have
+                                     (requires)  - list of flat keys of choices which must be selected (not empty)
+                                                   or "key=value" (must have this value) when this choice is selected
+                                     (conflicts) - list of flat keys or "key=value" which must not be selected
+                                                   together with this choice
+                                     (only_with) - dict {flat key: list of values} - this choice can be selected
+                                                   only when these keys have one of these values
+                                                   (for example, {"##compiler_flags#base_opt":["-O2","-O3"]})
+              choices_order      - list of list of flat choice keys
+              choices_current    - current vector of choices
+              (pipeline)         - take values of keys which are not in choices from this pipeline
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              valid        - 'yes' if all constraints are satisfied
+              (reason)     - first violated constraint
+            }
+
+    """
+
+    cdesc=i.get('choices_desc',{})
+    corder=i.get('choices_order',[])
+    ccur=i.get('choices_current',[])
+    pipeline=i.get('pipeline',{})
+
+    fc={}
+    for q in range(0, len(corder)):
+        for q1 in range(0, len(corder[q])):
+            if q<len(ccur) and q1<len(ccur[q]):
+               fc[corder[q][q1]]=ccur[q][q1]
+
+    def value(k):
+        if k in fc: return fc[k]
+        r=ck.get_by_flat_key({'dict':pipeline, 'key':k})
+        if r['return']>0: return ''
+        v=r.get('value',None)
+        if v==None: v=''
+        return v
+
+    def holds(c):
+        j=c.find('=')
+        if j<0:
+           return value(c)!=''
+        return str(value(c[:j]))==c[j+1:]
+
+    for k in fc:
+        if fc[k]=='' or fc[k]==None: continue
+
+        d=cdesc.get(k,{})
+
+        for c in d.get('requires',[]):
+            if not holds(c):
+               return {'return':0, 'valid':'no', 'reason':k+' requires '+c}
+
+        for c in d.get('conflicts',[]):
+            if holds(c):
+               return {'return':0, 'valid':'no', 'reason':k+' conflicts with '+c}
+
+        ow=d.get('only_with',{})
+        for c in ow:
+            vv=ow[c]
+            if type(vv)!=list: vv=[vv]
+            if value(c) not in vv:
+               return {'return':0, 'valid':'no', 'reason':k+' only with '+c+' in '+str(vv)}
+
+    return {'return':0, 'valid':'yes'}
+
+##############################################################################
+# Make batch of next multi-dimensional choices (the same as multiple calls of "make")
+
+def make_batch(i):
+    """
+    Input:  {
+              The same as "make" (pipeline is not updated)
+
+              (number)           - number of vectors of choices to make (1 by default)
+            }
+
+            Convenience wrapper: vectors are exactly the same as from sequential calls of "make"
+            with the same random module. For random exploration without constraints, descriptions
+            of choices are prepared only once for the whole batch; otherwise "make" is called per vector.
+
+    Output: {
+              return                - return code =  0, if successful
+                                                  >  0, if error
+              (error)               - error text if return > 0
+
+              choices_list          - list of dictionaries of flat choices and values (one per vector)
+              choices_current_list  - list of vectors of choices (as choices_current from "make")
+              choices_order         - list of flat choices (the same for all vectors)
+              choices_current       - last vector of choices (to continue exploration)
+              finish                - if True, iterations are over (vectors made before are returned)
+            }
+
+    """
+
+    import copy
+    from random import Random
+
+    n=i.get('number','')
+    if n=='': n=1
+    n=int(n)
+
+    my_random=i.get('random_module',None)
+    if my_random==None: my_random=Random()
+
+    cdesc=i['choices_desc']
+    corder=i['choices_order']
+    csel=i['choices_selection']
+    ccur=i['choices_current']
+    cexp=i.get('custom_explore',{})
+
+    cd=len(corder)
+
+    corder1=[]
+    for qq in corder:
+        corder1+=qq
+
+    # Random selection of all groups does not depend on previous vectors (except choices of groups which
+    # are not updated), so descriptions can be prepared once; otherwise call "make" for each vector
+    groups=[]
+    fast=(i.get('all','')!='yes')
+    if fast:
+       for cx in range(0, cd):
+           g=prepare_batch_group(cdesc, corder[cx], csel[cx], cexp)
+           if g['type'] not in ['random', 'random-with-next', 'parallel-random'] or g['iterations']!='':
+              fast=False
+              break
+           groups.append(g)
+
+       # Vectors which do not satisfy constraints are selected again by "make"
+       for k in corder1:
+           d=cdesc.get(k,{})
+           if len(d.get('requires',[]))>0 or len(d.get('conflicts',[]))>0 or len(d.get('only_with',{}))>0:
+              fast=False
+              break
+
+    cl=[]
+    ccl=[]
+    finish=False
+
+    if not fast:
+       for q in range(0, n):
+           ii=copy.copy(i)
+           ii['pipeline']={}
+           ii['out']=''
+           ii['random_module']=my_random
+
+           r=make(ii)
+           if r['return']>0: return r
+
+           if r['finish']:
+              finish=True
+              break
+
+           ccur=r['choices_current']
+
+           cl.append(r['choices'])
+           ccl.append([list(x) for x in ccur])
+
+    else:
+       # Init current choices
+       if len(ccur)==0:
+          for c in range(0, cd):
+              ccur.append(['']*len(corder[c]))
+
+       rr=my_random.randrange
+
+       for q in range(0, n):
+           nupdate=False
+           for cx in range(cd-1,-1,-1):
+               g=groups[cx]
+
+               t=g['selection']
+               if t==None: t={} # exploration from command line does not keep iterations
+
+               ci=t.get('cur_iter','')
+               if ci=='': ci=-1
+
+               if cx==(cd-1) or nupdate or ci==-1:
+                  nupdate=False
+                  ci+=1
+
+                  dc=ccur[cx]
+                  top=g['omit_probability']
+                  dvsame=''
+
+                  for c in range(len(dc)-1,-1,-1):
+                      d=g['dims'][c]
+                      yhc=d['choice']
+
+                      dv=d['first']
+
+                      if g['type']=='parallel-random':
+                         # First selection is not random (as in "make")
+                         if ci==0: dvsame=d['first']
+                         elif dvsame=='':
+                            if len(yhc)>0:
+                               dvsame=yhc[rr(0, len(yhc))]
+                            elif d['range']:
+                               y=0
+                               if d['rx']>=1: y=rr(0, int(d['rx']))
+                               dvsame=d['r1']+(y*d['rs'])
+                         dv=dvsame
+                      else:
+                         omit=False
+                         if d['can_omit']=='yes':
+                            x=rr(0, 1000)
+                            if x<(1000.0*top):
+                               omit=True
+
+                         if omit:
+                            dv=''
+                         elif len(yhc)>0:
+                            dv=yhc[rr(0, len(yhc))]
+                         elif d['range']:
+                            y=0
+                            if d['rx']>=1: y=rr(0, int(d['rx']))
+                            dv=d['r1']+(y*d['rs'])
+
+                         if g['type']=='random-with-next':
+                            nupdate=True
+
+                      if d['prefix']!='' and dv!='': dv=d['prefix']+str(dv)
+                      dc[c]=dv
+
+               t['cur_iter']=ci
+
+           ccl.append([list(x) for x in ccur])
+
+       for vq in ccl:
+           ccur1={}
+           for q in range(0, cd):
+               qq=corder[q]
+               for q1 in range(0, len(qq)):
+                   ccur1[qq[q1]]=vq[q][q1]
+           cl.append(ccur1)
+
+    return {'return':0, 'choices_list':cl, 'choices_current_list':ccl, 'choices_order':corder1,
+            'choices_current':ccur, 'finish':finish}
+
+##############################################################################
+# select vector of group of choices by mixed-radix index (exhaustive exploration with random access and sharding)
+
+def make_by_index(i):
+    """
+    Input:  {
+              choices_desc       - dict with description of choices (flat format)
+              choices            - list of flat choice keys of this group
+              selection          - selection of this group (from choices_selection):
+                                     (start_index) - start from this index (jump to this vector)
+                                     (shard)       - number of this shard (0..shards-1)
+                                     (shards)      - split all vectors into this number of disjoint shards
+                                                     (shard explores indexes shard, shard+shards, shard+2*shards ...)
+              state              - dict to keep current index (cur_index)
+              (custom_explore)   - enforce start_index, shard and shards from command line
+            }
+
+    Output: {
+              return             - return code =  0, if successful
+                                               >  0, if error
+              (error)            - error text if return > 0
+
+              choices_current    - vector of choices of this group
+              index              - index of this vector
+              total              - number of all vectors of this group
+              wrapped            - True, if all vectors of this shard were explored
+                                   (and exploration restarted from first index)
+            }
+
+    """
+
+    cexp=i.get('custom_explore',{})
+    t=i.get('selection',{})
+    st=i['state']
+
+    g=prepare_batch_group(i['choices_desc'], i['choices'], t, cexp)
+
+    dims=get_index_dims(g['dims'])
+
+    total=1
+    for d in dims:
+        total*=len(d)
+
+    p={}
+    for k in ['start_index', 'shard', 'shards']:
+        x=t.get(k,'')
+        if cexp.get(k,'')!='': x=cexp[k]
+        p[k]=x
+
+    ns=p['shards']
+    if ns=='': ns=1
+    ns=int(ns)
+
+    sh=p['shard']
+    if sh=='': sh=0
+    sh=int(sh)
+
+    if ns<1 or sh<0 or sh>=ns:
+       return {'return':1, 'error':'shard ('+str(sh)+') should be in range 0..shards-1 (shards='+str(ns)+')'}
+
+    # First index of this shard (not less than start_index)
+    k0=p['start_index']
+    if k0=='': k0=0
+    k0=int(k0)
+    k0+=(sh-k0)%ns
+
+    if k0>=total:
+       return {'return':1, 'error':'start index '+str(k0)+' is out of space of '+str(total)+' vectors'}
+
+    wrapped=False
+
+    k=st.get('cur_index','')
+    if k=='':
+       k=k0
+    else:
+       k+=ns
+       if k>=total:
+          k=k0
+          wrapped=True
+
+    st['cur_index']=k
+
+    return {'return':0, 'choices_current':get_vector_by_index(dims, k), 'index':k, 'total':total, 'wrapped':wrapped}
+
+##############################################################################
+# get all values of dimensions of a group of choices (the same as iterated by loops)
+
+def get_index_dims(dims):
+    ld=[]
+    for d in dims:
+        v=[]
+
+        if d['range']:
+           x=d['r1']
+           while x<=d['r2']:
+              v.append(x)
+              if d['rs']<=0: break
+              x+=d['rs']
+        else:
+           v=list(d['choice'])
+
+        if len(v)==0:
+           v=[d['first']]
+
+        if d['prefix']!='':
+           v=[d['prefix']+str(x) if x!='' else x for x in v]
+
+        if d['can_omit']=='yes' and '' not in v:
+           v.insert(0,'')
+
+        ld.append(v)
+
+    return ld
+
+##############################################################################
+# decode mixed-radix index into vector of choices (the last dimension changes first as in loops)
+
+def get_vector_by_index(dims, k):
+    v=['']*len(dims)
+
+    for c in range(len(dims)-1,-1,-1):
+        n=len(dims[c])
+        v[c]=dims[c][k % n]
+        k//=n
+
+    return v
+
+##############################################################################
+# prepare description of a group of choices once for batch selection (as in "make")
+
+def prepare_batch_group(cdesc, cc, t, cexp):
+    tp=t.get('type','')
+    g={'selection':t, 'iterations':t.get('iterations','')}
+    if cexp.get('type','')!='':
+       tp=cexp['type']
+       t={}
+       g['selection']=None
+       g['iterations']=''
+
+    if tp=='': tp='random'
+    g['type']=tp
+
+    top=t.get('omit_probability','')
+    if cexp.get('omit_probability','')!='': top=cexp['omit_probability']
+    if top=='': top=0.0
+    else: top=float(top)
+    g['omit_probability']=top
+
+    zchoice=t.get('choice',[])
+    zprefix=t.get('explore_prefix','')
+    zdefault=t.get('default','')
+    zcanomit=t.get('can_omit','')
+
+    zestart=t.get('start','')
+    if cexp.get('start','')!='': zestart=cexp['start']
+    zestop=t.get('stop','')
+    if cexp.get('stop','')!='': zestop=cexp['stop']
+    zestep=t.get('step','')
+    if cexp.get('step','')!='': zestep=cexp['step']
+
+    ytp=t.get('subtype','')
+
+    dims=[]
+    for cn in cc:
+        qt=cdesc.get(cn,{})
+
+        d={}
+
+        if zcanomit!='': d['can_omit']=zcanomit
+        else: d['can_omit']=qt.get('can_omit','')
+
+        if len(zchoice)>0: yhc=zchoice
+        else:
+           yhc=qt.get('choice',[])
+           if len(yhc)==0:
+              yhc=qt.get('choices',[])
+        d['choice']=yhc
+
+        if zprefix!='': d['prefix']=zprefix
+        else: d['prefix']=qt.get('explore_prefix','')
+
+        if zdefault!='': d['first']=zdefault
+        else: d['first']=qt.get('default','')
+
+        if zestart!='': yestart=zestart
+        else: yestart=qt.get('explore_start','')
+        if zestop!='': yestop=zestop
+        else: yestop=qt.get('explore_stop','')
+        if zestep!='': yestep=zestep
+        else: yestep=qt.get('explore_step','')
+
+        d['range']=False
+        if yestart!='':
+           if ytp=='float':
+              r1=float(yestart)
+              r2=float(yestop)
+              rs=float(yestep)
+           else:
+              r1=int(yestart)
+              r2=int(yestop)
+              rs=int(yestep)
+
+           d['range']=True
+           d['r1']=r1
+           d['rs']=rs
+           d['r2']=r2
+           d['rx']=(r2-r1+1)/rs
+
+           d['first']=r1
+        elif len(yhc)>0:
+           d['first']=yhc[0]
+
+        dims.append(d)
+
+    g['dims']=dims
+
+    return g
+
 ##############################################################################
 # select list
 
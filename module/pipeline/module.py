@@ -15,6 +15,8 @@ ck=None # Will be updated by CK (initialized CK kernel)
 sep='***************************************************************************************'
 sep1='---------------------------------------------------------------------------------------'
 
+choices_index={} # expanded choices orders (see "expand_choices_order")
+
 ##############################################################################
 # Initialize module
 
@@ -97,13 +99,42 @@ def autotune(i):
                (start_from_iteration) - skip all iterations before this number
                (repetitions)          - statistical repetitions (default=4)
 
+               (repetitions_ci_key)         - if !='', adaptive statistical repetitions: repeat until relative confidence interval
+                                              of this characteristic (such as ##characteristics#run#execution_time) is narrow enough
+               (repetitions_ci_target)      - target relative half-width of confidence interval (default=0.05, i.e. +-5%)
+               (repetitions_ci_confidence)  - confidence level (0.90, 0.95 or 0.99; default=0.95)
+               (repetitions_min)            - min number of repetitions in adaptive mode (default=2)
+               (repetitions_max)            - max number of repetitions in adaptive mode (default=repetitions)
+
+               (race_key)                   - if !='', racing mode: stop statistical repetitions of a candidate when this characteristic
+                                              (such as ##characteristics#run#execution_time) is worse than the one of the best candidate so far
+                                              by more than a margin with statistical confidence (candidate is marked as dominated)
+               (race_margin)                - relative margin (default=0.05)
+               (race_after)                 - check after this number of repetitions (default=2, at least 2)
+               (race_reverse)               - if 'yes', larger values are better (by default smaller, such as execution time)
+               (race_confidence)            - confidence level for intervals (0.90, 0.95 or 0.99; default=0.95)
+
+               (full_pipeline_copy)   - if 'yes', fully copy pipeline at each iteration and repetition
+                                        (otherwise large parts such as choices_desc
+                                         are copied only partially, see "copy_pipeline")
+
                (seed)                 - if !='', use as random seed (to reproduce experiments)
 
+               (skip_duplicates)      - if 'yes', do not evaluate the same vector of choices twice in one session
+                                        (choices are selected again until a new vector is found)
+               (duplicate_retries)    - stop autotuning if no new vector was found after this number of attempts (default=100)
+               (duplicate_order_matters) - if 'yes', vectors with the same choices in different order are different
+                                           (useful for pass reordering); otherwise order is ignored
+
+               (choices_index)        - if 'yes', keep expanded wildcards of choices_order (with tags) in a persistent index
+                                        (reused across sessions while choices and tags do not change)
+               (choices_index_file)   - JSON file with above index (~/.ck-choices-index.json by default)
+
                Enforce exploration:
                (start)
                (stop)
                (step)
-               (explore_type)         = random, parallel-random, loop, parallel-loop 
+               (explore_type)         = random, parallel-random, loop, parallel-loop, indexed-loop
                                         Note: machine learning-based or customized autotuners 
                                         are now moved to external plugins 
                                         (see "custom_autotuner" vars below)
@@ -113,6 +144,11 @@ def autotune(i):
                (parallel-random)
                (loop)
                (parallel-loop)
+               (indexed-loop)         - exhaustive exploration via mixed-radix index of all vectors of choices
+
+               (start_index)          - indexed-loop: start directly from vector with this index
+               (shard)                - indexed-loop: explore only indexes shard, shard+shards, shard+2*shards, ...
+               (shards)                 to split exploration into disjoint parts for multiple hosts or workers
 
                (process_multi_keys)               - list of keys (starts with) to perform stat analysis on flat array,
                                                        by default ['##characteristics#*', '##features#*' '##choices#*'],
@@ -199,12 +235,17 @@ def autotune(i):
                (prune)                            - prune solution (find minimal choices that give the same result)
                (reduce)                           - the same as above
                (reduce_bug)                       - reduce choices to localize bug (pipeline fail)
+                                                    (see also "reduce_bug" action to reduce failed cases in parallel)
                (prune_ignore_choices)             - list of choices to ignore (such as base flag, for example)
                (prune_md5)                        - if 'yes', check if MD5 doesn't change
                (prune_invert)                     - if 'yes', prune all (switch off even unused - useful for collaborative machine learning)
                (prune_invert_add_iters)           - if 'yes', add extra needed iterations
                (prune_invert_do_not_remove_key)   - if 'yes', keep both on and off keys (to know exact solution)
                (prune_result_conditions)          - list of extra conditions to accept result (variation, performance/energy/code size constraints, etc)
+               (prune_method)                     - if 'ddmin', use delta debugging: try to remove all choices first, then
+                                                    keep only one of n subsets or remove one of them (complement),
+                                                    increasing n only if result changes (much fewer compilations
+                                                    than removing choices one by one when only a few of them matter)
 
                (print_keys_after_each_iteration)  - print values of keys from flat dict after each iteration (to monitor characteristics)
 
@@ -213,10 +254,60 @@ def autotune(i):
 
                (collect_all)                      - collect all experiments and record to 
 
+               (stream_results_file)              - if !='', append one compact JSON line per iteration to this file
+                                                    (iteration, selected choices, features changed with respect to
+                                                     the first iteration, characteristics of all repetitions, pipeline state)
+                                                    while autotuning is running (gzip-compressed if file name ends with .gz);
+                                                    unlike collect_all, results are not kept in memory
+
+               (record_write_behind)              - if 'yes', record experiments in a forked writer process
+                                                    (the measurement loop does not wait for recording and stat analysis;
+                                                     POSIX only; not used with frontier_keys, prune, result_conditions,
+                                                     solutions, custom_autotuner or print_keys_after_each_iteration
+                                                     which need results immediately)
+               (record_batch_size)                - max number of experiments waiting for the writer (default=8)
+
                (custom_autotuner)                 - dictionary to customize autotuner (exploration, DSE, machine learning based tuning, etc)
+                                                    {"module_uoa", "data_uoa", "script"} - plugin with function "make"
+                                                    (see bundled script:autotuner.nsga2 for multi-objective search over frontier_keys
+                                                     script:autotuner.surrogate for model-based search
+                                                     and script:autotuner.adaptive for probabilistic sampling learned from results;
+                                                     helpers from script:autotuner.common are passed to "make" as "autotuner_common")
                (custom_autotuner_vars)            - extra vars to customize autotuner (for example, set default vs. random)
 
                (preserve_deps_after_first_run)    - if 'yes', save deps after first run (useful for replay)
+
+               (result_cache)                     - if 'yes', reuse characteristics measured earlier for binaries with the same MD5
+                                                    instead of running them again (passed to pipeline, cache is kept in state)
+               (result_cache_file)                - if !='', also load/save above cache from/to this JSON file
+
+               (checkpoint_file)                  - if !='', periodically save full state of the autotuning session to this JSON file
+                                                    (iteration, random generator state, current choices and selection state,
+                                                     points, pruning state and pipeline state)
+               (checkpoint_every)                 - save checkpoint every N iterations (default=1)
+               (resume_from)                      - continue autotuning session exactly from the checkpoint in this JSON file
+                                                    (other inputs such as pipeline and choices should be the same as in the original session)
+
+               (parallel_workers)                 - if >1, select this number of candidates (choices) at once and
+                                                    evaluate them (compile, run, statistical repetitions) in parallel worker processes;
+                                                    recording, stat analysis and frontier filtering are still performed
+                                                    in this process in the order of candidates (deterministic)
+               (parallel_affinity)                - list of processor affinities (see "affinity" in program pipeline),
+                                                    one per worker (for example ["0-3","4-7"])
+
+               (overlap_compile_run)              - if 'yes', compile next candidates in background processes (in separate tmp dirs)
+                                                    while running already compiled ones (not used with parallel workers,
+                                                    pruning, solutions, customized autotuner or checkpoints)
+               (overlap_queue_depth)              - number of candidates compiled in advance (default=2)
+               (build_affinity)                   - processor affinity for compilation (for example "0-3")
+               (run_affinity)                     - processor affinity for runs (for example "4-7") to isolate measurements
+                                                    from compilation noise
+
+               (timers)                           - if 'yes', measure time of all autotuning steps (choice selection, sleeps,
+                                                    statistical repetitions with nested sections of program pipeline,
+                                                    recording, stat analysis, frontier filtering, checkpoints)
+               (trace_file)                       - if !='', save above timers to this file in Chrome trace event format
+                                                    (open in chrome://tracing or Perfetto to see timeline)
             }
 
     Output: {
@@ -237,10 +328,80 @@ def autotune(i):
               (solutions)           - updated solutions with reactions to optimizations (needed for classification of a given computing species)
 
               (all)                 - if i['collect_all']=='yes', list of results of all iterations [{experiment_desc ..},...]
+
+              (timers)              - if i['timers']=='yes': {
+                                                              events  - list of timer events (Chrome trace event format)
+                                                              summary - dict with total_time (sec.) and count per timer name
+                                                            }
             }
 
     """
 
+    import copy
+
+    ii=copy.copy(i)
+
+    # Open stream for results (appending to be able to resume sessions)
+    srf=i.get('stream_results_file','')
+    srfh=None
+    if srf!='':
+       try:
+          if srf.endswith('.gz'):
+             import gzip
+             srfh=gzip.open(srf, 'ab')
+          else:
+             srfh=open(srf, 'ab')
+       except Exception as e:
+          return {'return':1, 'error':'can\'t open file '+srf+' to stream results ('+format(e)+')'}
+
+       ii['stream_results_handle']=srfh
+
+    # Check if write-behind recording
+    wid=''
+    if i.get('record_write_behind','')=='yes':
+       r=start_write_behind({'batch':i.get('record_batch_size','')})
+       if r['return']>0:
+          if srfh!=None: srfh.close()
+          return r
+       wid=r['id']
+
+       if wid=='':
+          if i.get('out','')=='con':
+             ck.out('')
+             ck.out('WARNING: write-behind recording needs fork (POSIX) - recording synchronously')
+             ck.out('')
+       else:
+          ii['write_behind_id']=wid
+
+    try:
+       r=autotune_iterations(ii)
+    finally:
+       # Wait until writer records everything left in the queue (also on errors)
+       if wid!='':
+          rx=stop_write_behind({'id':wid, 'out':i.get('out','')})
+
+       # Close stream also on errors (gzip writes its trailer on close)
+       if srfh!=None:
+          srfh.close()
+
+    if wid!='' and r['return']==0:
+       if rx['return']>0:
+          r=rx
+       elif rx['recorded_uid']!='' and 'recorded_info' in r:
+          # Statistical analysis of the last experiment is taken from the writer
+          r['recorded_info']['last_recorded_uid']=rx['recorded_uid']
+          r['last_stat_analysis']={'return':0, 'dict_flat':rx['dict_flat']}
+
+    return r
+
+##############################################################################
+# universal pipeline autotuning (iterations)
+
+def autotune_iterations(i):
+    """
+    See "autotune" API
+    """
+
     import os
     import copy
     import fnmatch
@@ -254,6 +415,12 @@ def autotune(i):
 
     tmp_dir=i.get('tmp_dir','')
 
+    # Stream for results is opened and closed in "autotune"
+    srfh=i.get('stream_results_handle',None)
+    if srfh!=None:
+       i=copy.copy(i)
+       del(i['stream_results_handle'])
+
     ic=copy.deepcopy(i)
     ic['module_uoa']=''
     ic['action']=''
@@ -286,6 +453,7 @@ def autotune(i):
     prune_invert_add_iters=ck.get_from_dicts(ic, 'prune_invert_add_iters', '', None)
     prune_result_conditions=ck.get_from_dicts(ic, 'prune_result_conditions', [], None)
     prune_invert_do_not_remove_key=ck.get_from_dicts(ic, 'prune_invert_do_not_remove_key', [], None)
+    prune_method=ck.get_from_dicts(ic, 'prune_method', '', None)
 
     print_keys_after_each_iteration=ck.get_from_dicts(ic, 'print_keys_after_each_iteration', [], None)
     lprint_keys_after_each_iteration=-1
@@ -304,6 +472,14 @@ def autotune(i):
     if i.get('sleep','')!='':
        dsleep=float(i['sleep'])
 
+    # Check phase timers (autotuning steps and nested sections of program pipeline)
+    tmr=None
+    if ck.get_from_dicts(ic, 'timers', '', None)=='yes':
+       tmr={'events':[], 'stack':[]}
+    trace_file=ck.get_from_dicts(ic, 'trace_file', '', None)
+
+    start_timer(tmr, 'autotuning')
+
     tags=ck.get_from_dicts(ic, 'tags', [], None)
     tags=ck.convert_str_tags_to_list(tags) # if string, convert to list
     subtags=ck.get_from_dicts(ic, 'subtags', [], None)
@@ -345,6 +521,11 @@ def autotune(i):
 
     record_permanent=ck.get_from_dicts(ic, 'record_permanent', '', None)
 
+    # Check write-behind recording (started in "autotune")
+    wid=ck.get_from_dicts(ic, 'write_behind_id', '', None)
+    for q in ['record_write_behind', 'record_batch_size']:
+        if q in ic: del(ic[q])
+
     # Check if repo remote (to save in json rather than to out)
     remote='no'
     if record_repo!='':
@@ -363,11 +544,15 @@ def autotune(i):
     elif i.get('loop','')=='yes': jtype='loop'
     elif i.get('parallel-loop','')=='yes': jtype='parallel-loop'
     elif i.get('parallel-random','')=='yes': jtype='parallel-random'
+    elif i.get('indexed-loop','')=='yes': jtype='indexed-loop'
     cexp={'type':jtype, 
           'omit_probability':i.get('omit_probability',''),
           'start':i.get('start',''),
           'stop':i.get('stop',''),
-          'step':i.get('step','')}
+          'step':i.get('step',''),
+          'start_index':i.get('start_index',''),
+          'shard':i.get('shard',''),
+          'shards':i.get('shards','')}
 
     # Check data_uoa
     puoa=i.get('data_uoa','')
@@ -434,9 +619,13 @@ def autotune(i):
     call=ck.get_from_dicts(ic, 'collect_all', {}, None) # Collect all experiemnts
     ae=[]
 
+    srf=ck.get_from_dicts(ic, 'stream_results_file', '', None) # Stream compact results of all experiments to file
+    srff=None # flat features of the first iteration (streamed results include only changed features)
+
     # Check customized autotuner
     cat=ck.get_from_dicts(ic, 'custom_autotuner', {}, None) 
     cats=None # script
+    catc=None # helpers shared by autotuner plugins (script:autotuner.common)
 
     if len(cat)>0:
        cmuoa=cat.get('module_uoa','')
@@ -480,6 +669,13 @@ def autotune(i):
        else:
           return rx
 
+       # Load helpers shared by autotuner plugins once (plugins from other repositories may not need them)
+       rx=ck.access({'action':'find', 'module_uoa':'script', 'data_uoa':'autotuner.common'})
+       if rx['return']==0:
+          rx=ck.load_module_from_path({'path':rx['path'], 'module_code_name':'common', 'skip_init':'yes'})
+          if rx['return']>0: return rx
+          catc=rx['code']
+
     # If pipeline meta is not defined, set up pipeline ...
     fpu=i.get('force_pipeline_update','')
 
@@ -506,8 +702,21 @@ def autotune(i):
     # Clean and copy pipeline before choice selection
     for q in cfg['clean_pipeline']:
         if q in pipeline: del(pipeline[q])
+
+    # Check if reuse results for identical binaries
+    rcache=i.get('result_cache','')
+    if rcache!='':
+       pipeline['result_cache']=rcache
+    rcache_file=i.get('result_cache_file','')
+    if rcache_file!='':
+       pipeline['result_cache_file']=rcache_file
+
     pipelinec=copy.deepcopy(pipeline)
 
+    # Parts of pipeline copied partially at each iteration (copy-on-write)
+    cowk=None
+    if i.get('full_pipeline_copy','')=='yes': cowk={}
+
     # Check some vars ...
     ni=i.get('iterations','')
     if ni=='': ni=4
@@ -531,6 +740,82 @@ def autotune(i):
     try: srm=int(srm)
     except Exception as e: pass
 
+    # Check adaptive statistical repetitions
+    rci={'key':i.get('repetitions_ci_key',''),
+         'target':i.get('repetitions_ci_target',''),
+         'confidence':i.get('repetitions_ci_confidence',''),
+         'min':i.get('repetitions_min','')}
+    if rci['key']!='':
+       x=i.get('repetitions_max','')
+       if x!='': srm=int(x)
+
+    # Check racing (stop clearly worse candidates)
+    race={'key':i.get('race_key',''),
+          'margin':i.get('race_margin',''),
+          'after':i.get('race_after',''),
+          'reverse':i.get('race_reverse',''),
+          'confidence':i.get('race_confidence',''),
+          'best_mean':None,
+          'best_half_width':None}
+    if race['key']!='':
+       # Start from reference point if available
+       fdfi=i.get('flat_dict_for_improvements',{})
+       v=fdfi.get(race['key']+'#mean',None)
+       if v==None: v=fdfi.get(race['key']+'#min',None)
+       if v!=None:
+          race['best_mean']=float(v)
+          race['best_half_width']=0.0
+
+    # Check parallel evaluation of candidates
+    pw=i.get('parallel_workers','')
+    if pw=='': pw=1
+    pw=int(pw)
+
+    paff=i.get('parallel_affinity',[])
+
+    if pw>1 and (prune=='yes' or isols>0 or cats!=None or only_filter=='yes'):
+       # Next choices depend on results of previous iterations - can't select them in advance
+       if o=='con':
+          ck.out('')
+          ck.out('WARNING: parallel evaluation is not supported when pruning, checking solutions or using customized autotuner - switching to 1 worker')
+          ck.out('')
+       pw=1
+
+    if wid!='' and (len(fk)>0 or prune=='yes' or len(result_conditions)>0 or isols>0 or len(cat)>0 or \
+                    len(print_keys_after_each_iteration)>0):
+       # These modes need recorded point or its stat analysis immediately
+       if o=='con':
+          ck.out('')
+          ck.out('WARNING: write-behind recording is not supported with frontier keys, pruning, result conditions, solutions,')
+          ck.out('         customized autotuner or printing keys after each iteration - recording synchronously')
+          ck.out('')
+       wid=''
+
+    # Check overlapped compilation and execution of candidates
+    ovl=i.get('overlap_compile_run','')
+
+    ovd=i.get('overlap_queue_depth','')
+    if ovd=='': ovd=2
+    ovd=int(ovd)
+    if ovd<1: ovd=1
+
+    baff=i.get('build_affinity','')
+    raff=i.get('run_affinity','')
+
+    if ovl=='yes' and (pw>1 or prune=='yes' or isols>0 or cats!=None or only_filter=='yes'):
+       if o=='con':
+          ck.out('')
+          ck.out('WARNING: overlapped compilation is not supported with parallel workers, pruning, checking solutions or customized autotuner - switching it off')
+          ck.out('')
+       ovl=''
+
+    ovtd=tmp_dir
+    if ovtd=='': ovtd='tmp'
+    ovn=0 # number of started background builds (to select tmp dir)
+
+    pbatch=[]      # candidates already selected and evaluated by parallel workers (or compiled in background)
+    pfinish=False  # if True, choices were exhausted while selecting parallel candidates
+
     # Check choices descriptions and dimensions
     cdesc=pipeline.get('choices_desc',{})
     corder=copy.deepcopy(i.get('choices_order',[]))
@@ -549,56 +834,30 @@ def autotune(i):
     if len(corder)==1 and len(csel)==0:
        csel=[{"type":"random"}]
 
-    # Prepare multi-dimensional vector of choices
-    dv1=[] # Current dimensions
-    for iq1 in range(0,len(corder)):
-        dv=[]
-        q1=corder[iq1]
-        zz=csel[iq1]
-        ztags=[]
-        if zz.get('tags','')!='': ztags=zz['tags'].split(',')
-        znotags=[]
-        if zz.get('notags','')!='': znotags=zz['notags'].split(',')
-        zanytags=[]
-        if zz.get('anytags','')!='': zanytags=zz['anytags'].split(',')
-        for q2 in q1:
-            if '*' in q2 or '?' in q2:
-               for k in sorted(cdesc, key=lambda v: cdesc[v].get('sort',0)):
-                   if fnmatch.fnmatch(k,q2):
-                      # Check tags (must have)
-                      yy=cdesc[k].get('tags',[])
-                      add=True
-                      for j in ztags:
-                          j=j.strip()
-                          if j!='' and j not in yy:
-                             add=False
-                             break
-                      if add:
-                         # Any of those
-                         if len(zanytags)>0:
-                            add=False
-                            for j in zanytags:
-                                j=j.strip()
-                                if j!='' and j in yy:
-                                   add=True
-                                   break
-                         if add:
-                            # Check that none of those
-                            for j in znotags:
-                                j=j.strip()
-                                if j!='' and j in yy:
-                                   add=False
-                                   break
-                            if add:
-                               dv.append(k)
-            else:
-               dv.append(q2)
-        dv1.append(dv)
-    corder=dv1
+    # Prepare multi-dimensional vector of choices (expand wildcards and filter by tags)
+    rx=expand_choices_order({'choices_desc':cdesc,
+                             'choices_order':corder,
+                             'choices_selection':csel,
+                             'compiler_description_uoa':pipeline.get('choices',{}).get('compiler_description_uoa',''),
+                             'index':i.get('choices_index',''),
+                             'index_file':i.get('choices_index_file','')})
+    if rx['return']>0: return rx
+    corder=rx['choices_order']
 
     # Save original
     ocorder=copy.deepcopy(corder)
 
+    # Check duplicate vectors of choices (hashes of evaluated vectors in this session)
+    sdup=i.get('skip_duplicates','')
+    dseen={}
+    ddup={'retries':i.get('duplicate_retries',''),
+          'order':i.get('duplicate_order_matters',''),
+          'size':-1}
+    if ddup['retries']=='': ddup['retries']=100
+    ddup['retries']=int(ddup['retries'])
+    if sdup=='yes':
+       ddup['size']=get_space_size({'choices_desc':cdesc, 'choices_order':corder, 'choices_selection':csel})['size']
+
     # Check seed
     seed=i.get('seed','')
     if seed=='':
@@ -612,6 +871,7 @@ def autotune(i):
           ck.out('')
 
     points={} # Keep best points if finding best points (possibly with Pareto)
+    frontiers={} # Keep points on frontier (with info to delete them) per subset of features when recording
     ppoint={} # Permanent (default point) to calculate improvements ...
 
     # Start iterations
@@ -624,6 +884,7 @@ def autotune(i):
 
     removing_key=''
     removing_value=''
+    removing_keys={} # removed subset of keys (delta debugging)
     default_removing_value=''
     cur_md5=''
     last_md5=''
@@ -633,6 +894,7 @@ def autotune(i):
     prune_checked_keys=[]
     pruned_inversed_flags={}
     prune_check_all=[]
+    prune_dd={} # state of delta debugging (kept keys, granularity, queue of tests, currently checked test)
 
     sol={}
 
@@ -643,12 +905,96 @@ def autotune(i):
 
     ref_keys={}
 
+    corder1=[]
+    cx1={}
+
+    # Check checkpoints
+    cpf=i.get('checkpoint_file','')
+    if cpf!='' and ovl=='yes':
+       # Candidates are always compiled in advance so there is no consistent point to save
+       if o=='con':
+          ck.out('')
+          ck.out('WARNING: checkpoints are not saved when compilation and execution are overlapped')
+          ck.out('')
+       cpf=''
+    cpe=i.get('checkpoint_every','')
+    if cpe=='': cpe=1
+    cpe=int(cpe)
+
     m=-1
+
+    rfrom=i.get('resume_from','')
+    if rfrom!='':
+       rx=ck.load_json_file({'json_file':rfrom})
+       if rx['return']>0: return rx
+       cp=rx['dict']
+
+       m=cp['iteration']
+       ni=cp['iterations']
+
+       xs=cp['random_state']
+       my_random.setstate((xs[0], tuple(xs[1]), xs[2]))
+
+       ccur=cp['choices_current']
+       corder=cp['choices_order']
+       corder1=cp.get('pruned_choices_order',[])
+       csel=cp['choices_selection']
+       state=cp['state']
+       meta=cp['meta']
+       points=cp['points']
+       ppoint=cp['ppoint']
+
+       pccur=cp['pruned_choices_current']
+       prune_checked_keys=cp['prune_checked_keys']
+       prune_check_all=cp['prune_check_all']
+       started_prune_invert=cp['started_prune_invert']
+       increased_iterations=cp['increased_iterations']
+       number_of_original_choices=cp['number_of_original_choices']
+       pruned_influence=cp['pruned_influence']
+       pruned_chars=cp['pruned_chars']
+       pruned_inversed_flags=cp['pruned_inversed_flags']
+       prune_dd=cp.get('prune_dd',{})
+       last_md5=cp['last_md5']
+       ref_stat_dict=cp['ref_stat_dict']
+       ref_stat_out=cp['ref_stat_out']
+       ref_rrr=cp['ref_rrr']
+       ref_rr=cp['ref_rr']
+       ref_keys=cp['ref_keys']
+       fdfi=cp['flat_dict_for_improvements']
+
+       all_solutions=cp['all_solutions']
+       sols=cp['solutions']
+
+       failed_cases=cp['failed_cases']
+       ae=cp['all']
+       last_record_uid=cp['last_recorded_uid']
+       race=cp.get('race',race)
+       dseen=dict.fromkeys(cp.get('duplicate_hashes',[]), True)
+       srff=cp.get('stream_first_features',None)
+
+       if 'dependencies' in cp:
+          pipelinec['dependencies']=cp['dependencies']
+
+       # do not skip iterations again
+       sfi=1
+
+       if o=='con':
+          ck.out('')
+          ck.out('Resuming autotuning from iteration '+str(m+2)+' (checkpoint '+rfrom+') ...')
+          ck.out('')
+
     while True:
         m+=1
         if ni!=-1 and m>=ni:
            break
 
+        timer_section(tmr, 'autotuning', 'autotuning iteration')
+
+        # Check if writer failed to record previous experiments
+        if wid!='':
+           rx=collect_write_behind({'id':wid})
+           if rx['return']>0: return rx
+
         mm=m+1
 
         x='Pipeline iteration: '+str(mm)
@@ -657,11 +1003,18 @@ def autotune(i):
         ck.out(sep1)
         ck.out(x)
 
-        time.sleep(0.5)
+        if mm>=sfi:
+           start_timer(tmr, 'sleep')
+           time.sleep(0.5)
+           stop_timer(tmr, 'sleep')
+
+        start_timer(tmr, 'choice selection')
 
         # Copy original
         if m==0 or mm>=sfi:
-           pipeline=copy.deepcopy(pipelinec)
+           rx=copy_pipeline({'pipeline':pipelinec, 'shared_keys':cowk})
+           if rx['return']>0: return rx
+           pipeline=rx['pipeline']
 
         # Check if there is a pre-selection
         al=''
@@ -701,14 +1054,102 @@ def autotune(i):
                               if v!='' and v!=None and k not in prune_ignore_choices and k not in prune_checked_keys:
                                  nz.append(k)
 
+                       # Delta debugging: select next subset of choices to remove
+                       #  (start from all choices; then, for n subsets of kept choices, try to keep only one subset
+                       #   or to remove one subset (complement); if result always changes, double n)
+                       removing_keys={}
+                       if prune_method=='ddmin' and not started_prune_invert:
+                          if len(prune_dd)==0:
+                             prune_dd={'cur':list(nz), 'seen':list(nz), 'n':2, 'grow':'',
+                                       'queue':[{'remove':list(nz), 'keep':[], 'complement':''}],
+                                       'checking':None}
+
+                          # Pipeline may change choices
+                          prune_dd['cur']=[k for k in prune_dd['cur'] if pccur.get(k,None)!='' and pccur.get(k,None)!=None]
+
+                          # Keys which appeared later are added to kept ones and checked first
+                          late=[k for k in nz if k not in prune_dd['seen']]
+                          if len(late)>0:
+                             prune_dd['seen']+=late
+                             prune_dd['queue'].insert(0, {'remove':late, 'keep':list(prune_dd['cur']), 'complement':'yes'})
+                             prune_dd['cur']+=late
+
+                          while len(removing_keys)==0:
+                             cur=prune_dd['cur']
+
+                             if len(prune_dd['queue'])==0:
+                                n=prune_dd['n']
+                                if prune_dd['grow']=='yes':
+                                   if n>=len(cur): break
+                                   n=min(n*2, len(cur))
+                                n=min(n, len(cur))
+                                if n<1: break
+                                prune_dd['n']=n
+                                prune_dd['grow']='yes'
+
+                                parts=[]
+                                for q in range(0, n):
+                                    x=cur[(q*len(cur))//n:((q+1)*len(cur))//n]
+                                    if len(x)>0: parts.append(x)
+
+                                # Keep only one subset
+                                for x in parts:
+                                    if len(x)<len(cur):
+                                       prune_dd['queue'].append({'remove':[k for k in cur if k not in x], 'keep':x, 'complement':''})
+
+                                # Remove one subset (complement; for 2 subsets the same as above)
+                                if n>2 or len(cur)==1:
+                                   for x in parts:
+                                       prune_dd['queue'].append({'remove':x, 'keep':[k for k in cur if k not in x], 'complement':'yes'})
+
+                             x=prune_dd['queue'].pop(0)
+
+                             for k in x['remove']:
+                                 if k in cur:
+                                    removing_keys[k]=pccur[k]
+
+                             if len(removing_keys)>0:
+                                prune_dd['checking']=x
+
+                          if len(removing_keys)==0:
+                             # All remaining choices influence result
+                             for k in nz+prune_dd['cur']:
+                                 if k not in prune_checked_keys:
+                                    prune_checked_keys.append(k)
+                             nz=[]
+                          else:
+                             x=[k for k in prune_dd['cur'] if k in removing_keys]
+
+                             for k in x:
+                                 pccur[k]=''
+
+                             removing_key=''
+                             removing_value=''
+                             if len(x)==1:
+                                removing_key=x[0]
+                                removing_value=removing_keys[removing_key]
+                                prune_checked_keys.append(removing_key)
+
+                             cx1=copy.deepcopy(pccur)
+
+                             if o=='con':
+                                ck.out('')
+                                ck.out('    Trying to remove '+str(len(x))+' of '+str(len(prune_dd['cur']))+' keys (granularity '+str(prune_dd['n'])+') ...')
+                                for k in x:
+                                    ck.out('      '+k+' ('+str(removing_keys[k])+')')
+
                        # Remove one (random or one by one)
-                       if len(nz)==0:
+                       if len(removing_keys)>0:
+                          pass # subset already selected (delta debugging)
+
+                       elif len(nz)==0:
                           if not started_prune_invert:
                              if o=='con':
                                 ck.out('')
                                 ck.out('  ALL choices have been checked - main pruning finished !')
 
                           if prune_invert!='yes':
+                             stop_timer(tmr, 'choice selection')
                              break
 
                           if not started_prune_invert:
@@ -731,6 +1172,7 @@ def autotune(i):
                              ck.out('')
                              ck.out('  Pruning finished !')
 
+                             stop_timer(tmr, 'choice selection')
                              break
 
                           # Switching off key
@@ -845,6 +1287,26 @@ def autotune(i):
                  if prune=='yes' and len(pccur)==0:
                     pccur=copy.deepcopy(cx1)
 
+        # Check if candidate was already selected and evaluated by parallel workers
+        pb=None
+        if len(pbatch)>0:
+           pb=pbatch.pop(0)
+
+           pipeline=pb['pipeline']
+           r=pb['choice']
+
+           if o=='con':
+              ck.out('')
+              if 'build' in pb:
+                 ck.out('  (compiled in background in '+pb['tmp_dir']+')')
+              else:
+                 ck.out('  (evaluated by parallel worker '+str(pb['worker'])+')')
+
+        elif pfinish:
+           finish=True
+           stop_timer(tmr, 'choice selection')
+           break
+
         # Make selection
         jj={'module_uoa':cfg['module_deps']['choice'],
             'action':'make',
@@ -858,7 +1320,10 @@ def autotune(i):
             'out':o}
         if al!='': jj['all']=al
 
-        if cats!=None and al!='yes':
+        if pb!=None:
+           pass # already selected (parallel workers)
+
+        elif cats!=None and al!='yes':
            # customized autotuning via external module (exploration)
            # specialize our autotuner to a given program (domain)
 
@@ -868,9 +1333,16 @@ def autotune(i):
            jj['autotuning_iteration']=m
            jj['tmp_dir']=tmp_dir
            jj['custom_autotuner_meta']=cat
+           if catc!=None: jj['autotuner_common']=catc
 
            jj['vars']=i.get('custom_autotuner_vars',{})
 
+           # Results of previous iteration (for search engines learning from them)
+           jj['last_stat_dict']=stat_dict
+           jj['last_pipeline_state']=dd.get('pipeline_state',{})
+           jj['frontier_keys']=fk
+           jj['frontier_keys_reverse']=fkr
+
            r=cats.make(jj)
            if r['return']>0: return r
 
@@ -895,6 +1367,11 @@ def autotune(i):
               if m==0:
                  ref_keys=copy.deepcopy(ks)
 
+        elif sdup=='yes' and al!='yes':
+           # CK-based selection of vector of choices which was not evaluated before
+           r=select_new_choices({'input':jj, 'seen':dseen, 'duplicates':ddup, 'out':o})
+           if r['return']>0: return r
+
         else:
            # CK-based selection 
            r=ck.access(jj)
@@ -902,20 +1379,149 @@ def autotune(i):
 
         if r.get('finish',True):
            finish=True
+           stop_timer(tmr, 'choice selection')
            break
 
+        stop_timer(tmr, 'choice selection')
+
         if i.get('ask_enter_after_choices','')=='yes':
            ck.out('')
            ck.inp({'text':'Press Enter to continue ...'})
 
-        time.sleep(dsleep) # wait to see selection ...
+        # Check if pass this iteration (do not wait for skipped ones)
+        if mm>=sfi:
+           start_timer(tmr, 'sleep')
+           time.sleep(dsleep) # wait to see selection ...
+           stop_timer(tmr, 'sleep')
 
-        # Check if pass this iteration
         if mm<sfi:
            ck.out('')
            ck.out('  (skiped by request)')
            continue
 
+        ##########################################################################################
+        # Select next candidates and evaluate all of them in parallel workers (if needed)
+        if pw>1 and pb==None:
+           start_timer(tmr, 'parallel evaluation')
+
+           cands=[{'pipeline':pipeline, 'choice':r}]
+
+           nc=pw
+           if ni!=-1 and ni-m<nc: nc=ni-m
+
+           while len(cands)<nc:
+               rx=copy_pipeline({'pipeline':pipelinec, 'shared_keys':cowk})
+               if rx['return']>0: return rx
+               xpipeline=rx['pipeline']
+
+               jj['pipeline']=xpipeline
+
+               if sdup=='yes':
+                  rx=select_new_choices({'input':jj, 'seen':dseen, 'duplicates':ddup, 'out':o})
+               else:
+                  rx=ck.access(jj)
+               if rx['return']>0: return rx
+
+               if rx.get('finish',True):
+                  pfinish=True
+                  break
+
+               cands.append({'pipeline':xpipeline, 'choice':rx})
+
+           if o=='con':
+              ck.out('')
+              ck.out('  Evaluating '+str(len(cands))+' candidate(s) in parallel ...')
+
+           ll=[]
+           for w in range(0, len(cands)):
+               ii={'pipeline':cands[w]['pipeline'],
+                   'pipeline_uoa':puoa,
+                   'repetitions':srm,
+                   'repetitions_ci':rci,
+                   'race':race,
+                   'shared_keys':cowk,
+                   'state':state,
+                   'meta':meta,
+                   'autotuning_iteration':m+w,
+                   'preserve_deps_after_first_run':pdafr}
+
+               # One directory per worker for all its repetitions (binary is compiled only during the first one)
+               x=tmp_dir
+               if x=='': x='tmp'
+               ii['tmp_dir']=x+'-par-'+str(w)
+
+               if len(paff)>0:
+                  ii['affinity']=paff[w % len(paff)]
+
+               ll.append(ii)
+
+           rx=evaluate_candidates({'candidates':ll, 'workers':pw})
+           if rx['return']>0: return rx
+
+           for w in range(0, len(cands)):
+               cands[w]['worker']=w
+               cands[w]['repetitions']=rx['results'][w]['repetitions']
+
+               # Merge state updated by workers (tmp directories are per worker)
+               for k in rx['results'][w].get('state',{}):
+                   if k!='tmp_dir':
+                      state[k]=rx['results'][w]['state'][k]
+
+           pb=cands[0]
+           pbatch=cands[1:]
+
+           stop_timer(tmr, 'parallel evaluation')
+
+        ##########################################################################################
+        # Compile next candidates in background while running the current one (overlapped compile/run)
+        if ovl=='yes':
+           start_timer(tmr, 'background compilation start')
+
+           cands=[]
+           if pb==None:
+              pb={'pipeline':pipeline, 'choice':r, 'iteration':m}
+              cands.append(pb)
+
+           # Keep queue of candidates compiled in advance full
+           while not pfinish and len(pbatch)<ovd and (ni==-1 or m+1+len(pbatch)<ni):
+               rx=copy_pipeline({'pipeline':pipelinec, 'shared_keys':cowk})
+               if rx['return']>0: return rx
+               xpipeline=rx['pipeline']
+
+               jj['pipeline']=xpipeline
+
+               if sdup=='yes':
+                  rx=select_new_choices({'input':jj, 'seen':dseen, 'duplicates':ddup, 'out':o})
+               else:
+                  rx=ck.access(jj)
+               if rx['return']>0: return rx
+
+               if rx.get('finish',True):
+                  pfinish=True
+                  break
+
+               # Candidates in queue are evaluated in the next iterations
+               xb={'pipeline':xpipeline, 'choice':rx, 'iteration':m+1+len(pbatch)}
+               cands.append(xb)
+               pbatch.append(xb)
+
+           for xb in cands:
+               # Tmp dirs are reused only after candidates compiled in them were executed
+               xb['tmp_dir']=ovtd+'-build-'+str(ovn % (ovd+1))
+               ovn+=1
+
+               rx=start_build({'pipeline':xb['pipeline'],
+                               'pipeline_uoa':puoa,
+                               'state':state,
+                               'meta':meta,
+                               'autotuning_iteration':xb['iteration'],
+                               'tmp_dir':xb['tmp_dir'],
+                               'affinity':baff})
+               if rx['return']>0: return rx
+               xb['build']=rx['id']
+
+           stop_timer(tmr, 'background compilation start')
+
         # Describing experiment
         dd={'tags':tags,
             'subtags':subtags,
@@ -930,38 +1536,90 @@ def autotune(i):
         fail_reason=''
         rr={}
         last_orders_from_pipeline=[]
+        nrep=0   # performed repetitions
+        rcil=[]  # characteristics of successful repetitions (for adaptive repetitions and racing)
+        rcix=None
+        raced=False
         for sr in range(0, srm):
             if only_filter=='yes': continue
 
-            ck.out('')
-            ck.out('      ------------------- Statistical repetition: '+str(sr+1)+' of '+str(srm)+' -------------------')
-            ck.out('')
-
-            pipeline1=copy.deepcopy(pipeline)
-
-            pipeline1['prepare']='no'
-            pipeline1['module_uoa']=puoa
-            pipeline1['action']='pipeline'
-            pipeline1['out']=o
-            pipeline1['state']=state
-            pipeline1['meta']=meta
-            pipeline1['autotuning_iteration']=m
-            pipeline1['statistical_repetition_number']=sr
-            pipeline1['tmp_dir']=tmp_dir
-
-#            if prune_md5=='yes':
+            timer_section(tmr, 'autotuning iteration', 'statistical repetition')
 
-            # If last pruning iteration, compile and run code (to get all last characteristics)
-            if prune_md5=='yes' and (len(nz)!=0 or len(prune_check_all)!=0):
-               if o=='con' and last_md5!='':
-                  ck.out('')
-                  ck.out('      Checking MD5: '+last_md5)
+            if pb!=None and 'repetitions' in pb:
+               # Already evaluated by parallel worker
+               if sr>=len(pb['repetitions']): break
 
-               pipeline1['last_md5']=last_md5
-               pipeline1['last_md5_fail_text']=last_md5_fail_text
+               pipeline1=pb['repetitions'][sr]['pipeline']
+               rr=pb['repetitions'][sr]['output']
 
-            rr=ck.access(pipeline1)
-            if rr['return']>0: return rr
+            else:
+               ck.out('')
+               ck.out('      ------------------- Statistical repetition: '+str(sr+1)+' of '+str(srm)+' -------------------')
+               ck.out('')
+
+               rx=copy_pipeline({'pipeline':pipeline, 'shared_keys':cowk})
+               if rx['return']>0: return rx
+               pipeline1=rx['pipeline']
+
+               pipeline1['prepare']='no'
+               pipeline1['module_uoa']=puoa
+               pipeline1['action']='pipeline'
+               pipeline1['out']=o
+               pipeline1['state']=state
+               pipeline1['meta']=meta
+               pipeline1['autotuning_iteration']=m
+               pipeline1['statistical_repetition_number']=sr
+               pipeline1['tmp_dir']=tmp_dir
+
+#               if prune_md5=='yes':
+
+               # If last pruning iteration, compile and run code (to get all last characteristics)
+               if prune_md5=='yes' and (len(nz)!=0 or len(prune_check_all)!=0):
+                  if o=='con' and last_md5!='':
+                     ck.out('')
+                     ck.out('      Checking MD5: '+last_md5)
+
+                  pipeline1['last_md5']=last_md5
+                  pipeline1['last_md5_fail_text']=last_md5_fail_text
+
+               # Check if already compiled in background (overlapped compile/run)
+               bo=None
+               if pb!=None and 'build' in pb:
+                  if 'build_output' not in pb:
+                     start_timer(tmr, 'wait for build')
+
+                     rx=wait_build({'id':pb['build']})
+                     if rx['return']>0: return rx
+                     pb['build_output']=rx['output']
+
+                     stop_timer(tmr, 'wait for build')
+
+                  bo=pb['build_output']
+
+                  pipeline1['no_compile']='yes'
+                  pipeline1['tmp_dir']=pb['tmp_dir']
+                  if raff!='': pipeline1['affinity']=raff
+
+               if bo!=None and bo.get('fail','')=='yes':
+                  # Compilation failed
+                  pipeline1=bo
+                  rr=bo
+               else:
+                  if tmr!=None: pipeline1['timers']=tmr
+
+                  rr=ck.access(pipeline1)
+                  if rr['return']>0: return rr
+
+                  if bo!=None:
+                     # Add characteristics of background compilation
+                     x=bo.get('characteristics',{}).get('compile',None)
+                     if x!=None:
+                        if 'characteristics' not in pipeline1: pipeline1['characteristics']={}
+                        pipeline1['characteristics']['compile']=x
+                        if 'characteristics' not in rr: rr['characteristics']={}
+                        rr['characteristics']['compile']=x
+
+            nrep+=1
 
             fail=rr.get('fail','')
             fail_reason=rr.get('fail_reason','')
@@ -1006,13 +1664,58 @@ def autotune(i):
 
             if fail=='yes': break
 
+            if rci['key']!='' or race['key']!='':
+               rcil.append(pipeline1.get('characteristics',{}))
+
+            # Check if candidate is clearly worse than the best one (racing)
+            if race['key']!='':
+               rx=check_race({'characteristics_list':rcil, 'race':race})
+               if rx['return']>0: return rx
+
+               if rx['stop']=='yes':
+                  raced=True
+                  if o=='con':
+                     ck.out('')
+                     ck.out('      Candidate is worse than the best one so far ('+str(rx['mean'])+' vs '+str(race['best_mean'])+') - stopping repetitions')
+                  break
+
+            # Check if confidence interval is already narrow enough (adaptive repetitions)
+            if rci['key']!='':
+               rx=check_repetitions_ci({'characteristics_list':rcil, 'ci':rci})
+               if rx['return']>0: return rx
+
+               rcix=rx['relative_ci']
+
+               if rx['stop']=='yes':
+                  if o=='con':
+                     ck.out('')
+                     ck.out('      Relative confidence interval '+('%.4f'%rcix)+' - enough repetitions ('+str(nrep)+')')
+                  break
+
+        stop_timer(tmr, 'statistical repetition')
+
+        # Record number of repetitions which were actually performed
+        # (less than requested with adaptive repetitions, racing or parallel workers)
+        if 'features' in dd:
+           dd['features']['statistical_repetitions']=nrep
+
+        # Update best candidate for racing
+        if race['key']!='' and fail!='yes' and not raced:
+           rx=update_race({'characteristics_list':rcil, 'race':race})
+           if rx['return']>0: return rx
+
         # Record extra pipeline info
         fail_bool=False
         if fail=='yes': fail_bool=True
-        dd['pipeline_state']={'repetitions':srm,
+        dd['pipeline_state']={'repetitions':nrep,
                               'fail_reason':fail_reason,
                               'fail':fail,
                               'fail_bool':fail_bool}
+        if rcix!=None:
+           dd['pipeline_state']['relative_ci']=rcix
+        if raced:
+           dd['pipeline_state']['raced']='yes'
+           dd['pipeline_state']['dominated']='yes'
 
         # Record list of characteristics (from multiple reptitions)
         dd['characteristics_list']=ddcl
@@ -1033,6 +1736,33 @@ def autotune(i):
         if call=='yes':
            ae.append(dd)
 
+        # Stream compact results (flushed at each iteration to be processed while autotuning is running)
+        if srfh!=None and only_filter!='yes':
+           rx=ck.flatten_dict({'dict':dd.get('features',{})})
+           if rx['return']>0: return rx
+           ff=rx['dict']
+
+           if srff==None:
+              srff=ff
+              fd=ff
+           else:
+              fd={}
+              for k in ff:
+                  if k not in srff or srff[k]!=ff[k]:
+                     fd[k]=ff[k]
+
+           x={'iteration':m,
+              'choices':dd.get('choices',{}),
+              'features':fd,
+              'characteristics_list':ddcl,
+              'pipeline_state':dd.get('pipeline_state',{})}
+
+           try:
+              srfh.write((json.dumps(x, sort_keys=True)+'\n').encode('utf8'))
+              srfh.flush()
+           except Exception as e:
+              return {'return':1, 'error':'can\'t stream results to '+srf+' ('+format(e)+')'}
+
         ##########################################################################################
         # Recording experiment if needed
         current_point=''
@@ -1061,6 +1791,8 @@ def autotune(i):
 
               t1=time.time()
 
+              start_timer(tmr, 'recording experiment')
+
               if o=='con':
                  ck.out(sep)
                  ck.out('Recording experiment ...')
@@ -1091,35 +1823,51 @@ def autotune(i):
               #  (compiler flag tuning, OpenCL/MPI params, etc)
               ie.update(rdict)
 
-              rx=ck.access(ie)
-              if rx['return']>0: return rx
+              if wid!='':
+                 # Queue experiment (recorded and analyzed by writer process)
+                 ie['out']=''
+
+                 rx=add_to_write_behind({'id':wid, 'input':ie})
+                 if rx['return']>0: return rx
 
-              current_point=rx.get('point','')
-              current_record_uid=rx.get('recorded_uid','')
+                 if o=='con':
+                    ck.out('Queued for recording ('+str(rx['queued'])+' in queue) ...')
 
-              if current_point!='': recorded_info['points'].append(current_point)
-              if current_record_uid!='': 
-                 recorded_info['recorded_uid']=current_record_uid
-                 last_record_uid=current_record_uid
+              else:
+                 rx=ck.access(ie)
+                 if rx['return']>0: return rx
 
-              stat_dict=rx['dict_flat']
-              rrr=rx['stat_analysis']
-              fft=rx['flat_features']
+                 current_point=rx.get('point','')
+                 current_record_uid=rx.get('recorded_uid','')
 
-              tt=time.time()-t1
-              if o=='con':
-                 ck.out('')
-                 ck.out('Recorded successfully in '+('%.2f'%tt)+' secs.')
+                 if current_point!='': recorded_info['points'].append(current_point)
+                 if current_record_uid!='': 
+                    recorded_info['recorded_uid']=current_record_uid
+                    last_record_uid=current_record_uid
+
+                 stat_dict=rx['dict_flat']
+                 rrr=rx['stat_analysis']
+                 fft=rx['flat_features']
+
+                 tt=time.time()-t1
+                 if o=='con':
+                    ck.out('')
+                    ck.out('Recorded successfully in '+('%.2f'%tt)+' secs.')
+
+              stop_timer(tmr, 'recording experiment')
 
         ##########################################################################################
         # If was not performed via recording, perform statistical analysis here
-        if ssa!='yes' and fail!='yes' and len(stat_dict)==0:
+        # (with write-behind recording it is performed once by writer)
+        if ssa!='yes' and fail!='yes' and len(stat_dict)==0 and wid=='':
            if o=='con':
               ck.out('')
               ck.out('Performing explicit statistical analysis of experiments ...')
 
            if prune=='yes': sfd={}
 
+           start_timer(tmr, 'statistical analysis')
+
            ii={'action':'multi_stat_analysis',
                'module_uoa':cfg['module_deps']['experiment'],
                'dict':stat_dict,
@@ -1132,6 +1880,8 @@ def autotune(i):
            if rrr['return']>0: return rrr
            stat_dict=rrr['dict_flat']
 
+           stop_timer(tmr, 'statistical analysis')
+
         ##########################################################################################
         # Print various values to monitor iterations (if needed)
         if o=='con' and fail!='yes' and len(print_keys_after_each_iteration)>0:
@@ -1337,6 +2087,52 @@ def autotune(i):
 
                        pruned_inversed_flags[removing_key]=prx2
 
+                 elif prune_dd.get('checking',None)!=None:
+                    # We are in delta debugging mode (subset of keys was removed) ###################
+                    x=prune_dd['checking']
+                    prune_dd['checking']=None
+
+                    removed=[k for k in prune_dd['cur'] if k in removing_keys]
+
+                    if result_the_same:
+                       if o=='con':
+                          ck.out('')
+                          ck.out('    Removing '+str(len(removing_keys))+' keys from choices ...')
+
+                       for k in removing_keys:
+                           pccur[k]=''
+                           pruned_inversed_flags[k]=removing_keys[k]
+
+                       # Continue with remaining keys (new tests for the same or smaller granularity)
+                       prune_dd['cur']=[k for k in prune_dd['cur'] if k not in removed]
+                       if x.get('complement','')=='yes': prune_dd['n']=max(prune_dd['n']-1, 2)
+                       else: prune_dd['n']=2
+                       prune_dd['grow']=''
+                       prune_dd['queue']=[]
+
+                       # If new compilation MD5 and new stats, make a new referneces point
+                       if not (fail=='yes' and fail_reason==last_md5_fail_text):
+                          ref_stat_dict=copy.deepcopy(stat_dict)
+                          ref_stat_out=copy.deepcopy(rr)
+                          ref_rrr=copy.deepcopy(rrr)
+                          ref_rr=copy.deepcopy(rr)
+                          fdfi=ref_stat_dict
+                          last_md5=cur_md5
+
+                          if o=='con':
+                             ck.out('')
+                             ck.out('         NEW REFERENCE POINT (MD5='+last_md5+')!')
+
+                    else:
+                       if o=='con':
+                          ck.out('')
+                          ck.out('    Keeping '+str(len(removing_keys))+' keys ...')
+
+                       for k in removing_keys:
+                           pccur[k]=removing_keys[k]
+
+                       restore_stats=True
+
                  else:
                     # We are in standard pruning mode ###############################################
                     if result_the_same:
@@ -1371,7 +2167,7 @@ def autotune(i):
                        restore_stats=True
 
                  # Record influential optimization
-                 if not result_the_same:
+                 if not result_the_same and removing_key!='':
                     kky={}
                     if len(pruned_chars)>0:
                        for q in pruned_chars:
@@ -1385,49 +2181,83 @@ def autotune(i):
                     rr=copy.deepcopy(ref_rr)
 
         if prune!='yes' and (len(fk)>0 or only_filter=='yes'):
-           # If data was recorded to repo, reload all points 
+           start_timer(tmr, 'frontier filtering')
+
            opoints={} # original points with all info (used later to delete correct points)
            if record=='yes':
-              if o=='con':
-                 ck.out('')
-                 ck.out('Reloading points to detect frontier ...')
-                 ck.out('')
+              # Points on frontier are kept in memory per subset of features (ignoring frontier_features_keys_to_ignore) -
+              #  we reload all points from repo only when we see this subset for the first time in this session
+              fkey=''
+              if only_filter!='yes':
+                 xfft={}
+                 for q in fft:
+                     add=True
+                     for q1 in ffki:
+                         if fnmatch.fnmatch(q,q1):
+                            add=False
+                            break
+                     if add: xfft[q]=fft[q]
+                 fkey=json.dumps(xfft, sort_keys=True)
 
-              ie=copy.deepcopy(iec)
+              if only_filter=='yes' or fkey not in frontiers:
+                 # If data was recorded to repo, reload all points 
+                 if o=='con':
+                    ck.out('')
+                    ck.out('Reloading points to detect frontier ...')
+                    ck.out('')
 
-              ie['action']='get'
+                 ie=copy.deepcopy(iec)
 
-              if only_filter=='yes':
-                 ie['get_all_points']='yes'
-              else:
-                 # NOTE - I currently do not search points by features, i.e. all points are taken for Paretto
-                 # should improve in the future ...
-                 ie['flat_features']=fft
-                 ie['features_keys_to_ignore']=ffki # Ignore parts of features to be able to create subset for frontier ...
-                 if 'features_keys_to_process' in ie: del(ie['features_keys_to_process'])
-                 ie['skip_processing']='yes'
-
-              ie['separate_permanent_points']='yes'
-              ie['load_json_files']=['flat','features']
-              ie['get_keys_from_json_files']=fk
-              ie['out']='con'
-
-              rx=ck.access(ie)
-              if rx['return']>0: return rx
+                 ie['action']='get'
+
+                 if only_filter=='yes':
+                    ie['get_all_points']='yes'
+                 else:
+                    # NOTE - I currently do not search points by features, i.e. all points are taken for Paretto
+                    # should improve in the future ...
+                    ie['flat_features']=fft
+                    ie['features_keys_to_ignore']=ffki # Ignore parts of features to be able to create subset for frontier ...
+                    if 'features_keys_to_process' in ie: del(ie['features_keys_to_process'])
+                    ie['skip_processing']='yes'
+
+                 ie['separate_permanent_points']='yes'
+                 ie['load_json_files']=['flat','features']
+                 ie['get_keys_from_json_files']=fk
+                 ie['out']='con'
+
+                 rx=ck.access(ie)
+                 if rx['return']>0: return rx
+
+                 xpoints=rx['points']
+
+                 points={}
 
-              xpoints=rx['points']
-              opoints=copy.deepcopy(xpoints) # original points
+                 ppoints=rx['ppoints']
+                 ppoint={}
+                 if len(ppoints)>0:
+                    ppoint=ppoints[0]
 
-              points={}
+                 for q in xpoints:
+                     uid=q['point_uid']
+                     points[uid]=q.get('flat',{})
+                     opoints[uid]=q
 
-              ppoints=rx['ppoints']
-              ppoint={}
-              if len(ppoints)>0:
-                 ppoint=ppoints[0]
+              else:
+                 # Add only new point to the frontier kept in memory
+                 points=frontiers[fkey]['points']
+                 opoints=frontiers[fkey]['opoints']
+                 ppoint=frontiers[fkey]['ppoint']
+
+                 if current_point!='' and fail!='yes':
+                    w={}
+                    for q in fk:
+                        if q in stat_dict: w[q]=stat_dict[q]
+
+                    points[current_point]=w
+                    opoints[current_point]={'module_uid':cfg['module_deps']['experiment'],
+                                            'data_uid':current_record_uid,
+                                            'point_uid':current_point}
 
-              for q in xpoints:
-                  uid=q['point_uid']
-                  points[uid]=q.get('flat',{})
            else:
               rx=ck.gen_uid({})
               if rx['return']>0: return rx
@@ -1464,29 +2294,98 @@ def autotune(i):
            if len(ppoint)>0:
                recorded_info['points'].append(ppoint['point_uid'])
 
-           # Delete filtered if record
+           # Delete filtered if record (all in one go)
            if record=='yes':
               xdpoints=[]
               for q in dpoints:
-                  found=False
-                  for qq in opoints:
-                      if qq['point_uid']==q:
-                         found=True
-                         break
-                  if found:
-                     xdpoints.append(qq)
+                  if q in opoints:
+                     xdpoints.append(opoints[q])
+                     del(opoints[q])
 
-              # Attempt to delete non-optimal solutions
-              rx=ck.access({'action':'delete_points',
-                            'module_uoa':cfg['module_deps']['experiment'],
-                            'points':xdpoints,
-                            'out':oo})
-              if rx['return']>0: return rx
+              if len(xdpoints)>0:
+                 # Attempt to delete non-optimal solutions
+                 rx=ck.access({'action':'delete_points',
+                               'module_uoa':cfg['module_deps']['experiment'],
+                               'points':xdpoints,
+                               'out':oo})
+                 if rx['return']>0: return rx
+
+              if only_filter!='yes':
+                 frontiers[fkey]={'points':points, 'opoints':opoints, 'ppoint':ppoint}
+
+           stop_timer(tmr, 'frontier filtering')
+
+        ##########################################################################################
+        # Save checkpoint to be able to resume session
+        #   (not in the middle of candidates selected for parallel workers)
+        if cpf!='' and len(pbatch)==0 and (mm % cpe)==0:
+           start_timer(tmr, 'checkpoint')
+
+           xs=my_random.getstate()
+
+           cp={'iteration':m,
+               'iterations':ni,
+               'random_state':[xs[0], list(xs[1]), xs[2]],
+               'choices_current':ccur,
+               'choices_order':corder,
+               'choices_selection':csel,
+               'state':state,
+               'meta':meta,
+               'points':points,
+               'ppoint':ppoint,
+               'pruned_choices_order':corder1,
+               'pruned_choices_current':pccur,
+               'prune_checked_keys':prune_checked_keys,
+               'prune_check_all':prune_check_all,
+               'started_prune_invert':started_prune_invert,
+               'increased_iterations':increased_iterations,
+               'number_of_original_choices':number_of_original_choices,
+               'pruned_influence':pruned_influence,
+               'pruned_chars':pruned_chars,
+               'pruned_inversed_flags':pruned_inversed_flags,
+               'prune_dd':prune_dd,
+               'last_md5':last_md5,
+               'ref_stat_dict':ref_stat_dict,
+               'ref_stat_out':ref_stat_out,
+               'ref_rrr':ref_rrr,
+               'ref_rr':ref_rr,
+               'ref_keys':ref_keys,
+               'flat_dict_for_improvements':fdfi,
+               'all_solutions':all_solutions,
+               'solutions':sols,
+               'failed_cases':failed_cases,
+               'all':ae,
+               'last_recorded_uid':last_record_uid,
+               'race':race,
+               'duplicate_hashes':list(dseen.keys()),
+               'stream_first_features':srff}
+
+           if pdafr=='yes':
+              cp['dependencies']=pipelinec.get('dependencies',{})
+
+           # Write to tmp file first to not corrupt checkpoint if interrupted
+           rx=ck.save_json_to_file({'json_file':cpf+'.tmp', 'dict':cp})
+           if rx['return']>0: return rx
+
+           try:
+              os.rename(cpf+'.tmp', cpf)
+           except OSError:
+              # Windows can't rename to existing file
+              os.remove(cpf)
+              os.rename(cpf+'.tmp', cpf)
+
+           stop_timer(tmr, 'checkpoint')
+
+           if o=='con':
+              ck.out('')
+              ck.out('Checkpoint saved to '+cpf)
 
         if i.get('ask_enter_after_each_iteration','')=='yes':
            ck.out('')
            ck.inp({'text':'Press Enter to continue autotuning or DSE ...'})
 
+    stop_timer(tmr, 'autotuning')
+
     # Mention, if all iterations were performed, or autotuning rached max number of iterations
     if finish:
        ck.out('')
@@ -1498,6 +2397,18 @@ def autotune(i):
     if call=='yes':
        rz['all']=ae
 
+    if tmr!=None:
+       rz['timers']={'events':tmr['events'],
+                     'summary':timer_summary(tmr)}
+
+       if trace_file!='':
+          rx=save_trace(tmr, trace_file)
+          if rx['return']>0: return rx
+
+          if o=='con':
+             ck.out('')
+             ck.out('Chrome trace saved to '+trace_file)
+
     # If pruning, print last results
     report=''
     if prune=='yes' and o=='con':
@@ -1600,6 +2511,1809 @@ def autotune(i):
 
     return rz
 
+##############################################################################
+# localize bugs: reduce choices of failed cases to minimal sets which still fail
+# (delta debugging with candidate subsets evaluated in parallel worker processes)
+
+def reduce_bug(i):
+    """
+    Input:  {
+              (data_uoa)            - pipeline module UOA
+
+              (pipeline)            - prepared pipeline setup (already ready to run)
+                     or
+              (pipeline_from_file)  - load prepared pipeline setup from file
+                     or (if none of above, pipeline will be prepared with all other inputs)
+
+              failed_cases          - list of failed cases (from "autotune" with aggregate_failed_cases=yes)
+                     or
+              failed_cases_file     - load failed cases from JSON file (list or dict with "failed_cases" key,
+                                      such as output of "autotune" saved via save_to_file)
+
+              (keys)                - list of wildcards of choices that can be removed (default ["##compiler_flags#*"]);
+                                      other choices of failed cases are always kept
+              (same_fail_reason)    - if 'yes', subset fails only if pipeline fails with the same reason
+              (repetitions)         - number of repetitions of each subset (default=1; subset fails if any repetition fails)
+              (workers)             - number of parallel worker processes (default - number of CPUs)
+              (affinity)            - list of processor affinities, one per worker
+              (tmp_dir)             - prefix of tmp directories of workers (default="tmp-reduce")
+              (cache_file)          - if !='', load/save results of all checked subsets from/to this JSON file
+                                      (should be used only with the same pipeline)
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              results      - list with one entry per failed case:
+                             {
+                               reproduced        - 'yes' if original case still fails
+                               minimal_choices   - dict with flat keys and values of minimal failing set
+                               removed_choices   - dict with removed flat keys and values
+                               fail_reason       - fail reason of minimal failing set
+                               checked           - number of checked subsets
+                               cache_hits        - number of subsets taken from cache
+                             }
+            }
+
+    """
+
+    import os
+    import copy
+    import fnmatch
+    import json
+    import multiprocessing
+
+    o=i.get('out','')
+    oo=''
+    if o=='con': oo='con'
+
+    puoa=i.get('data_uoa','')
+    if puoa=='': puoa=i.get('pipeline_uoa','')
+    if puoa=='':
+       return {'return':1, 'error':'data_uoa is not set, i.e. no pipeline module'}
+
+    # Load failed cases
+    fcs=i.get('failed_cases',[])
+    fcf=i.get('failed_cases_file','')
+    if fcf!='':
+       r=ck.load_json_file({'json_file':fcf})
+       if r['return']>0: return r
+       fcs=r['dict']
+       if type(fcs)==dict: fcs=fcs.get('failed_cases',[])
+
+    if len(fcs)==0:
+       return {'return':1, 'error':'no failed cases to reduce'}
+
+    # Prepare pipeline
+    pipeline=i.get('pipeline',{})
+    pff=i.get('pipeline_from_file','')
+    if pff!='':
+       r=ck.load_json_file({'json_file':pff})
+       if r['return']>0: return r
+       pipeline=r['dict']
+
+    if len(pipeline)==0:
+       ii=copy.deepcopy(i)
+       for q in ['failed_cases', 'failed_cases_file', 'keys', 'same_fail_reason', 'repetitions',
+                 'workers', 'affinity', 'tmp_dir', 'cache_file', 'cid', 'cids', 'data_uoa']:
+           if q in ii: del(ii[q])
+
+       ii['out']=oo
+       ii['module_uoa']=puoa
+       ii['action']='pipeline'
+       ii['prepare']='yes'
+
+       pipeline=ck.access(ii)
+       if pipeline['return']>0: return pipeline
+       if pipeline.get('ready','')!='yes':
+          return {'return':1, 'error':'pipeline is not ready'}
+       del(pipeline['return'])
+
+    for q in cfg['clean_pipeline']:
+        if q in pipeline: del(pipeline[q])
+
+    kw=i.get('keys',[])
+    if len(kw)==0: kw=['##compiler_flags#*']
+
+    sfr=i.get('same_fail_reason','')
+
+    srm=i.get('repetitions','')
+    if srm=='': srm=1
+    srm=int(srm)
+
+    pw=i.get('workers','')
+    if pw=='': pw=multiprocessing.cpu_count()
+    pw=int(pw)
+    if pw<1: pw=1
+
+    paff=i.get('affinity',[])
+
+    tdp=i.get('tmp_dir','')
+    if tdp=='': tdp='tmp-reduce'
+
+    # Load cache of already checked subsets
+    cf=i.get('cache_file','')
+    cache={}
+    if cf!='' and os.path.isfile(cf):
+       r=ck.load_json_file({'json_file':cf})
+       if r['return']>0: return r
+       cache=r['dict']
+
+    results=[]
+
+    for ifc in range(0, len(fcs)):
+        fc=fcs[ifc]
+
+        fcho=fc.get('choices',{})
+        ofr=fc.get('pipeline_state',{}).get('fail_reason','')
+
+        # Split choices into removable and fixed ones (in original order)
+        corder=[]
+        vals={}
+        fixed=[]
+        keys=[]
+        for k in fc.get('choices_order',[]):
+            if k in vals: continue
+
+            r=ck.get_by_flat_key({'dict':fcho, 'key':k})
+            if r['return']>0: return r
+            v=r['value']
+            if v==None or v=='': continue
+
+            corder.append(k)
+            vals[k]=v
+
+            removable=False
+            for w in kw:
+                if fnmatch.fnmatch(k,w):
+                   removable=True
+                   break
+
+            if removable: keys.append(k)
+            else: fixed.append(k)
+
+        if o=='con':
+           ck.out(sep)
+           ck.out('Reducing failed case '+str(ifc+1)+' of '+str(len(fcs))+' ('+str(len(keys))+' removable choices) ...')
+           if ofr!='': ck.out('  Fail reason: '+ofr)
+
+        xr={'checked':0, 'cache_hits':0}
+
+        # Original case should still fail
+        r=check_bug_subsets({'subsets':[keys], 'pipeline':pipeline, 'pipeline_uoa':puoa,
+                             'choices_order':corder, 'values':vals, 'removable':keys,
+                             'fail_reason':ofr, 'same_fail_reason':sfr,
+                             'repetitions':srm, 'workers':pw, 'affinity':paff, 'tmp_dir':tdp,
+                             'cache':cache, 'stats':xr, 'out':o})
+        if r['return']>0: return r
+
+        if r['failed']==-1:
+           if o=='con':
+              ck.out('')
+              ck.out('  Original case does not fail anymore - skipping!')
+
+           results.append({'reproduced':'no', 'checked':xr['checked'], 'cache_hits':xr['cache_hits']})
+           continue
+
+        fr=r['fail_reason']
+
+        # Delta debugging (ddmin): check all subsets of one granularity at once
+        cur=keys
+        n=2
+        while len(cur)>0:
+            n=min(n, len(cur))
+
+            parts=[]
+            for q in range(0, n):
+                x=cur[(q*len(cur))//n:((q+1)*len(cur))//n]
+                if len(x)>0: parts.append(x)
+
+            subsets=[]
+            for x in parts:
+                if len(x)<len(cur): subsets.append(x)
+            lsubsets=len(subsets)
+            if n>2 or len(cur)==1:
+               for x in parts:
+                   subsets.append([k for k in cur if k not in x])
+
+            if o=='con':
+               ck.out('')
+               ck.out('  Checking '+str(len(subsets))+' subset(s) of '+str(len(cur))+' choices (granularity '+str(n)+') ...')
+
+            r=check_bug_subsets({'subsets':subsets, 'pipeline':pipeline, 'pipeline_uoa':puoa,
+                                 'choices_order':corder, 'values':vals, 'removable':keys,
+                                 'fail_reason':ofr, 'same_fail_reason':sfr,
+                                 'repetitions':srm, 'workers':pw, 'affinity':paff, 'tmp_dir':tdp,
+                                 'cache':cache, 'stats':xr, 'out':o})
+            if r['return']>0: return r
+
+            f=r['failed']
+            if f!=-1:
+               cur=subsets[f]
+               fr=r['fail_reason']
+               if f<lsubsets: n=2
+               else: n=max(n-1, 2)
+            elif n<len(cur):
+               n=min(n*2, len(cur))
+            else:
+               break
+
+            # Save cache after each step (reduction may be interrupted)
+            if cf!='':
+               rx=ck.save_json_to_file({'json_file':cf, 'dict':cache})
+               if rx['return']>0: return rx
+
+        mc={}
+        rc={}
+        for k in corder:
+            if k in fixed or k in cur: mc[k]=vals[k]
+            else: rc[k]=vals[k]
+
+        if o=='con':
+           ck.out('')
+           ck.out('  Minimal failing choices ('+str(len(cur))+' of '+str(len(keys))+' removable ones; '+
+                  str(xr['checked'])+' checked, '+str(xr['cache_hits'])+' from cache):')
+           for k in corder:
+               if k in mc: ck.out('    '+k+' : '+str(mc[k]))
+
+        results.append({'reproduced':'yes',
+                        'minimal_choices':mc,
+                        'removed_choices':rc,
+                        'fail_reason':fr,
+                        'checked':xr['checked'],
+                        'cache_hits':xr['cache_hits']})
+
+    if cf!='':
+       rx=ck.save_json_to_file({'json_file':cf, 'dict':cache})
+       if rx['return']>0: return rx
+
+    return {'return':0, 'results':results}
+
+##############################################################################
+# check in parallel if subsets of choices still fail (internal, see "reduce_bug")
+
+def check_bug_subsets(i):
+    """
+    Input:  {
+              subsets          - list of lists of kept removable keys (in order of priority)
+              pipeline         - prepared pipeline
+              pipeline_uoa     - pipeline module UOA
+              choices_order    - all flat keys of failed case
+              values           - values of above keys
+              removable        - removable keys (others are always kept)
+              ...              - see "reduce_bug"
+              cache            - cache of checked subsets (updated)
+              stats            - dict with 'checked' and 'cache_hits' (updated)
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              failed       - index of first failing subset or -1
+              fail_reason  - its fail reason
+            }
+
+    """
+
+    import json
+
+    o=i.get('out','')
+
+    subsets=i['subsets']
+    corder=i['choices_order']
+    vals=i['values']
+    keys=i['removable']
+    cache=i['cache']
+    xr=i['stats']
+
+    ofr=i.get('fail_reason','')
+    sfr=i.get('same_fail_reason','')
+
+    pw=i.get('workers',1)
+    paff=i.get('affinity',[])
+
+    # Check subsets in chunks of workers (in order) and stop at first failing one
+    k=0
+    while k<len(subsets):
+        chunk=range(k, min(k+pw, len(subsets)))
+
+        ckeys={}
+        cands=[]
+        cand_idx=[]
+
+        for q in chunk:
+            x=subsets[q]
+
+            kept=[z for z in corder if z not in keys or z in x]
+            ckey=json.dumps([[z, vals[z]] for z in kept])
+            ckeys[q]=ckey
+
+            if ckey in cache:
+               xr['cache_hits']+=1
+               continue
+
+            r=copy_pipeline({'pipeline':i['pipeline']})
+            if r['return']>0: return r
+            p=r['pipeline']
+
+            for z in corder:
+                v=''
+                if z in kept: v=vals[z]
+                rx=ck.set_by_flat_key({'dict':p, 'key':z, 'value':v})
+                if rx['return']>0: return rx
+
+            p['choices_order']=kept
+
+            w=len(cands)
+            ii={'pipeline':p,
+                'pipeline_uoa':i['pipeline_uoa'],
+                'repetitions':i.get('repetitions',1),
+                'tmp_dir':i.get('tmp_dir','tmp-reduce')+'-'+str(w)}
+            if len(paff)>0:
+               ii['affinity']=paff[w % len(paff)]
+
+            cands.append(ii)
+            cand_idx.append(q)
+
+        if len(cands)>0:
+           rx=evaluate_candidates({'candidates':cands, 'workers':pw})
+           if rx['return']>0: return rx
+
+           for w in range(0, len(cands)):
+               q=cand_idx[w]
+
+               fail='no'
+               fr=''
+               for rep in rx['results'][w]['repetitions']:
+                   rr=rep['output']
+                   if rr.get('fail','')=='yes':
+                      fail='yes'
+                      fr=rr.get('fail_reason','')
+                      break
+
+               cache[ckeys[q]]={'fail':fail, 'fail_reason':fr}
+               xr['checked']+=1
+
+        for q in chunk:
+            c=cache[ckeys[q]]
+            if c['fail']=='yes' and (sfr!='yes' or c['fail_reason']==ofr):
+               if o=='con':
+                  ck.out('    subset '+str(q+1)+' of '+str(len(subsets))+' fails ('+str(len(subsets[q]))+' choices)')
+               return {'return':0, 'failed':q, 'fail_reason':c['fail_reason']}
+
+        k+=pw
+
+    return {'return':0, 'failed':-1, 'fail_reason':''}
+
+##############################################################################
+# expand wildcards in choices order and filter keys by tags (result is cached per content of choices)
+
+def expand_choices_order(i):
+    """
+    Input:  {
+              choices_desc               - dict with description of choices (flat format)
+              choices_order              - list of list of flat choice keys (may contain wildcards * and ?)
+              choices_selection          - list of dicts with selection for each above group
+                                           (tags, anytags and notags - comma separated tags to filter expanded keys)
+              (compiler_description_uoa) - compiler description (to make index key)
+              (index)                    - if 'yes', also keep index persistent in a JSON file
+              (index_file)               - JSON file with index (~/.ck-choices-index.json by default)
+            }
+
+    Output: {
+              return        - return code =  0, if successful
+                                          >  0, if error
+              (error)       - error text if return > 0
+
+              choices_order - list of list of flat choice keys (wildcards are expanded)
+              (cached)      - 'yes' if taken from index
+            }
+
+    """
+
+    import copy
+    import fnmatch
+    import hashlib
+    import json
+    import os
+    import time
+
+    cdesc=i.get('choices_desc',{})
+    corder=i.get('choices_order',[])
+    csel=i.get('choices_selection',[])
+
+    # Expand only if there are wildcards
+    wild=False
+    for q1 in corder:
+        for q2 in q1:
+            if '*' in q2 or '?' in q2:
+               wild=True
+               break
+    if not wild:
+       return {'return':0, 'choices_order':copy.deepcopy(corder)}
+
+    sel=[]
+    for q in range(0, len(corder)):
+        zz=csel[q]
+        sel.append([zz.get('tags',''), zz.get('anytags',''), zz.get('notags','')])
+
+    # Index key (compiler description, patterns and tags)
+    key=i.get('compiler_description_uoa','')+':'+hashlib.md5(json.dumps([corder, sel]).encode('utf8')).hexdigest()
+
+    # Entry is valid while content of choices used for expansion (keys, sort and tags) does not change
+    h=hashlib.md5()
+    for k in sorted(cdesc):
+        d=cdesc[k]
+        h.update(json.dumps([k, d.get('sort',0), d.get('tags',[])]).encode('utf8'))
+    dh=h.hexdigest()
+
+    # Check index in memory and on disk
+    x=choices_index.get(key,{})
+    if type(x)==dict and x.get('desc_hash','')==dh:
+       return {'return':0, 'choices_order':copy.deepcopy(x['choices_order']), 'cached':'yes'}
+
+    fi=''
+    if i.get('index','')=='yes':
+       fi=i.get('index_file','')
+       if fi=='': fi=cfg.get('choices_index_file','')
+       if fi=='': fi=os.path.join(os.path.expanduser('~'), '.ck-choices-index.json')
+
+       if os.path.isfile(fi):
+          rx=ck.load_json_file({'json_file':fi})
+          if rx['return']==0:
+             choices_index.update(rx['dict'])
+
+             x=choices_index.get(key,{})
+             if type(x)==dict and x.get('desc_hash','')==dh:
+                return {'return':0, 'choices_order':copy.deepcopy(x['choices_order']), 'cached':'yes'}
+
+    # Sort choices and split tags only once
+    skeys=sorted(cdesc, key=lambda v: cdesc[v].get('sort',0))
+
+    dv1=[] # Current dimensions
+    for iq1 in range(0,len(corder)):
+        dv=[]
+        q1=corder[iq1]
+
+        ltags=[]
+        for x in sel[iq1]:
+            y=[]
+            if x!='':
+               for j in x.split(','):
+                   j=j.strip()
+                   if j!='': y.append(j)
+            ltags.append(y)
+        ztags, zanytags, znotags=ltags
+
+        # Any of those (if anytags are set but all empty, nothing is selected)
+        zany=(sel[iq1][1]!='')
+
+        for q2 in q1:
+            if '*' in q2 or '?' in q2:
+               for k in skeys:
+                   if fnmatch.fnmatch(k,q2):
+                      yy=cdesc[k].get('tags',[])
+
+                      # Check tags (must have, any of those, none of those)
+                      add=True
+                      for j in ztags:
+                          if j not in yy:
+                             add=False
+                             break
+
+                      if add and zany:
+                         add=False
+                         for j in zanytags:
+                             if j in yy:
+                                add=True
+                                break
+
+                      if add:
+                         for j in znotags:
+                             if j in yy:
+                                add=False
+                                break
+
+                      if add:
+                         dv.append(k)
+            else:
+               dv.append(q2)
+        dv1.append(dv)
+
+    choices_index[key]={'desc_hash':dh, 'choices_order':copy.deepcopy(dv1), 'time':time.time()}
+
+    if fi!='':
+       # Keep index small (remove oldest entries)
+       n=len(choices_index)-cfg.get('choices_index_max_size',1000)
+       if n>0:
+          for k in sorted(choices_index, key=lambda v: choices_index[v].get('time',0) if type(choices_index[v])==dict else 0)[:n]:
+              del(choices_index[k])
+
+       rx=ck.save_json_to_file({'json_file':fi, 'dict':choices_index})
+       if rx['return']>0: return rx
+
+    return {'return':0, 'choices_order':dv1}
+
+##############################################################################
+# select vector of choices which was not evaluated before in this session
+
+def select_new_choices(i):
+    """
+    Input:  {
+              input        - input for "choice.make"
+              seen         - dict with hashes of already selected vectors (updated)
+              duplicates   - {
+                               retries - max number of attempts to find a new vector
+                               order   - if 'yes', order of choices matters
+                               size    - number of possible vectors (-1 if unknown)
+                             }
+              (out)        - output
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              The same as from "choice.make"
+
+              (exhausted)  - 'yes' if no new vector was found (finish is set to True)
+            }
+
+    """
+
+    import hashlib
+    import json
+
+    o=i.get('out','')
+
+    jj=i['input']
+    seen=i['seen']
+    dup=i['duplicates']
+
+    if dup['size']>=0 and len(seen)>=dup['size']:
+       if o=='con':
+          ck.out('')
+          ck.out('  All '+str(dup['size'])+' vectors of choices were already evaluated')
+       return {'return':0, 'finish':True, 'exhausted':'yes'}
+
+    n=0
+    while True:
+        r=ck.access(jj)
+        if r['return']>0: return r
+
+        if r.get('finish',True): break
+
+        # Canonical vector (empty choices are dropped)
+        cc=r.get('choices',{})
+        v=[]
+        for k in r.get('choices_order',[]):
+            x=cc.get(k,'')
+            if x!='' and x!=None:
+               v.append([k,x])
+        if dup['order']!='yes':
+           v=sorted(v, key=lambda q: q[0])
+
+        h=hashlib.md5(json.dumps(v, sort_keys=True).encode('utf8')).hexdigest()
+
+        if h not in seen:
+           seen[h]=True
+           break
+
+        n+=1
+        if n>=dup['retries']:
+           if o=='con':
+              ck.out('')
+              ck.out('  No new vector of choices after '+str(n)+' attempts - space of choices is likely exhausted')
+           r['finish']=True
+           r['exhausted']='yes'
+           break
+
+    return r
+
+##############################################################################
+# get number of possible vectors of choices (-1 if too many or unknown)
+
+def get_space_size(i):
+    """
+    Input:  {
+              choices_desc      - dict with description of choices (flat format)
+              choices_order     - list of list of flat choice keys
+              choices_selection - list of dicts with types of selection for each above group
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              size         - number of possible vectors of choices (-1 if unknown or more than 10^9)
+            }
+
+    """
+
+    cdesc=i.get('choices_desc',{})
+    corder=i.get('choices_order',[])
+    csel=i.get('choices_selection',[])
+
+    n=1
+    for q in range(0, len(corder)):
+        t={}
+        if q<len(csel): t=csel[q]
+
+        for k in corder[q]:
+            d=cdesc.get(k,{})
+
+            yhc=t.get('choice',[])
+            if len(yhc)==0: yhc=d.get('choice',[])
+            if len(yhc)==0: yhc=d.get('choices',[])
+
+            yco=t.get('can_omit','')
+            if yco=='': yco=d.get('can_omit','')
+
+            x=len(yhc)
+            if x==0:
+               r=[]
+               for k1 in ['start','stop','step']:
+                   y=t.get(k1,'')
+                   if y=='': y=d.get('explore_'+k1,'')
+                   r.append(y)
+
+               # The same number of values as in "choice.make"
+               try:
+                  x=int((float(r[1])-float(r[0])+1)/float(r[2]))
+               except (TypeError, ValueError, ZeroDivisionError):
+                  return {'return':0, 'size':-1}
+               if x<1: x=1
+
+            if yco=='yes': x+=1
+
+            n*=x
+            if n>1000000000:
+               return {'return':0, 'size':-1}
+
+    return {'return':0, 'size':n}
+
+##############################################################################
+# run all statistical repetitions of one candidate (pipeline with selected choices)
+
+def run_repetitions(i):
+    """
+    Input:  {
+              pipeline                        - pipeline with selected choices
+              pipeline_uoa                    - pipeline module UOA
+              repetitions                     - number of statistical repetitions
+              (state)                         - state preserved across iterations
+              (meta)                          - meta
+              (autotuning_iteration)          - autotuning iteration
+              (tmp_dir)                       - tmp directory to compile and run
+              (generate_rnd_tmp_dir)          - if 'yes', compile and run in randomly generated tmp directory
+              (affinity)                      - processor affinity
+              (preserve_deps_after_first_run) - if 'yes', reuse deps resolved during first repetition
+              (repetitions_ci)                - adaptive repetitions (see "check_repetitions_ci")
+              (race)                          - racing (see "check_race")
+              (shared_keys)                   - partially copied parts of pipeline (see "copy_pipeline")
+              (out)                           - output
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              repetitions  - list of {'pipeline' - pipeline after execution,
+                                      'output'   - pipeline output}
+                             (stops after first failed repetition or when confidence interval is narrow enough)
+              state        - updated state
+            }
+
+    """
+
+    import copy
+
+    o=i.get('out','')
+
+    pipeline=i['pipeline']
+    srm=i['repetitions']
+    state=i.get('state',{})
+
+    rci=i.get('repetitions_ci',{})
+    race=i.get('race',{})
+    rcil=[]
+
+    reps=[]
+
+    tdir=i.get('tmp_dir','')
+    grtd=i.get('generate_rnd_tmp_dir','')
+
+    for sr in range(0, srm):
+        rx=copy_pipeline({'pipeline':pipeline, 'shared_keys':i.get('shared_keys',None)})
+        if rx['return']>0: return rx
+        pipeline1=rx['pipeline']
+
+        pipeline1['prepare']='no'
+        pipeline1['module_uoa']=i['pipeline_uoa']
+        pipeline1['action']='pipeline'
+        pipeline1['out']=o
+        pipeline1['state']=state
+        pipeline1['meta']=i.get('meta',{})
+        pipeline1['autotuning_iteration']=i.get('autotuning_iteration',0)
+        pipeline1['statistical_repetition_number']=sr
+        pipeline1['tmp_dir']=tdir
+
+        if grtd=='yes':
+           pipeline1['generate_rnd_tmp_dir']='yes'
+        if i.get('affinity','')!='':
+           pipeline1['affinity']=i['affinity']
+
+        rr=ck.access(pipeline1)
+        if rr['return']>0: return rr
+
+        reps.append({'pipeline':pipeline1, 'output':rr})
+
+        if i.get('preserve_deps_after_first_run','')=='yes' and sr==0:
+           pipeline['dependencies']=copy.deepcopy(pipeline1.get('dependencies',{}))
+
+        state=rr.get('state',{})
+
+        # Next repetitions run the binary compiled in the random tmp directory of the first one
+        if grtd=='yes' and state.get('tmp_dir','')!='':
+           tdir=state['tmp_dir']
+           grtd=''
+
+        if rr.get('fail','')=='yes': break
+
+        if rci.get('key','')!='' or race.get('key','')!='':
+           rcil.append(pipeline1.get('characteristics',{}))
+
+        if race.get('key','')!='':
+           rx=check_race({'characteristics_list':rcil, 'race':race})
+           if rx['return']>0: return rx
+
+           if rx['stop']=='yes': break
+
+        if rci.get('key','')!='':
+           rx=check_repetitions_ci({'characteristics_list':rcil, 'ci':rci})
+           if rx['return']>0: return rx
+
+           if rx['stop']=='yes': break
+
+    return {'return':0, 'repetitions':reps, 'state':state}
+
+##############################################################################
+# copy pipeline before applying choices or running it
+# (large parts which are never changed by iterations such as choices_desc are copied
+#  only up to a given depth while the rest is shared with the original pipeline;
+#  dependencies are always copied fully since env resolution updates them in place)
+
+def copy_pipeline(i):
+    """
+    Input:  {
+              pipeline      - pipeline
+              (shared_keys) - dict {top key: number of copied levels}
+                              (if None, use "copy_on_write_pipeline_keys" from module meta;
+                               if {}, copy full pipeline)
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              pipeline     - copy of pipeline
+            }
+
+    """
+
+    import copy
+
+    p=i['pipeline']
+
+    sk=i.get('shared_keys',None)
+    if sk==None: sk=cfg.get('copy_on_write_pipeline_keys',{})
+
+    if len(sk)==0:
+       return {'return':0, 'pipeline':copy.deepcopy(p)}
+
+    pp={}
+    for k in p:
+        v=p[k]
+        if k in sk and type(v)==dict:
+           pp[k]=copy_dict_levels(v, sk[k])
+        else:
+           pp[k]=copy.deepcopy(v)
+
+    return {'return':0, 'pipeline':pp}
+
+##############################################################################
+# copy dictionary up to a given depth (deeper values are shared) (internal)
+
+def copy_dict_levels(d, n):
+    if n<=0: return d
+
+    dd={}
+    for k in d:
+        v=d[k]
+        if type(v)==dict: v=copy_dict_levels(v, n-1)
+        dd[k]=v
+
+    return dd
+
+##############################################################################
+# benchmark overhead of copying pipeline at each autotuning iteration
+
+def benchmark_copy(i):
+    """
+    Input:  {
+              (pipeline)           - prepared pipeline
+                   or
+              (pipeline_from_file) - load prepared pipeline from file
+                   or
+              (data_uoa)           - pipeline module (such as program) to prepare real pipeline
+                                     (all other keys are passed to the pipeline, for example program_uoa=...)
+                   or
+              (synthetic)          - if 'yes', use synthetic pipeline:
+                (choices)          - number of choices in choices_desc (default=1000)
+                (deps)             - number of dependencies (default=20)
+
+              (iterations)         - number of simulated autotuning iterations (default=100)
+              (repetitions)        - statistical repetitions per iteration (default=4)
+            }
+
+    Output: {
+              return               - return code =  0, if successful
+                                                 >  0, if error
+              (error)              - error text if return > 0
+
+              full_copy_time       - time per iteration with full copy of pipeline (sec.)
+              partial_copy_time    - time per iteration with partial (copy-on-write) copy of pipeline (sec.)
+              speedup              - full_copy_time / partial_copy_time
+            }
+
+    """
+
+    import copy
+    import time
+
+    o=i.get('out','')
+
+    pipeline=i.get('pipeline',{})
+    pff=i.get('pipeline_from_file','')
+    if pff!='':
+       r=ck.load_json_file({'json_file':pff})
+       if r['return']>0: return r
+       pipeline=r['dict']
+
+    if len(pipeline)==0 and i.get('data_uoa','')!='':
+       # Prepare real pipeline (as in autotuning)
+       ii=copy.deepcopy(i)
+       for k in ['action', 'cid', 'cids', 'xcids', 'pipeline', 'pipeline_from_file', 'synthetic',
+                 'choices', 'deps', 'iterations', 'repetitions']:
+           if k in ii: del(ii[k])
+
+       ii['module_uoa']=i['data_uoa']
+       ii['action']='pipeline'
+       ii['prepare']='yes'
+       ii['out']=''
+
+       pipeline=ck.access(ii)
+       if pipeline['return']>0: return pipeline
+       if pipeline.get('ready','')!='yes':
+          return {'return':1, 'error':'pipeline is not ready'}
+       del(pipeline['return'])
+
+       for q in cfg['clean_pipeline']:
+           if q in pipeline: del(pipeline[q])
+
+    if len(pipeline)==0:
+       if i.get('synthetic','')!='yes':
+          return {'return':1, 'error':'pipeline is not specified (use data_uoa=program program_uoa=... or synthetic=yes)'}
+
+       # Synthetic pipeline similar to a prepared program pipeline with compiler flags
+       nc=int(i.get('choices','')) if i.get('choices','')!='' else 1000
+       nd=int(i.get('deps','')) if i.get('deps','')!='' else 20
+
+       cd={}
+       for q in range(0, nc):
+           cd['##compiler_flags#flag'+str(q)]={'type':'text',
+                                                'desc':'compiler flag '+str(q),
+                                                'choice':['-fflag'+str(q),'-fno-flag'+str(q)],
+                                                'default':'',
+                                                'sort':q*10,
+                                                'tags':['basic','optimization']}
+
+       deps={}
+       for q in range(0, nd):
+           deps['dep'+str(q)]={'local':'yes',
+                               'name':'dependency '+str(q),
+                               'tags':'lib,dep'+str(q),
+                               'uoa':'0123456789abcdef',
+                               'dict':{'tags':['lib','dep'+str(q)],
+                                       'env':dict(('CK_ENV_DEP'+str(q)+'_'+str(x), '/path/'+str(x)) for x in range(0,20)),
+                                       'customize':{'version':'1.0.'+str(q)}},
+                               'bat':'\n'.join(['export VAR'+str(x)+'=/path/'+str(x) for x in range(0,20)])}
+
+       pipeline={'choices_desc':cd,
+                 'choices':{'compiler_flags':{}},
+                 'dependencies':deps,
+                 'features':{},
+                 'characteristics':{},
+                 'env':{}}
+
+    ni=int(i.get('iterations','')) if i.get('iterations','')!='' else 100
+    srm=int(i.get('repetitions','')) if i.get('repetitions','')!='' else 4
+
+    tt={}
+    for mode in ['full', 'partial']:
+        sk={}
+        if mode=='partial': sk=None
+
+        t=time.time()
+        for m in range(0, ni):
+            rx=copy_pipeline({'pipeline':pipeline, 'shared_keys':sk})
+            if rx['return']>0: return rx
+            p=rx['pipeline']
+
+            for sr in range(0, srm):
+                rx=copy_pipeline({'pipeline':p, 'shared_keys':sk})
+                if rx['return']>0: return rx
+
+        tt[mode]=(time.time()-t)/ni
+
+    ft=tt['full']
+    pt=tt['partial']
+
+    sp=None
+    if pt>0: sp=ft/pt
+
+    if o=='con':
+       ck.out('Pipeline copy overhead per iteration ('+str(srm)+' statistical repetitions):')
+       ck.out('')
+       ck.out('  full copy:         '+('%.6f' % ft)+' sec.')
+       ck.out('  copy-on-write:     '+('%.6f' % pt)+' sec.')
+       if sp!=None:
+          ck.out('  speedup:           '+('%.1f' % sp))
+
+    return {'return':0, 'full_copy_time':ft, 'partial_copy_time':pt, 'speedup':sp}
+
+##############################################################################
+# check if confidence interval of a characteristic is narrow enough to stop statistical repetitions
+
+def check_repetitions_ci(i):
+    """
+    Input:  {
+              characteristics_list - list of characteristics from statistical repetitions
+              ci                   - {
+                                       key          - flat key of characteristic (##characteristics#run#execution_time)
+                                       (target)     - target relative half-width of confidence interval (default=0.05)
+                                       (confidence) - confidence level (0.90, 0.95, 0.99; default=0.95)
+                                       (min)        - min number of repetitions (default=2)
+                                     }
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              stop         - 'yes' if confidence interval is narrow enough
+              relative_ci  - relative half-width of confidence interval (or None if can't be calculated)
+            }
+
+    """
+
+    ci=i['ci']
+    key=ci['key']
+
+    target=ci.get('target','')
+    if target=='': target=0.05
+    target=float(target)
+
+    conf=ci.get('confidence','')
+    if conf=='': conf=0.95
+
+    rmin=ci.get('min','')
+    if rmin=='': rmin=2
+    rmin=int(rmin)
+
+    rx=get_characteristic_values({'characteristics_list':i['characteristics_list'], 'key':key})
+    if rx['return']>0: return rx
+    vals=rx['values']
+
+    rx=get_confidence_interval({'values':vals, 'confidence':conf})
+    if rx['return']>0: return rx
+
+    rci=rx['relative_half_width']
+
+    stop=''
+    if len(vals)>=rmin and rci!=None and rci<=target:
+       stop='yes'
+
+    return {'return':0, 'stop':stop, 'relative_ci':rci}
+
+##############################################################################
+# check if candidate is worse than the best one so far (racing)
+
+def check_race(i):
+    """
+    Input:  {
+              characteristics_list - list of characteristics from statistical repetitions
+              race                 - {
+                                       key               - flat key of characteristic (##characteristics#run#execution_time)
+                                       (margin)          - relative margin (default=0.05)
+                                       (after)           - check after this number of repetitions (default=2, at least 2
+                                                             to have a confidence interval)
+                                       (reverse)         - if 'yes', larger values are better
+                                       (confidence)      - confidence level (default=0.95)
+                                       (best_mean)       - mean of the best candidate so far (None if not yet known)
+                                       (best_half_width) - half-width of its confidence interval
+                                     }
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              stop         - 'yes' if candidate is worse than the best one by more than margin
+              mean         - mean of candidate characteristic
+            }
+
+    """
+
+    race=i['race']
+
+    rx=get_characteristic_values({'characteristics_list':i['characteristics_list'], 'key':race['key']})
+    if rx['return']>0: return rx
+    vals=rx['values']
+
+    after=race.get('after','')
+    if after=='': after=2
+    after=int(after)
+
+    # A single sample has no confidence interval, so it is never compared with the best one
+    if after<2: after=2
+
+    bm=race.get('best_mean',None)
+
+    if bm==None or len(vals)<after or len(vals)==0:
+       return {'return':0, 'stop':'', 'mean':None}
+
+    margin=race.get('margin','')
+    if margin=='': margin=0.05
+    margin=float(margin)
+
+    rx=get_confidence_interval({'values':vals, 'confidence':race.get('confidence','')})
+    if rx['return']>0: return rx
+
+    mean=rx['mean']
+    hw=rx['half_width']
+    if hw==None: hw=0.0
+
+    bhw=race.get('best_half_width',None)
+    if bhw==None: bhw=0.0
+
+    # Compare the most optimistic value of candidate with the most pessimistic value of the best one
+    stop=''
+    if race.get('reverse','')=='yes':
+       if (mean+hw)<(bm-bhw)*(1.0-margin): stop='yes'
+    else:
+       if (mean-hw)>(bm+bhw)*(1.0+margin): stop='yes'
+
+    return {'return':0, 'stop':stop, 'mean':mean}
+
+##############################################################################
+# update the best candidate for racing (with characteristics of a finished candidate)
+
+def update_race(i):
+    """
+    Input:  {
+              characteristics_list - list of characteristics from statistical repetitions
+              race                 - see "check_race" (updated in place)
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              updated      - 'yes' if candidate is the new best one
+            }
+
+    """
+
+    race=i['race']
+
+    rx=get_characteristic_values({'characteristics_list':i['characteristics_list'], 'key':race['key']})
+    if rx['return']>0: return rx
+    vals=rx['values']
+
+    rx=get_confidence_interval({'values':vals, 'confidence':race.get('confidence','')})
+    if rx['return']>0: return rx
+
+    mean=rx['mean']
+    if mean==None:
+       return {'return':0, 'updated':''}
+
+    hw=rx['half_width']
+    if hw==None: hw=0.0
+
+    bm=race.get('best_mean',None)
+
+    updated=''
+    if bm==None or (race.get('reverse','')=='yes' and mean>bm) or (race.get('reverse','')!='yes' and mean<bm):
+       race['best_mean']=mean
+       race['best_half_width']=hw
+       updated='yes'
+
+    return {'return':0, 'updated':updated}
+
+##############################################################################
+# get values of a characteristic from statistical repetitions
+
+def get_characteristic_values(i):
+    """
+    Input:  {
+              characteristics_list - list of characteristics from statistical repetitions
+              key                  - flat key of characteristic (##characteristics#run#execution_time)
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              values       - list of float values (skipping missing ones)
+            }
+
+    """
+
+    vals=[]
+    for c in i['characteristics_list']:
+        rx=ck.get_by_flat_key({'dict':{'characteristics':c}, 'key':i['key']})
+        if rx['return']>0: return rx
+        v=rx['value']
+        if v!=None and v!='':
+           vals.append(float(v))
+
+    return {'return':0, 'values':vals}
+
+##############################################################################
+# calculate confidence interval of the mean (Student's t-distribution)
+
+t_quantiles={'0.90':[6.314, 2.920, 2.353, 2.132, 2.015, 1.943, 1.895, 1.860, 1.833, 1.812,
+                     1.796, 1.782, 1.771, 1.761, 1.753, 1.746, 1.740, 1.734, 1.729, 1.725],
+             '0.95':[12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+                     2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086],
+             '0.99':[63.657, 9.925, 5.841, 4.604, 4.032, 3.707, 3.499, 3.355, 3.250, 3.169,
+                     3.106, 3.055, 3.012, 2.977, 2.947, 2.921, 2.898, 2.878, 2.861, 2.845]}
+
+# degrees of freedom 25 and 30 (used for all larger ones)
+t_quantiles_large={'0.90':[1.708, 1.697],
+                   '0.95':[2.060, 2.042],
+                   '0.99':[2.787, 2.750]}
+
+def get_confidence_interval(i):
+    """
+    Input:  {
+              values       - list of values
+              (confidence) - confidence level (0.90, 0.95, 0.99; default=0.95)
+            }
+
+    Output: {
+              return              - return code =  0, if successful
+                                                >  0, if error
+              (error)             - error text if return > 0
+
+              mean                - mean (or None if no values)
+              half_width          - half-width of confidence interval (or None if less than 2 values)
+              relative_half_width - half_width/mean (or None)
+            }
+
+    """
+
+    import math
+
+    vals=i['values']
+
+    conf=i.get('confidence','')
+    if conf=='': conf=0.95
+    conf='%.2f' % float(conf)
+    if conf not in t_quantiles:
+       return {'return':1, 'error':'confidence level '+conf+' is not supported (0.90, 0.95 or 0.99)'}
+
+    n=len(vals)
+    if n==0:
+       return {'return':0, 'mean':None, 'half_width':None, 'relative_half_width':None}
+
+    mean=sum(vals)/n
+
+    if n<2:
+       return {'return':0, 'mean':mean, 'half_width':None, 'relative_half_width':None}
+
+    var=sum([(v-mean)**2 for v in vals])/(n-1)
+
+    # take the closest smaller degree of freedom from the table (conservative)
+    df=n-1
+    if df<25: t=t_quantiles[conf][min(df,20)-1]
+    elif df<30: t=t_quantiles_large[conf][0]
+    else: t=t_quantiles_large[conf][1]
+
+    hw=t*math.sqrt(var/n)
+
+    rhw=None
+    if mean!=0: rhw=hw/abs(mean)
+
+    return {'return':0, 'mean':mean, 'half_width':hw, 'relative_half_width':rhw}
+
+##############################################################################
+# evaluate candidates in parallel worker processes (each process runs all statistical repetitions of one candidate)
+
+def evaluate_candidates(i):
+    """
+    Input:  {
+              candidates   - list of inputs for "run_repetitions"
+              (workers)    - max number of parallel worker processes
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              results      - list of outputs of "run_repetitions" in the same order as candidates
+            }
+
+    """
+
+    cands=i['candidates']
+    lc=len(cands)
+
+    pw=int(i.get('workers',1))
+
+    results=[None]*lc
+
+    # Workers inherit initialized CK kernel, so we need fork
+    mp=None
+    if pw>1:
+       mp=get_fork_context()
+
+    if mp==None:
+       for w in range(0, lc):
+           r=run_repetitions(cands[w])
+           if r['return']>0: return r
+           results[w]=r
+
+       return {'return':0, 'results':results}
+
+    try:
+       import Queue as queue
+    except ImportError:
+       import queue
+
+    k=0
+    while k<lc:
+        q=mp.Queue()
+
+        procs=[]
+        for w in range(k, min(k+pw, lc)):
+            p=mp.Process(target=run_repetitions_worker, args=(cands[w], w, q))
+            p.start()
+            procs.append(p)
+
+        finished=False
+        try:
+           n=0
+           while n<len(procs):
+               try:
+                  w, r=q.get(True, 1)
+               except queue.Empty:
+                  alive=False
+                  for p in procs:
+                      if p.is_alive():
+                         alive=True
+                         break
+                  if not alive and q.empty():
+                     return {'return':1, 'error':'parallel worker terminated without returning results'}
+                  continue
+
+               if r['return']>0: return r
+
+               results[w]=r
+               n+=1
+
+           finished=True
+        finally:
+           # Do not leave workers running benchmarks after errors
+           for p in procs:
+               if not finished and p.is_alive(): p.terminate()
+               p.join()
+
+        k+=len(procs)
+
+    return {'return':0, 'results':results}
+
+##############################################################################
+# get multiprocessing context which forks (to inherit initialized CK kernel) or None if not supported
+
+def get_fork_context():
+    import os
+    import multiprocessing
+
+    try:
+       return multiprocessing.get_context('fork')
+    except ValueError:
+       # Not supported on this OS
+       pass
+    except AttributeError:
+       # Python 2 forks on POSIX
+       if os.name=='posix': return multiprocessing
+
+    return None
+
+##############################################################################
+# start compilation of a candidate in a background process (overlapped compile/run)
+
+builds={} # background builds (process, queue, output)
+
+def start_build(i):
+    """
+    Input:  {
+              pipeline               - pipeline with selected choices
+              pipeline_uoa           - pipeline module UOA
+              tmp_dir                - tmp directory to compile program
+              (state)                - state preserved across iterations
+              (meta)                 - meta
+              (autotuning_iteration) - autotuning iteration
+              (affinity)             - processor affinity for compilation
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              id           - build ID (for "wait_build")
+            }
+
+    """
+
+    import copy
+
+    r=copy_pipeline({'pipeline':i['pipeline']})
+    if r['return']>0: return r
+    pipeline1=r['pipeline']
+
+    pipeline1['prepare']='no'
+    pipeline1['module_uoa']=i['pipeline_uoa']
+    pipeline1['action']='pipeline'
+    pipeline1['out']=''
+    pipeline1['state']=copy.deepcopy(i.get('state',{}))
+    pipeline1['meta']=i.get('meta',{})
+    pipeline1['autotuning_iteration']=i.get('autotuning_iteration',0)
+    pipeline1['statistical_repetition_number']=0
+    pipeline1['tmp_dir']=i['tmp_dir']
+    pipeline1['no_run']='yes'
+
+    if i.get('affinity','')!='':
+       pipeline1['compile_affinity']=i['affinity']
+
+    r=ck.gen_uid({})
+    if r['return']>0: return r
+    bid=r['data_uid']
+
+    b={}
+
+    # Builds inherit initialized CK kernel, so we need fork
+    mp=get_fork_context()
+
+    if mp==None:
+       # Compile now
+       try:
+          r=ck.access(pipeline1)
+       except Exception as e:
+          r={'return':1, 'error':'build failed ('+format(e)+')'}
+       b['output']=r
+    else:
+       q=mp.Queue()
+       p=mp.Process(target=build_worker, args=(pipeline1, q))
+       p.start()
+
+       b['process']=p
+       b['queue']=q
+
+    builds[bid]=b
+
+    return {'return':0, 'id':bid}
+
+##############################################################################
+# background build process (internal)
+
+def build_worker(i, q):
+    try:
+       r=ck.access(i)
+    except Exception as e:
+       r={'return':1, 'error':'build failed ('+format(e)+')'}
+
+    q.put(r)
+
+    return
+
+##############################################################################
+# wait until candidate is compiled in background (overlapped compile/run)
+
+def wait_build(i):
+    """
+    Input:  {
+              id           - build ID (from "start_build")
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              output       - output of pipeline (compilation only)
+            }
+
+    """
+
+    try:
+       import Queue as queue
+    except ImportError:
+       import queue
+
+    bid=i['id']
+
+    b=builds.get(bid,None)
+    if b==None:
+       return {'return':1, 'error':'build '+bid+' not found'}
+
+    if 'output' not in b:
+       p=b['process']
+       q=b['queue']
+
+       while True:
+           try:
+              r=q.get(True, 1)
+              break
+           except queue.Empty:
+              if not p.is_alive() and q.empty():
+                 del(builds[bid])
+                 return {'return':1, 'error':'build process terminated without returning results'}
+
+       p.join()
+
+       b['output']=r
+
+    del(builds[bid])
+
+    r=b['output']
+    if r['return']>0: return r
+
+    return {'return':0, 'output':r}
+
+##############################################################################
+# parallel worker process (internal)
+
+def run_repetitions_worker(i, w, q):
+    try:
+       r=run_repetitions(i)
+    except Exception as e:
+       r={'return':1, 'error':'parallel worker failed ('+format(e)+')'}
+
+    q.put((w, r))
+
+    return
+
+##############################################################################
+# write-behind recording of experiments (internal)
+#
+# Experiments are serialized to JSON by the main process and recorded by a forked
+# writer process with its own copy of CK kernel (kernel is not thread safe).
+
+write_behind={} # active writers (process, queues, number of sent and recorded experiments, last result)
+
+def start_write_behind(i):
+    """
+    Input:  {
+              (batch)      - max number of experiments waiting for the writer (default=8)
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              id           - writer ID ('' if fork is not supported)
+            }
+
+    """
+
+    batch=i.get('batch','')
+    if batch=='': batch=8
+    batch=int(batch)
+    if batch<1: batch=1
+
+    ctx=get_fork_context()
+    if ctx==None:
+       return {'return':0, 'id':''}
+
+    r=ck.gen_uid({})
+    if r['return']>0: return r
+    wid=r['data_uid']
+
+    qin=ctx.Queue()
+    qout=ctx.Queue()
+
+    p=ctx.Process(target=write_behind_worker, args=(qin, qout))
+    p.daemon=True
+    p.start()
+
+    write_behind[wid]={'process':p,
+                       'input':qin,
+                       'output':qout,
+                       'batch':batch,
+                       'sent':0,
+                       'recorded':0,
+                       'recorded_uid':'',
+                       'dict_flat':{}}
+
+    return {'return':0, 'id':wid}
+
+##############################################################################
+# writer process: record experiments from queue (internal)
+
+def write_behind_worker(qin, qout):
+    import json
+
+    while True:
+        s=qin.get()
+        if s==None: break
+
+        r=ck.access(json.loads(s))
+
+        qout.put(json.dumps({'return':r['return'],
+                             'error':r.get('error',''),
+                             'recorded_uid':r.get('recorded_uid',''),
+                             'dict_flat':r.get('dict_flat',{})}))
+
+        if r['return']>0: break
+
+    return
+
+##############################################################################
+# collect results of recorded experiments from writer (internal)
+
+def collect_write_behind(i):
+    """
+    Input:  {
+              id           - writer ID
+              (wait)       - number of experiments which may stay in queue (wait until other are recorded);
+                             if '', do not wait
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error (also if writer failed to record experiment)
+              (error)      - error text if return > 0
+
+              recorded     - number of recorded experiments
+            }
+
+    """
+
+    import json
+
+    try:
+       import Queue as queue
+    except ImportError:
+       import queue
+
+    wr=write_behind.get(i['id'],None)
+    if wr==None:
+       return {'return':1, 'error':'write-behind writer '+i['id']+' is not started'}
+
+    w=i.get('wait','')
+
+    while wr['recorded']<wr['sent']:
+        block=(w!='' and wr['sent']-wr['recorded']>int(w))
+
+        try:
+           s=wr['output'].get(block, 1)
+        except queue.Empty:
+           if not block: break
+           if not wr['process'].is_alive():
+              return {'return':1, 'error':'write-behind writer terminated before recording all experiments'}
+           continue
+
+        r=json.loads(s)
+        if r['return']>0:
+           return {'return':r['return'], 'error':'write-behind writer failed to record experiment ('+r['error']+')'}
+
+        wr['recorded']+=1
+        if r['recorded_uid']!='': wr['recorded_uid']=r['recorded_uid']
+        wr['dict_flat']=r['dict_flat']
+
+    return {'return':0, 'recorded':wr['recorded']}
+
+##############################################################################
+# queue experiment for write-behind recording (internal)
+
+def add_to_write_behind(i):
+    """
+    Input:  {
+              id           - writer ID
+              input        - input for 'experiment add'
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              queued       - number of experiments waiting for the writer
+            }
+
+    """
+
+    import json
+
+    wr=write_behind.get(i['id'],None)
+    if wr==None:
+       return {'return':1, 'error':'write-behind writer '+i['id']+' is not started'}
+
+    # Wait if writer is too far behind
+    r=collect_write_behind({'id':i['id'], 'wait':wr['batch']-1})
+    if r['return']>0: return r
+
+    # Serialized experiment is a full copy (the main loop continues to update its dicts)
+    try:
+       s=json.dumps(i['input'])
+    except Exception as e:
+       return {'return':1, 'error':'can\'t serialize experiment for write-behind recording ('+format(e)+')'}
+
+    wr['input'].put(s)
+    wr['sent']+=1
+
+    return {'return':0, 'queued':wr['sent']-wr['recorded']}
+
+##############################################################################
+# wait until writer records all queued experiments and stop it (internal)
+
+def stop_write_behind(i):
+    """
+    Input:  {
+              id           - writer ID
+              (out)        - output
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              recorded     - number of recorded experiments
+              recorded_uid - UID of entry with the last recorded experiment
+              dict_flat    - stat analysis of the last recorded experiment
+            }
+
+    """
+
+    wr=write_behind.get(i['id'],None)
+    if wr==None:
+       return {'return':1, 'error':'write-behind writer '+i['id']+' is not started'}
+
+    if i.get('out','')=='con' and wr['sent']>wr['recorded']:
+       ck.out('')
+       ck.out('Waiting for recording of '+str(wr['sent']-wr['recorded'])+' queued experiment(s) ...')
+
+    r=collect_write_behind({'id':i['id'], 'wait':0})
+
+    wr['input'].put(None)
+
+    p=wr['process']
+    p.join(10)
+    if p.is_alive():
+       p.terminate()
+       p.join()
+
+    del(write_behind[i['id']])
+
+    if r['return']>0: return r
+
+    return {'return':0, 'recorded':wr['recorded'], 'recorded_uid':wr['recorded_uid'], 'dict_flat':wr['dict_flat']}
+
+##############################################################################
+# start hierarchical timer of autotuning step (None - timers are not used)
+# (the only implementation of timers - program pipeline loads this module to add its sections as nested timers)
+
+def start_timer(t, name, cat='autotuning'):
+    import time
+
+    if t==None: return
+
+    t['stack'].append({'name':name, 'cat':cat, 'start':time.time()})
+
+    return
+
+##############################################################################
+# stop timer (nested timers which were not stopped are stopped too)
+# and record it as a complete event of Chrome trace format (microseconds)
+
+def stop_timer(t, name):
+    import os
+    import time
+
+    if t==None: return
+
+    found=False
+    for x in t['stack']:
+        if x['name']==name:
+           found=True
+           break
+    if not found: return
+
+    tt=time.time()
+    pid=os.getpid()
+
+    while len(t['stack'])>0:
+        x=t['stack'].pop()
+
+        t['events'].append({'name':x['name'],
+                            'cat':x['cat'],
+                            'ph':'X',
+                            'ts':int(x['start']*1000000),
+                            'dur':int((tt-x['start'])*1000000),
+                            'pid':pid,
+                            'tid':0})
+
+        if x['name']==name: break
+
+    return
+
+##############################################################################
+# stop all timers nested in parent timer and start the next step
+
+def timer_section(t, parent, name, cat='autotuning'):
+    if t==None: return
+
+    for q in range(len(t['stack'])-1, -1, -1):
+        if t['stack'][q]['name']==parent:
+           while len(t['stack'])>q+1:
+              stop_timer(t, t['stack'][-1]['name'])
+           break
+
+    start_timer(t, name, cat)
+
+    return
+
+##############################################################################
+# total time and number of calls per timer name (seconds)
+
+def timer_summary(t):
+    s={}
+
+    for e in t.get('events',[]):
+        n=e['name']
+        if n not in s: s[n]={'total_time':0.0, 'count':0}
+        s[n]['total_time']+=e['dur']/1000000.0
+        s[n]['count']+=1
+
+    return s
+
+##############################################################################
+# save timers to Chrome trace event file (chrome://tracing, Perfetto)
+
+def save_trace(t, fn):
+    return ck.save_json_to_file({'json_file':fn,
+                                 'dict':{'traceEvents':t.get('events',[]),
+                                         'displayTimeUnit':'ms'}})
+
 ##############################################################################
 # Run pipeline once ...
 
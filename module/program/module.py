@@ -14,6 +14,11 @@ ck=None # Will be updated by CK (initialized CK kernel)
 # Local settings
 sep='***************************************************************************************'
 
+prepare_cache={} # persistent cache of pipeline preparation (see "load_prepare_cache")
+resolve_cache={} # persistent cache of resolved dependencies (see "resolve_deps")
+direct_exec_env={} # environment after setup part of scripts (see "prepare_direct_exec")
+timers_code={} # code of pipeline module with timers (see "get_timers_code")
+
 ##############################################################################
 # Initialize module
 
@@ -235,6 +240,7 @@ def process_in_dir(i):
 
               (affinity)             - set processor affinity for tihs program run (if supported by OS - see "affinity" in OS)
                                        examples: 0 ; 0,1 ; 0-3 ; 4-7  (the last two can be useful for ARM big.LITTLE arhictecture
+              (compile_affinity)     - set processor affinity for compilation (if supported by OS - see "affinity" in OS)
 
               (clean)                - if 'yes', clean tmp directory before using
               (skip_clean_after)     - if 'yes', do not remove run batch
@@ -263,6 +269,8 @@ def process_in_dir(i):
               (deps)                 - already resolved deps (useful for auto-tuning)
               (deps_cache)           - list of already resolved deps (useful to automate crowd-benchmarking and crowd-tuning)
               (reuse_deps)           - if 'yes', reuse deps by keys
+              (resolve_cache)        - if 'yes', reuse deps resolved in earlier sessions (see "resolve_deps")
+              (resolve_cache_file)   - JSON file with resolved deps (~/.ck-resolve-cache.json by default)
 
               (cmd_key)              - CMD key
               (dataset_uoa)          - UOA of a dataset
@@ -307,6 +315,18 @@ def process_in_dir(i):
               (compile_timeout)               - (sec.) - kill compile job if too long
               (run_timeout)                   - (sec.) - kill run job if too long
 
+              (direct_exec)                   - if 'yes', launch compiler and program directly via subprocess
+                                                with environment and argv instead of a generated batch script
+                                                (local Linux host only; falls back to batch script if not supported)
+
+              (binary_cache)                  - if 'yes', reuse binaries built earlier (in this or previous sessions)
+                                                for the same sources, compiler environment, flags, compiler vars and link flags
+                                                (compilation_time is then the time to restore binary, and
+                                                 binary_cache_hit is set in characteristics)
+              (binary_cache_dir)              - directory of the binary cache (~/.ck-binary-cache by default)
+              (binary_cache_max_size)         - (MB) max size of the binary cache - least recently used binaries
+                                                will be removed (see "binary_cache_max_size" in program module meta)
+
               (add_rnd_extension_to_bin)      - if 'yes', add random extension to binary and record list
               (add_save_extension_to_bin)     - if 'yes', add '.save' to bin to save during cleaning ...
 
@@ -332,6 +352,9 @@ def process_in_dir(i):
 
               (skip_exec)            - if 'yes', do not clean output files and skip exec to be able to continue
                                        post-processing during debuging
+
+              (timers)               - dict with phase timers from program pipeline
+                                       (compile and run phases are added as nested timers)
             }
 
     Output: {
@@ -363,6 +386,9 @@ def process_in_dir(i):
 
     sa=i['sub_action']
 
+    tmr=i.get('timers',None)
+    start_timer(tmr, sa)
+
     sdi=i.get('skip_device_init','')
 
     sca=i.get('skip_clean_after','')
@@ -385,6 +411,8 @@ def process_in_dir(i):
 
     deps=i.get('deps',{})
     reuse_deps=i.get('reuse_deps','')
+    rvcache=i.get('resolve_cache','')
+    rvcache_file=i.get('resolve_cache_file','')
     deps_cache=i.get('deps_cache',[])
 
     # Check user-friendly env and params
@@ -440,6 +468,12 @@ def process_in_dir(i):
     xcto=i.get('compile_timeout','')
     xrto=i.get('run_timeout','')
 
+    dexec=i.get('direct_exec','')
+
+    bcache=i.get('binary_cache','')
+    bcache_dir=i.get('binary_cache_dir','')
+    bcache_max=i.get('binary_cache_max_size','')
+
     pp_uoa=i.get('post_process_script_uoa','')
     pp_name=i.get('post_process_subscript','')
     pp_params=i.get('post_process_params','')
@@ -671,6 +705,10 @@ def process_in_dir(i):
     if aff!='':
        aff=tosd.get('set_affinity','').replace('$#ck_affinity#$',aff)
 
+    caff=i.get('compile_affinity','')
+    if caff!='':
+       caff=tosd.get('set_affinity','').replace('$#ck_affinity#$',caff)
+
     ########################################################################
     # Check sudo
 
@@ -866,7 +904,7 @@ def process_in_dir(i):
            'safe':safe}
        if o=='con': ii['out']='con'
 
-       rx=ck.access(ii)
+       rx=resolve_deps({'input':ii, 'cache':rvcache, 'cache_file':rvcache_file})
        if rx['return']>0: return rx
 
        if sa=='compile' or remote!='yes':
@@ -1284,6 +1322,8 @@ def process_in_dir(i):
           sobje=denv.get('CK_OBJ_EXT','')
           sofs=''
           xsofs=[]
+          bc_files=[] # compiled source files for binary cache key
+          bc_all=''   # if 'yes', hash all files of program (sources are not known)
 
           if ee!='':
              sb+='\n'+no+ee+'\n\n'
@@ -1338,6 +1378,8 @@ def process_in_dir(i):
           if meta.get('use_compile_script','')=='yes':
              cc=sccmd
 
+             bc_all='yes'
+
              # Add compiler and linker flags as environment
              sb+='\n'
              genv={'CK_PROG_COMPILER_FLAGS_BEFORE':xcfb,
@@ -1392,9 +1434,13 @@ def process_in_dir(i):
 
                     full_path=os.path.join(rb['path'],sf)
 
+                    bc_files.append(full_path)
+
                  else:
                     full_path=os.path.join(sfprefix,sf)
 
+                    bc_files.append(full_path)
+
                  sf0,sf1=os.path.splitext(sf)
 
                  sf00=os.path.basename(sf)
@@ -1518,40 +1564,108 @@ def process_in_dir(i):
           if bex!='':
              sb+='\n\n'+bex.replace('$#return_code#$','0')
 
-          # Record to tmp batch and run
-          rx=ck.gen_tmp_file({'prefix':'tmp-', 'suffix':sext, 'remove_dir':'yes'})
-          if rx['return']>0: return rx
-          fn=rx['file_name']
+          # Check if binary is already in cache
+          bc_key=''
+          bc_hit=False
+          if bcache=='yes' and target_exe!='' and are!='yes' and meta.get('no_compile','')!='yes':
+             # Tmp dir should not influence key
+             x=sb.replace(rcdir,'')
+
+             rx=get_binary_cache_key({'batch':x,
+                                      'path':p,
+                                      'files':bc_files,
+                                      'all_files':bc_all,
+                                      'extra':cver})
+             if rx['return']>0: return rx
+             bc_key=rx['key']
 
-          rx=ck.save_text_file({'text_file':fn, 'string':sb})
-          if rx['return']>0: return rx
+             bc_start=time.time()
 
-          y=''
-          if sexe!='':
-             y+=sexe+' '+sbp+fn+envsep
-          y+=' '+scall+' '+sbp+fn
+             rbc=restore_from_binary_cache({'cache_dir':bcache_dir,
+                                            'key':bc_key,
+                                            'target_exe':target_exe,
+                                            'obj_files':xsofs})
+             if rbc['return']>0: return rbc
 
-          if o=='con':
-             ck.out('')
-             ck.out('Executing prepared batch file '+fn+' ...')
-             ck.out('')
+             if rbc['found']=='yes':
+                bc_hit=True
 
-          sys.stdout.flush()
-          start_time1=time.time()
+                misc['binary_cache_hit']='yes'
+                ccc['binary_cache_hit']='yes'
+                ccc['binary_cache_restore_time']=time.time()-bc_start
+                ccc['binary_cache_compilation_time']=rbc['compilation_time']
 
-          if ubtr!='': y=ubtr.replace('$#cmd#$',y)
+                if o=='con':
+                   ck.out('')
+                   ck.out('Reusing binary from cache (key='+bc_key+') ...')
 
-          ############################################## Compiling code here ##############################################
+          fn=''
+          rry=0
           rx=0
-          ry=ck.system_with_timeout({'cmd':y, 'timeout':xcto})
-          rry=ry['return']
 
-          if rry>0:
-             if rry!=8: return ry
+          if bc_hit:
+             # Real time spent to get binary (original compilation time is kept separately)
+             comp_time=ccc['binary_cache_restore_time']
           else:
-             rx=ry['return_code']
+             # Check if can run commands directly (without batch file)
+             dplan=None
+             if dexec=='yes' and hplat=='linux' and caff=='' and ubtr=='':
+                rx=prepare_direct_exec({'script':sb, 'quit_if_error':sqie})
+                if rx['return']>0: return rx
+                dplan=rx.get('plan',None)
+
+             y=''
+             if dplan!=None:
+                if o=='con':
+                   ck.out('')
+                   ck.out('Executing prepared commands directly ...')
+                   ck.out('')
+             else:
+                # Record to tmp batch and run
+                rx=ck.gen_tmp_file({'prefix':'tmp-', 'suffix':sext, 'remove_dir':'yes'})
+                if rx['return']>0: return rx
+                fn=rx['file_name']
+
+                rx=ck.save_text_file({'text_file':fn, 'string':sb})
+                if rx['return']>0: return rx
+
+                if sexe!='':
+                   y+=sexe+' '+sbp+fn+envsep
+                y+=' '+scall+' '+sbp+fn
+
+                if o=='con':
+                   ck.out('')
+                   ck.out('Executing prepared batch file '+fn+' ...')
+                   ck.out('')
+
+             sys.stdout.flush()
+             start_time1=time.time()
+
+             if caff!='': y=caff+' '+y
+
+             if ubtr!='': y=ubtr.replace('$#cmd#$',y)
+
+             ############################################## Compiling code here ##############################################
+             start_timer(tmr, 'compiler execution')
+
+             rx=0
+             if dplan!=None:
+                ry=run_direct_exec({'plan':dplan, 'timeout':xcto, 'out':o})
+             else:
+                ry=ck.system_with_timeout({'cmd':y, 'timeout':xcto})
+             rry=ry['return']
+
+             stop_timer(tmr, 'compiler execution')
+
+             if rry>0:
+                if rry!=8: return ry
+             else:
+                rx=ry['return_code']
+
+             comp_time=time.time()-start_time1
+             if dplan!=None and rry==0:
+                comp_time=ry['exec_time']
 
-          comp_time=time.time()-start_time1
           ccc['compilation_time']=comp_time
 
           if sca!='yes':
@@ -1617,6 +1731,18 @@ def process_in_dir(i):
                        ofs+=ofs1
                 ccc['obj_size']=ofs
 
+             # Save new binary to cache
+             if bc_key!='' and not bc_hit and os.path.isfile(target_exe):
+                if bcache_max=='': bcache_max=cfg.get('binary_cache_max_size','')
+
+                rx=add_to_binary_cache({'cache_dir':bcache_dir,
+                                        'key':bc_key,
+                                        'target_exe':target_exe,
+                                        'obj_files':xsofs,
+                                        'compilation_time':comp_time,
+                                        'max_size':bcache_max})
+                if rx['return']>0: return rx
+
           ccc['compilation_time_with_module']=time.time()-start_time
 
           if o=='con':
@@ -1625,6 +1751,7 @@ def process_in_dir(i):
                 s='Warning: This program doesn\'t require compilation ...'
              else:
                 s='Compilation time: '+('%.3f'%comp_time)+' sec.'
+                if bc_hit: s+=' (restored from binary cache)'
 
                 if meta.get('no_target_file','')!='yes':
                    s+='; Object size: '+str(ofs)+'; Total binary size: '+str(tbs)+'; MD5: '+md5
@@ -1795,6 +1922,8 @@ def process_in_dir(i):
                                 'deps':deps,
                                 'deps_cache':deps_cache,
                                 'reuse_deps':reuse_deps,
+                                'resolve_cache':rvcache,
+                                'resolve_cache_file':rvcache_file,
                                 'meta':meta,
                                 'cmd_key':kcmd,
                                 'cmd_meta':vcmd,
@@ -2660,23 +2789,35 @@ def process_in_dir(i):
 
           if o=='con':  ck.out(sep)
 
-          # Prepare tmp batch file with run instructions
-          rx=ck.gen_tmp_file({'prefix':'tmp-', 'suffix':sext, 'remove_dir':'yes'})
-          if rx['return']>0: return rx
-          fn=rx['file_name']
+          # Check if can run program directly (without batch file)
+          dplan=None
+          if dexec=='yes' and hplat=='linux' and remote!='yes' and isd!='yes' and ubtr=='' and skip_exec!='yes':
+             rx=prepare_direct_exec({'script':sb, 'quit_if_error':sqie})
+             if rx['return']>0: return rx
+             dplan=rx.get('plan',None)
 
-          xbbp=bbp
-          if remote=='yes':
-             xbbp=bbpt
+          fn=''
+          if dplan==None:
+             # Prepare tmp batch file with run instructions
+             rx=ck.gen_tmp_file({'prefix':'tmp-', 'suffix':sext, 'remove_dir':'yes'})
+             if rx['return']>0: return rx
+             fn=rx['file_name']
 
-          if xbbp!='':
-             sb=bbp+'\n\n'+sb
+             xbbp=bbp
+             if remote=='yes':
+                xbbp=bbpt
 
-          rx=ck.save_text_file({'text_file':fn, 'string':sb})
-          if rx['return']>0: return rx
+             if xbbp!='':
+                sb=bbp+'\n\n'+sb
+
+             rx=ck.save_text_file({'text_file':fn, 'string':sb})
+             if rx['return']>0: return rx
 
           # Prepare execution
-          if remote=='yes' and meta.get('run_via_third_party','')!='yes':
+          if dplan!=None:
+             y='(direct execution)'
+
+          elif remote=='yes' and meta.get('run_via_third_party','')!='yes':
              # Copy above batch file to remote device
              y=tosd.get('remote_push','').replace('$#device#$',xtdid)
              y=y.replace('$#file1#$', fn)
@@ -2760,10 +2901,15 @@ def process_in_dir(i):
           sys.stdout.flush()
           start_time1=time.time()
 
+          start_timer(tmr, 'program execution')
+
           rx=0
           rry=0
           if skip_exec!='yes':
-             ry=ck.system_with_timeout({'cmd':y, 'timeout':xrto})
+             if dplan!=None:
+                ry=run_direct_exec({'plan':dplan, 'timeout':xrto, 'out':o})
+             else:
+                ry=ck.system_with_timeout({'cmd':y, 'timeout':xrto})
              rry=ry['return']
              if rry>0:
                 if rry!=8: return ry
@@ -2774,6 +2920,12 @@ def process_in_dir(i):
              ck.out('      * skiped execution ... *')
 
           exec_time=time.time()-start_time1
+
+          # Only child process is timed in direct execution
+          if dplan!=None and rry==0:
+             exec_time=ry['exec_time']
+
+          stop_timer(tmr, 'program execution')
           # Hack to fix occasional strange effect when time.time() is 0
           if exec_time<0: exec_time=-exec_time
 
@@ -2839,6 +2991,8 @@ def process_in_dir(i):
                         ck.out('      '+q1)
 
           # Check if post-processing script from CMD
+          start_timer(tmr, 'post-processing')
+
           if pp_uoa!='':
              if o=='con':
                 ck.out('')
@@ -3130,6 +3284,8 @@ def process_in_dir(i):
                 ck.out(json.dumps(drq, indent=2, sort_keys=True))
                 ck.out('')
 
+          stop_timer(tmr, 'post-processing')
+
           # If return code >0 and program does not ignore return code, quit
           if (rx>0 and vcmd.get('ignore_return_code','').lower()!='yes') or rry>0:
              break
@@ -3225,6 +3381,8 @@ def process_in_dir(i):
        rcvars=rt.get('run_correctness_vars',[])
 
        if ccc['run_success_bool'] and len(rcof)>0 and i.get('skip_output_validation','')!='yes':
+          start_timer(tmr, 'output validation')
+
           ck.out('')
           ck.out('  (checking output correctness ...)')
 
@@ -3401,6 +3559,8 @@ def process_in_dir(i):
              misc['output_check_failures']=vo
              ccc['output_check_failures']=vo
 
+          stop_timer(tmr, 'output validation')
+
        # Output final execution time
        if o=='con' and rt.get('skip_print_execution_time','')!='yes':
           ck.out('')
@@ -3423,6 +3583,8 @@ def process_in_dir(i):
        ck.out('Program execution likely failed ('+misc.get('fail_reason','')+')!')
        ck.out('')
 
+    stop_timer(tmr, sa)
+
     return {'return':0, 'tmp_dir':rcdir, 'misc':misc, 'characteristics':ccc, 'deps':deps}
 
 ##############################################################################
@@ -3611,6 +3773,7 @@ def pipeline(i):
 
               (affinity)             - set processor affinity for tihs program run (if supported by OS - see "affinity" in OS)
                                        examples: 0 ; 0,1 ; 0-3 ; 4-7  (the last two can be useful for ARM big.LITTLE arhictecture
+              (compile_affinity)     - set processor affinity for compilation (if supported by OS - see "affinity" in OS)
 
               (repeat)               - repeat kernel via environment CT_REPEAT_MAIN if supported
               (do_not_reuse_repeat)  - if 'yes', do not reuse repeat across iterations - needed for dataset exploration, for example
@@ -3653,6 +3816,26 @@ def pipeline(i):
               (compile_timeout)         - (sec.) - kill compile job if too long
               (run_timeout)             - (sec.) - kill run job if too long
 
+              (direct_exec)             - if 'yes', launch compiler and program directly via subprocess (local Linux host)
+                                          instead of a generated batch script - execution time includes only the child process
+
+              (binary_cache)            - if 'yes', reuse binaries built earlier for the same sources,
+                                          compiler environment, flags, compiler vars and link flags
+              (binary_cache_dir)        - directory of the binary cache (~/.ck-binary-cache by default)
+              (binary_cache_max_size)   - (MB) max size of the binary cache (LRU eviction)
+
+              (result_cache)            - if 'yes', reuse run characteristics measured earlier for the binary with the same MD5
+                                          (the same cmd_key, dataset, run-time environment and statistical repetition)
+                                          instead of running it again (cache is kept in state across autotuning iterations)
+              (result_cache_file)       - if !='', also load/save above cache from/to this JSON file (to reuse across sessions)
+
+              (prepare_cache)           - if 'yes', reuse platform selection and detection, compiler version
+                                          and closest compiler description found in earlier sessions
+                                          (per host, target, device, program and compiler environment;
+                                           invalidated when env, machine or compiler entries are added or removed
+                                           in repos, or when entries used by cached items are updated)
+              (prepare_cache_file)      - JSON file with above cache (~/.ck-prepare-cache.json by default)
+
               (post_process_script_uoa) - run script from this UOA
               (post_process_subscript)  - subscript name
               (post_process_params)     - (string) add params to CMD
@@ -3660,6 +3843,10 @@ def pipeline(i):
               (dependencies)         - compilation dependencies
               (deps_cache)           - cache with resolved dependencies for reuse (if needed)
               (reuse_deps)           - if 'yes' reuse dependencies
+              (resolve_cache)        - if 'yes', reuse compile and run-time deps resolved in earlier sessions
+                                       (per deps tags, host/target OS and device; env entries are checked to still exist
+                                        and not to be changed)
+              (resolve_cache_file)   - JSON file with resolved deps (~/.ck-resolve-cache.json by default)
               (force_resolve_deps)   - if 'yes', force resolve deps (useful for crowd-tuning)
 
               (choices)              - exposed choices (if any)
@@ -3707,6 +3894,11 @@ def pipeline(i):
 
               (skip_exec)            - if 'yes', do not clean output files and skip exec to be able to continue
                                        post-processing during debuging
+
+              (timers)               - if 'yes', measure time of all pipeline sections (hierarchical timers);
+                                       or dict with timers from caller (such as autotuning) to add nested timers
+              (trace_file)           - if !='', save timers to this file in Chrome trace event format
+                                       (open in chrome://tracing or Perfetto to see timeline)
             }
 
     Output: {
@@ -3720,6 +3912,11 @@ def pipeline(i):
                              if 'no', clean/compile/run program is postponed
 
               state        - should be preserved across autotuning, active (online) learning, exploration, validation iterations
+
+              (timers_result) - if timers=='yes': {
+                                                    events  - list of timer events (Chrome trace event format)
+                                                    summary - dict with total_time (sec.) and count per timer name
+                                                  }
             }
 
     """
@@ -3766,6 +3963,8 @@ def pipeline(i):
 
     deps_cache=i.get('deps_cache',[])
     reuse_deps=i.get('reuse_deps','')
+    rvcache=i.get('resolve_cache','')
+    rvcache_file=i.get('resolve_cache_file','')
 
     ai=ck.get_from_dicts(i, 'autotuning_iteration', '', None)
     sbbf=ck.get_from_dicts(i, 'select_best_base_flag_for_first_iteration','', None)
@@ -3776,8 +3975,22 @@ def pipeline(i):
     i['ready']='no'
     i['fail']='no'
 
+    # Phase timers (dict from caller to add nested timers, such as during autotuning)
+    if 'timers_result' in i: del(i['timers_result'])
+
+    tmr=i.get('timers',None)
+    if tmr=='yes':
+       tmr={'events':[], 'stack':[]}
+       i['timers']=tmr
+    elif type(tmr)!=dict:
+       tmr=None
+       if 'timers' in i: del(i['timers'])
+
+    start_timer(tmr, 'program pipeline')
+
     ###############################################################################################################
     # PIPELINE SECTION: VARS INIT
+    timer_section(tmr, 'program pipeline', 'vars init')
 
     if o=='con':
        ck.out('Initializing universal program pipeline ...')
@@ -3923,6 +4136,7 @@ def pipeline(i):
     rcm=ck.get_from_dicts(i, 'calibration_max','',choices)
 
     aff=ck.get_from_dicts(i, 'affinity', '', choices)
+    caff=ck.get_from_dicts(i, 'compile_affinity', '', None)
 
     cons=ck.get_from_dicts(i, 'console','',choices)
 
@@ -3932,8 +4146,20 @@ def pipeline(i):
     mali_hwc=ck.get_from_dicts(i, 'mali_hwc','',choices)
 
     xcto=ck.get_from_dicts(i, 'compile_timeout','',choices)
+
+    bcache=ck.get_from_dicts(i, 'binary_cache', '', None)
+    bcache_dir=ck.get_from_dicts(i, 'binary_cache_dir', '', None)
+    bcache_max=ck.get_from_dicts(i, 'binary_cache_max_size', '', None)
+
+    rcache=ck.get_from_dicts(i, 'result_cache', '', None)
+    rcache_file=ck.get_from_dicts(i, 'result_cache_file', '', None)
+
+    pcache=ck.get_from_dicts(i, 'prepare_cache', '', None)
+    pcache_file=ck.get_from_dicts(i, 'prepare_cache_file', '', None)
     xrto=ck.get_from_dicts(i, 'run_timeout','',choices)
 
+    dexec=ck.get_from_dicts(i, 'direct_exec', '', None)
+
     cdu=ck.get_from_dicts(i, 'compiler_description_uoa','',choices)
 
     vout_skip=ck.get_from_dicts(i, 'skip_output_validation','',choices)
@@ -3947,6 +4173,7 @@ def pipeline(i):
     ###############################################################################################################
     # PIPELINE SECTION: PROGRAM AND DIRECTORY SELECTION
     #                   (either as CID or CK descrpition from current directory or return that should be selected)
+    timer_section(tmr, 'program pipeline', 'program and directory selection')
 
     # First, if duoa is not defined, try to get from current directory
     if len(meta)==0:
@@ -4077,12 +4304,42 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: Host and target platform selection
+    timer_section(tmr, 'program pipeline', 'host and target platform selection')
     # Check via --target first (however, for compatibility, check that module exists first)
     local_platform=i.get('local_platform','')
 
-    r=ck.access({'action':'find',
-                 'module_uoa':cfg['module_deps']['module'],
-                 'data_uoa':cfg['module_deps']['machine']})
+    # Check persistent preparation cache
+    pck=''
+    pce=None
+    if pcache=='yes':
+       rx=load_prepare_cache({'cache_file':pcache_file})
+       if rx['return']>0: return rx
+
+       pck=get_prepare_cache_key([duid, meta.get('required_device_access_type',[]), local_platform, i.get('skip_target',''),
+                                  i.get('target',''), i.get('host_os',''), i.get('target_os',''), i.get('device_id',''),
+                                  choices.get('target',''), choices.get('host_os',''), choices.get('target_os',''),
+                                  choices.get('device_id','')])
+       pce=prepare_cache['platform'].get(pck,None)
+
+       if pce!=None:
+          rx=get_prepare_cache_entries({'entries':list(pce.get('entries',{}).keys())})
+          if rx['return']>0: return rx
+          if rx['entries']!=pce.get('entries',{}): pce=None
+
+    pcx=['target','device_cfg','host_os','target_os','device_id']
+
+    if pce!=None:
+       # Restore platform selection
+       for k in pcx:
+           if k in pce['input']: i[k]=copy.deepcopy(pce['input'][k])
+       for k in pce['choices']:
+           choices[k]=copy.deepcopy(pce['choices'][k])
+       r={'return':16}
+    else:
+       r=ck.access({'action':'find',
+                    'module_uoa':cfg['module_deps']['module'],
+                    'data_uoa':cfg['module_deps']['machine']})
+
     if r['return']==0 and i.get('skip_target','')!='yes' and local_platform!='yes':
        if o=='con':
           ck.out(sep)
@@ -4206,6 +4463,15 @@ def pipeline(i):
        if tdid!='' and choices.get('target_id','')!=tdid:
           choices['target_id']=tdid
 
+    # Platform selection to keep in preparation cache
+    pcin={}
+    pcch={}
+    if pck!='' and pce==None:
+       for k in pcx:
+           if k in i: pcin[k]=copy.deepcopy(i[k])
+       for k in ['target','device_cfg','host_os','target_os','target_id']:
+           if k in choices: pcch[k]=copy.deepcopy(choices[k])
+
     target=ck.get_from_dicts(i, 'target', '', choices)
     device_cfg=ck.get_from_dicts(i, 'device_cfg', {}, choices)
 
@@ -4240,16 +4506,43 @@ def pipeline(i):
         'skip_info_collection':sic,
         'out':ox}
     if si=='yes': ii['return_multi_devices']='yes'
-    r=ck.access(ii)
-    if r['return']>0:
-       if r['return']==32:
-          choices_desc['##device_id']={'type':'text',
-                                       'has_choice':'yes',
-                                       'choices':r['devices'],
-                                       'tags':['setup'],
-                                       'sort':1000}
-          return finalize_pipeline(i)
-       return r
+
+    if pce!=None:
+       r=copy.deepcopy(pce['detect'])
+       r['return']=0
+
+       if o=='con':
+          ck.out(sep)
+          ck.out('Platform parameters are restored from preparation cache ...')
+    else:
+       r=ck.access(ii)
+       if r['return']>0:
+          if r['return']==32:
+             choices_desc['##device_id']={'type':'text',
+                                          'has_choice':'yes',
+                                          'choices':r['devices'],
+                                          'tags':['setup'],
+                                          'sort':1000}
+             return finalize_pipeline(i)
+          return r
+
+       if pck!='':
+          pcd={}
+          for k in ['host_os_uoa','host_os_dict','os_uoa','os_dict','device_id']:
+              pcd[k]=r.get(k,'')
+
+          pcu=[]
+          for k in ['host_os_uoa','os_uoa']:
+              if pcd[k]!='' and 'platform.os:'+pcd[k] not in pcu: pcu.append('platform.os:'+pcd[k])
+          if target!='': pcu.append('machine:'+target)
+
+          rx=get_prepare_cache_entries({'entries':pcu})
+          if rx['return']>0: return rx
+
+          prepare_cache['platform'][pck]={'input':pcin, 'choices':pcch, 'detect':pcd, 'entries':rx['entries']}
+
+          rx=save_prepare_cache({})
+          if rx['return']>0: return rx
 
     sdi='yes'
     i['skip_device_init']=sdi
@@ -4365,6 +4658,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: Load deps
+    timer_section(tmr, 'program pipeline', 'load deps')
 
     if no_compile!='yes':
        if len(cdeps)==0 or ceuoa!='' or frd=='yes':
@@ -4381,6 +4675,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: Command line selection
+    timer_section(tmr, 'program pipeline', 'command line selection')
 
     run_cmds=meta.get('run_cmds',{})
     if len(run_cmds)==0:
@@ -4447,6 +4742,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: expose and resolve run-time deps if needed
+    timer_section(tmr, 'program pipeline', 'resolve run-time deps')
 
     rx=update_run_time_deps({'host_os':hos,
                              'target_os':tos,
@@ -4454,6 +4750,8 @@ def pipeline(i):
                              'deps':cdeps,
                              'deps_cache':deps_cache,
                              'reuse_deps':reuse_deps,
+                             'resolve_cache':rvcache,
+                             'resolve_cache_file':rvcache_file,
                              'meta':meta,
                              'cmd_key':kcmd,
                              'cmd_meta':vcmd,
@@ -4469,6 +4767,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: dataset selection
+    timer_section(tmr, 'program pipeline', 'dataset selection')
 
     dtags=vcmd.get('dataset_tags',[])
 
@@ -4549,6 +4848,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: dataset file selection (if more than one in one entry)
+    timer_section(tmr, 'program pipeline', 'dataset file selection')
     ddfiles=ddmeta.get('dataset_files',[])
 
     if len(ddfiles)>0:
@@ -4597,6 +4897,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: Architecture simulator
+    timer_section(tmr, 'program pipeline', 'architecture simulator')
     if sim=='yes':
        if o=='con':
           ck.out(sep)
@@ -4607,6 +4908,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: Valgrind
+    timer_section(tmr, 'program pipeline', 'valgrind')
     if valgrind=='yes':
        if o=='con':
           ck.out(sep)
@@ -4617,6 +4919,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: resolve compile dependencies
+    timer_section(tmr, 'program pipeline', 'resolve compile dependencies')
     if ceuoa!='':
        rx=ck.access({'action':'load',
                      'module_uoa':cfg['module_deps']['env'],
@@ -4654,7 +4957,7 @@ def pipeline(i):
                  'safe':safe,
                  'out':oo}
 
-             rx=ck.access(ii)
+             rx=resolve_deps({'input':ii, 'cache':rvcache, 'cache_file':rvcache_file})
              if rx['return']>0: return rx
 
              cdeps=rx['deps'] # Update deps (add UOA)
@@ -4681,6 +4984,31 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: Detect compiler version
+    timer_section(tmr, 'program pipeline', 'detect compiler version')
+
+    # Compiler version and description are cached per platform, program and compiler environment
+    cck=''
+    cce=None
+    cdu0=cdu
+    cenv=cdeps.get('compiler',{}).get('uoa','')
+    if pcache=='yes' and no_compile!='yes' and cenv!='':
+       cck=get_prepare_cache_key([duid, target, hos, tos, tdid, cenv])
+       cce=prepare_cache['compiler'].get(cck,None)
+
+       if cce!=None:
+          rx=get_prepare_cache_entries({'entries':list(cce.get('entries',{}).keys())})
+          if rx['return']>0: return rx
+          if rx['entries']!=cce.get('entries',{}): cce=None
+
+       if cce!=None:
+          if len(features.get('compiler_version',{}))==0 and len(cce.get('compiler_version',{}))>0:
+             features['compiler_version']=copy.deepcopy(cce['compiler_version'])
+
+          if cdu=='' and i.get('no_compiler_description','')!='yes':
+             cdu=cce.get('compiler_description_uoa','')
+
+          if o=='con':
+             ck.out('Compiler version and description are restored from preparation cache ...')
 
     if no_compile!='yes' and i.get('no_detect_compiler_version','')!='yes' and len(features.get('compiler_version',{}))==0:
        if no_compile!='yes':
@@ -4694,6 +5022,8 @@ def pipeline(i):
               'deps':cdeps,
               'deps_cache':deps_cache,
               'reuse_deps':reuse_deps,
+              'resolve_cache':rvcache,
+              'resolve_cache_file':rvcache_file,
               'generate_rnd_tmp_dir':grtd,
               'tmp_dir':tdir,
               'skip_clean_after':sca,
@@ -4717,6 +5047,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: get compiler description for flag options
+    timer_section(tmr, 'program pipeline', 'get compiler description for flag options')
     cflags_desc=choices_desc.get('##compiler_flags',{})
 
     if no_compile!='yes' and cdu=='' and i.get('no_compiler_description','')!='yes':
@@ -4812,6 +5143,20 @@ def pipeline(i):
              ck.out('Most close found compiler description: '+xruoa+' ('+xruid+')')
              time.sleep(1)
 
+    if cck!='' and cce==None:
+       pcu=['env:'+cenv]
+       if cdu!='': pcu.append('compiler:'+cdu)
+
+       rx=get_prepare_cache_entries({'entries':pcu})
+       if rx['return']>0: return rx
+
+       prepare_cache['compiler'][cck]={'compiler_version':features.get('compiler_version',{}),
+                                       'compiler_description_uoa':cdu if cdu0=='' else '',
+                                       'entries':rx['entries']}
+
+       rx=save_prepare_cache({})
+       if rx['return']>0: return rx
+
     if cdu!='':
        choices['compiler_description_uoa']=cdu
 
@@ -4835,10 +5180,25 @@ def pipeline(i):
               q1=q
               if q.startswith('##'):q1=q[2:]
               elif q.startswith('#'):q1=q[1:]
+
+              # Constraints between flags (see "check_constraints" in module choice)
+              # refer to keys of compiler description
+              if 'requires' in qq or 'conflicts' in qq or 'only_with' in qq:
+                 qq=copy.deepcopy(qq)
+                 for k in ['requires','conflicts']:
+                     if k in qq:
+                        qq[k]=[get_compiler_flag_key(x) for x in qq[k]]
+                 if 'only_with' in qq:
+                    x={}
+                    for k in qq['only_with']:
+                        x[get_compiler_flag_key(k)]=qq['only_with'][k]
+                    qq['only_with']=x
+
               choices_desc['##compiler_flags#'+q1]=qq
 
     ###############################################################################################################
     # PIPELINE SECTION: get compiler vars choices (-Dvar=value) - often for datasets such as in polyhedral benchmarks
+    timer_section(tmr, 'program pipeline', 'get compiler vars choices')
     bcvd=desc.get('build_compiler_vars_desc',{})
     for q in bcvd:
         qq=bcvd[q]
@@ -4854,6 +5214,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: compute device if needed
+    timer_section(tmr, 'program pipeline', 'compute device')
 
     # Check if need to select GPGPU
     ngd=vcmd.get('run_time',{}).get('need_compute_device','')
@@ -4892,6 +5253,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: get run vars (preset environment)
+    timer_section(tmr, 'program pipeline', 'get run vars')
     rv=desc.get('run_vars_desc',{})
     for q in rv:
         qq=rv[q]
@@ -4904,6 +5266,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: Check remote solution
+    timer_section(tmr, 'program pipeline', 'check remote solution')
     for k in i:
         if k.startswith('O'):
            i['shared_solution_cid']=k[1:]
@@ -5030,6 +5393,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: use gprof for profiling
+    timer_section(tmr, 'program pipeline', 'gprof')
     gprof_tmp=''
     if gprof=='yes':
        if o=='con':
@@ -5050,6 +5414,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: set CPU frequency
+    timer_section(tmr, 'program pipeline', 'set CPU frequency')
     if scpuf!='' and sic!='yes':
        if o=='con':
           ck.out(sep)
@@ -5075,6 +5440,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: set GPU frequency
+    timer_section(tmr, 'program pipeline', 'set GPU frequency')
     if sgpuf!='' and sic!='yes':
        if o=='con':
           ck.out(sep)
@@ -5100,6 +5466,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: get target platform features
+    timer_section(tmr, 'program pipeline', 'get target platform features')
     npf=i.get('no_platform_features','')
     if i.get('platform_features','')!='yes' and npf!='yes' and sic!='yes':
        if o=='con':
@@ -5127,6 +5494,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: get dataset features
+    timer_section(tmr, 'program pipeline', 'get dataset features')
     npf=i.get('no_dataset_features','')
     if npf!='yes' and dduid!='':
        if o=='con':
@@ -5171,6 +5539,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: Check that system state didn't change (frequency)
+    timer_section(tmr, 'program pipeline', 'check system state')
     if no_state_check!='yes':
        if o=='con': ck.out(sep)
 
@@ -5237,6 +5606,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: Extract cTuning/MILEPOST static program features
+    timer_section(tmr, 'program pipeline', 'extract cTuning/MILEPOST static program features')
     cs='yes'
     extracted_milepost_features=False
     if i.get('fail','')!='yes' and milepost=='yes' and \
@@ -5276,6 +5646,8 @@ def pipeline(i):
               'deps':mcdeps,
               'deps_cache':deps_cache,
               'reuse_deps':reuse_deps,
+              'resolve_cache':rvcache,
+              'resolve_cache_file':rvcache_file,
               'generate_rnd_tmp_dir':grtd,
               'tmp_dir':tdir,
               'clean':cl,
@@ -5344,6 +5716,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: Compile program
+    timer_section(tmr, 'program pipeline', 'compile program')
     cs='yes'
     if i.get('fail','')!='yes' and no_compile!='yes' and \
        (compile_only_once!='yes' or ai==0) and \
@@ -5388,6 +5761,14 @@ def pipeline(i):
               'remove_compiler_vars':rcv,
               'extra_env_for_compilation':eefc,
               'compile_timeout':xcto,
+              'direct_exec':dexec,
+              'binary_cache':bcache,
+              'binary_cache_dir':bcache_dir,
+              'binary_cache_max_size':bcache_max,
+              'resolve_cache':rvcache,
+              'resolve_cache_file':rvcache_file,
+              'compile_affinity':caff,
+              'timers':tmr,
               'compute_platform_id':compute_platform_id,
               'compute_device_id':compute_device_id,
               'add_rnd_extension_to_bin':are,
@@ -5436,18 +5817,21 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: check if record MILEPOST features (after clean)
+    timer_section(tmr, 'program pipeline', 'check if record MILEPOST features')
     if extracted_milepost_features and milepost_out_file!='':
        r=ck.save_json_to_file({'json_file':milepost_out_file, 'dict':feat})
        if r['return']>0: return r
 
     ###############################################################################################################
     # PIPELINE SECTION: Check if dataset is the same
+    timer_section(tmr, 'program pipeline', 'check if dataset is the same')
     sdc='no'
     if tsd=='yes' and (ati!=0 or srn!=0):
        sdc='yes'
 
     ###############################################################################################################
     # PIPELINE SECTION: perf
+    timer_section(tmr, 'program pipeline', 'perf')
     perf_tmp=''
     if perf=='yes':
        if o=='con':
@@ -5464,6 +5848,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: Intel vTune
+    timer_section(tmr, 'program pipeline', 'Intel vTune')
     vtune_tmp=''
     vtune_tmp1=''
     if vtune=='yes':
@@ -5492,6 +5877,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: Preload dividiti's OpenCL profiler.
+    timer_section(tmr, 'program pipeline', 'preload OpenCL profiler')
     if odp=='yes':
        if hplat=='win':
           return {'return':1, 'error':'dividiti\'s OpenCL profiler is currently not supported under Windows'}
@@ -5506,6 +5892,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: Set MALI HWC counter collector
+    timer_section(tmr, 'program pipeline', 'set MALI HWC counter collector')
     if mali_hwc=='yes':
        # Call process output vector
        r=ck.access({'action':'run', 
@@ -5518,6 +5905,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: Valgrind
+    timer_section(tmr, 'program pipeline', 'valgrind')
     if valgrind=='yes':
        if o=='con':
           ck.out(sep)
@@ -5531,6 +5919,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: Architecture simulator
+    timer_section(tmr, 'program pipeline', 'architecture simulator')
     if sim=='yes':
        if o=='con':
           ck.out(sep)
@@ -5544,6 +5933,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: Run program
+    timer_section(tmr, 'program pipeline', 'run program')
     xdeps={}
     if i.get('fail','')!='yes' and cs!='no' and no_run!='yes':
        if o=='con':
@@ -5563,65 +5953,118 @@ def pipeline(i):
            if k.startswith('run_cmd_key_'):
               rcsub[k]=choices[k]
 
-       ii={'sub_action':'run',
-           'target':target,
-           'target_os':tos,
-           'device_id':tdid,
-           'host_os':hos,
-           'path':pdir,
-           'console':cons,
-           'meta':meta,
-           'deps':cdeps,
-           'deps_cache':deps_cache,
-           'reuse_deps':reuse_deps,
-           'cmd_key':kcmd,
-           'dataset_uoa':dduoa,
-           'dataset_file':ddfile,
-           'generate_rnd_tmp_dir':grtd,
-           'tmp_dir':tdir,
-           'skip_clean_after':sca,
-           'compile_type':ctype,
-           'speed':espeed,
-           'sudo':isd,
-           'energy':sme,
-           'affinity':aff,
-           'flags':flags,
-           'lflags':lflags,
-           'repeat':repeat,
-           'pre_run_cmd':prcmd,
-           'run_output_files':rof,
-           'skip_calibration':rsc,
-           'calibration_time':rct,
-           'calibration_max':rcm,
-           'params':params,
-           'post_process_script_uoa':pp_uoa,
-           'post_process_subscript':pp_name,
-           'post_process_params':pp_params,
-           'statistical_repetition':srn,
-           'autotuning_iteration':ati,
-           'compute_platform_id':compute_platform_id,
-           'compute_device_id':compute_device_id,
-           'skip_output_validation':vout_skip,
-           'output_validation_repo':vout_repo,
-           'program_output_uoa':program_output_uoa,
-           'overwrite_reference_output':vout_over,
-           'skip_dataset_copy':sdc,
-           'skip_exec':skip_exec,
-           'env':env,
-           'extra_env':eenv,
-           'extra_run_cmd':ercmd,
-           'debug_run_cmd':drcmd,
-           'extra_post_process_cmd':eppc,
-           'run_cmd_substitutes':rcsub,
-           'compiler_vars':cv,
-           'no_vars':ncv,
-           'skip_print_timers':sptimers,
-           'remove_compiler_vars':rcv,
-           'extra_env_for_compilation':eefc,
-           'run_timeout':xrto,
-           'out':oo}
-       r=process_in_dir(ii)
-       if r['return']>0: return r
+       # Check if this binary was already measured (the same MD5 but different optimizations)
+       rc_key=''
+       rc_hit=False
+       md5=chars.get('compile',{}).get('md5_sum','')
+       if rcache=='yes' and md5!='':
+          if 'result_cache' not in state:
+             state['result_cache']={}
+             if rcache_file!='' and os.path.isfile(rcache_file):
+                rx=ck.load_json_file({'json_file':rcache_file})
+                if rx['return']>0: return rx
+                state['result_cache']=rx['dict']
+
+          rx=get_result_cache_key({'md5':md5,
+                                   'cmd_key':kcmd,
+                                   'dataset_uoa':dduoa,
+                                   'dataset_file':ddfile,
+                                   'env':env,
+                                   'extra_env':eenv,
+                                   'extra_run_cmd':ercmd,
+                                   'run_cmd_substitutes':rcsub,
+                                   'params':params,
+                                   'affinity':aff,
+                                   'target_os':tos,
+                                   'device_id':tdid,
+                                   'statistical_repetition':srn})
+          if rx['return']>0: return rx
+          rc_key=rx['key']
+
+          if rc_key in state['result_cache']:
+             rc_hit=True
+
+             if o=='con':
+                ck.out('')
+                ck.out('Reusing characteristics measured for the binary with the same MD5 ('+md5+') ...')
+
+       if rc_hit:
+          r=copy.deepcopy(state['result_cache'][rc_key])
+          r['return']=0
+          r['characteristics']['result_cache_hit']='yes'
+       else:
+          ii={'sub_action':'run',
+              'target':target,
+              'target_os':tos,
+              'device_id':tdid,
+              'host_os':hos,
+              'path':pdir,
+              'console':cons,
+              'meta':meta,
+              'deps':cdeps,
+              'deps_cache':deps_cache,
+              'reuse_deps':reuse_deps,
+              'resolve_cache':rvcache,
+              'resolve_cache_file':rvcache_file,
+              'cmd_key':kcmd,
+              'dataset_uoa':dduoa,
+              'dataset_file':ddfile,
+              'generate_rnd_tmp_dir':grtd,
+              'tmp_dir':tdir,
+              'skip_clean_after':sca,
+              'compile_type':ctype,
+              'speed':espeed,
+              'sudo':isd,
+              'energy':sme,
+              'affinity':aff,
+              'flags':flags,
+              'lflags':lflags,
+              'repeat':repeat,
+              'pre_run_cmd':prcmd,
+              'run_output_files':rof,
+              'skip_calibration':rsc,
+              'calibration_time':rct,
+              'calibration_max':rcm,
+              'params':params,
+              'post_process_script_uoa':pp_uoa,
+              'post_process_subscript':pp_name,
+              'post_process_params':pp_params,
+              'statistical_repetition':srn,
+              'autotuning_iteration':ati,
+              'compute_platform_id':compute_platform_id,
+              'compute_device_id':compute_device_id,
+              'skip_output_validation':vout_skip,
+              'output_validation_repo':vout_repo,
+              'program_output_uoa':program_output_uoa,
+              'overwrite_reference_output':vout_over,
+              'skip_dataset_copy':sdc,
+              'skip_exec':skip_exec,
+              'env':env,
+              'extra_env':eenv,
+              'extra_run_cmd':ercmd,
+              'debug_run_cmd':drcmd,
+              'extra_post_process_cmd':eppc,
+              'run_cmd_substitutes':rcsub,
+              'compiler_vars':cv,
+              'no_vars':ncv,
+              'skip_print_timers':sptimers,
+              'remove_compiler_vars':rcv,
+              'extra_env_for_compilation':eefc,
+              'run_timeout':xrto,
+              'direct_exec':dexec,
+              'timers':tmr,
+              'out':oo}
+          r=process_in_dir(ii)
+          if r['return']>0: return r
+
+          # Save measured characteristics to cache
+          if rc_key!='' and r['misc'].get('run_success','')!='no' and r['misc'].get('calibration_success',True):
+             state['result_cache'][rc_key]={'misc':copy.deepcopy(r['misc']),
+                                            'characteristics':copy.deepcopy(r['characteristics'])}
+
+             if rcache_file!='':
+                rx=ck.save_json_to_file({'json_file':rcache_file, 'dict':state['result_cache']})
+                if rx['return']>0: return rx
 
        misc=r['misc']
 
@@ -5664,6 +6107,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: set CPU frequency to ondemand to "calm" system (if supported)
+    timer_section(tmr, 'program pipeline', 'set CPU frequency to ondemand')
     if scpuf!='' and sic!='yes':
         if o=='con':
            ck.out(sep)
@@ -5686,6 +6130,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: set GPU frequency to ondemand to "calm" system (if supported)
+    timer_section(tmr, 'program pipeline', 'set GPU frequency to ondemand')
     if sgpuf!='' and sic!='yes':
         if o=='con':
            ck.out(sep)
@@ -5708,6 +6153,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: finish vtune
+    timer_section(tmr, 'program pipeline', 'finish vtune')
     if vtune=='yes':
        if o=='con':
           ck.out(sep)
@@ -5762,6 +6208,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: finish perf
+    timer_section(tmr, 'program pipeline', 'finish perf')
     if perf=='yes':
        if o=='con':
           ck.out(sep)
@@ -5820,6 +6267,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: finish gprof
+    timer_section(tmr, 'program pipeline', 'finish gprof')
     if gprof=='yes':
        if o=='con':
           ck.out(sep)
@@ -5869,6 +6317,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: Post-process MALI HWC counters
+    timer_section(tmr, 'program pipeline', 'post-process MALI HWC counters')
     if mali_hwc=='yes':
        # Call process output vector
        r=ck.access({'action':'run', 
@@ -5881,6 +6330,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: Post-process output from dividiti's OpenCL profiler.
+    timer_section(tmr, 'program pipeline', 'post-process OpenCL profiler output')
     if odp=='yes':
         # Check that not processed yet by postprocessing program scripts
         # TBD: this code should be converted to CK canonical form ...
@@ -5926,6 +6376,7 @@ def pipeline(i):
 
     ###############################################################################################################
     # PIPELINE SECTION: finalize PIPELINE
+    timer_section(tmr, 'program pipeline', 'finalize pipeline')
     if i.get('fail','')=='yes':
        print_warning({'data_uoa':duoa, 'repo_uoa':ruoa})
 
@@ -5969,6 +6420,33 @@ def finalize_pipeline(i):
         if q in i:
            del(i[q])
 
+    # Stop phase timers
+    tmr=i.get('timers',None)
+    if type(tmr)==dict:
+       stop_timer(tmr, 'program pipeline')
+
+       if len(tmr['stack'])>0:
+          # Timers belong to the caller (such as autotuning)
+          del(i['timers'])
+       else:
+          # Keep input as it was to be able to rerun pipeline with its output
+          i['timers']='yes'
+          i['timers_result']={'events':tmr['events'],
+                              'summary':timer_summary(tmr)}
+
+          tfx=i.get('trace_file','')
+          if tfx!='':
+             tf=tfx
+             if not os.path.isabs(tf):
+                tf=os.path.join(cd, tf)
+
+             if o=='con':
+                ck.out(sep)
+                ck.out('Writing Chrome trace to file '+tf+' ...')
+
+             rx=save_trace(tmr, tf)
+             if rx['return']>0: return rx
+
     if stfx!='':
        if o=='con':
           ck.out(sep)
@@ -5998,6 +6476,89 @@ def finalize_pipeline(i):
 
     return i
 
+##############################################################################
+# convert key of compiler description to flat key of pipeline choices
+# (keys of other parts of pipeline such as ##compiler_vars#... are kept)
+
+def get_compiler_flag_key(k):
+    if k.startswith('##compiler_') or k.startswith('##choices#') or k.startswith('##env#'):
+       return k
+
+    if k.startswith('##'): k=k[2:]
+    elif k.startswith('#'): k=k[1:]
+
+    return '##compiler_flags#'+k
+
+##############################################################################
+# timers are implemented in pipeline module (the same timers and trace for autotuning and program pipeline);
+# its code is loaded once per session (None if not available - timers are then not used)
+
+def get_timers_code():
+    if 'code' not in timers_code:
+       c=None
+
+       r=ck.access({'action':'find',
+                    'module_uoa':cfg['module_deps']['module'],
+                    'data_uoa':cfg['module_deps']['pipeline']})
+       if r['return']==0:
+          r=ck.load_module_from_path({'path':r['path'], 'module_code_name':'module', 'skip_init':'yes'})
+          if r['return']==0: c=r['code']
+
+       timers_code['code']=c
+
+    return timers_code['code']
+
+##############################################################################
+# start hierarchical timer of a pipeline phase (see "start_timer" in pipeline module)
+
+def start_timer(t, name, cat='program'):
+    if t==None: return
+
+    c=get_timers_code()
+    if c!=None: c.start_timer(t, name, cat)
+
+    return
+
+##############################################################################
+# stop timer (see "stop_timer" in pipeline module)
+
+def stop_timer(t, name):
+    if t==None: return
+
+    c=get_timers_code()
+    if c!=None: c.stop_timer(t, name)
+
+    return
+
+##############################################################################
+# stop all timers nested in parent timer and start the next section (see "timer_section" in pipeline module)
+
+def timer_section(t, parent, name, cat='program'):
+    if t==None: return
+
+    c=get_timers_code()
+    if c!=None: c.timer_section(t, parent, name, cat)
+
+    return
+
+##############################################################################
+# total time and number of calls per timer name (see "timer_summary" in pipeline module)
+
+def timer_summary(t):
+    c=get_timers_code()
+    if c==None: return {}
+
+    return c.timer_summary(t)
+
+##############################################################################
+# save timers to Chrome trace event file (see "save_trace" in pipeline module)
+
+def save_trace(t, fn):
+    c=get_timers_code()
+    if c==None: return {'return':1, 'error':'can\'t load timers from pipeline module'}
+
+    return c.save_trace(t, fn)
+
 ##############################################################################
 # substitute some CK reserved keys
 #   $#ck_take_from{CID or UID}#$ (if module_uoa omitted, use current one)
@@ -6057,53 +6618,797 @@ def substitute_some_ck_keys(i):
     return {'return':0, 'string':s, 'path':p}
 
 ##############################################################################
-# copy program
+# get path to binary cache
 
-def cp(i):
+def get_binary_cache_dir(i):
     """
     Input:  {
-               CID1
-               CID2
+              (cache_dir)  - explicit cache directory
             }
 
     Output: {
               return       - return code =  0, if successful
                                          >  0, if error
               (error)      - error text if return > 0
+
+              path         - path to binary cache
             }
 
     """
 
-    i['common_func']='yes'
-    r=ck.access(i)
-    if r['return']>0: return r
-
-    ruid=r['repo_uid']
-    muid=r['module_uid']
-    duid=r['data_uid']
-    duoa=r['data_uoa']
-
-    d=r['dict']
+    import os
 
-    d['backup_data_uid']=duid
-    d['data_name']=duoa
+    p=i.get('cache_dir','')
+    if p=='': p=cfg.get('binary_cache_dir','')
+    if p=='': p=os.path.join(os.path.expanduser('~'), '.ck-binary-cache')
 
-    ii={'action':'update',
-        'module_uoa':muid,
-        'repo_uoa':ruid,
-        'data_uoa':duid,
-        'dict':d,
-        'ignore_update':'yes',
-        'sort_keys':'yes'}
+    if not os.path.isdir(p):
+       try:
+          os.makedirs(p)
+       except Exception as e:
+          pass
+       if not os.path.isdir(p):
+          return {'return':1, 'error':'can\'t create binary cache directory ('+p+')'}
 
-    return ck.access(ii)
+    return {'return':0, 'path':p}
 
 ##############################################################################
-# Common action: copy (or move) data entry
+# calculate key of a binary in cache (hash of compile batch, compiled sources and headers)
 
-def copy(i):
+def get_binary_cache_key(i):
     """
-    See "cp" API
+    Input:  {
+              batch        - compile batch (compiler env, flags, compiler vars and link flags)
+              path         - program path (headers from this directory are hashed)
+              (files)      - compiled source files (from this or other entries)
+              (all_files)  - if 'yes', hash all files from program path except tmp ones
+                             (when compiled sources are not known, i.e. compile script is used)
+              (extra)      - extra string to add to hash (compiler version, for example)
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              key          - key
+            }
+
+    """
+
+    import os
+    import hashlib
+
+    h=hashlib.sha256()
+
+    h.update(i.get('batch','').encode('utf8'))
+    h.update(i.get('extra','').encode('utf8'))
+
+    p=i['path']
+    af=i.get('all_files','')
+
+    hext=cfg.get('binary_cache_header_ext',['.h','.hh','.hpp','.hxx','.inc','.inl','.def'])
+
+    files=[]
+    for q in i.get('files',[]):
+        q=os.path.abspath(q)
+        if q not in files and os.path.isfile(q): files.append(q)
+
+    # Headers included by compiled sources (or all files)
+    for root, dirs, fns in os.walk(p):
+        dirs[:]=sorted([q for q in dirs if not q.startswith('tmp') and not q.startswith('.')])
+        for fn in sorted(fns):
+            if af=='yes' or os.path.splitext(fn)[1].lower() in hext:
+               q=os.path.join(root, fn)
+               if q not in files: files.append(q)
+
+    for q in files:
+        h.update(os.path.relpath(q, p).encode('utf8'))
+        try:
+           f=open(q, 'rb')
+           h.update(f.read())
+           f.close()
+        except Exception as e:
+           return {'return':1, 'error':'can\'t read file '+q+' to calculate binary cache key ('+format(e)+')'}
+
+    return {'return':0, 'key':h.hexdigest()}
+
+##############################################################################
+# restore binary from cache to current directory
+
+def restore_from_binary_cache(i):
+    """
+    Input:  {
+              key          - key (see get_binary_cache_key)
+              target_exe   - name of target binary
+              (obj_files)  - list of object files
+              (cache_dir)  - explicit cache directory
+            }
+
+    Output: {
+              return             - return code =  0, if successful
+                                               >  0, if error
+              (error)            - error text if return > 0
+
+              found              - 'yes' if binary was restored
+              (compilation_time) - recorded compilation time of cached binary
+            }
+
+    """
+
+    import os
+    import shutil
+
+    r=get_binary_cache_dir(i)
+    if r['return']>0: return r
+    pc=os.path.join(r['path'], i['key'])
+
+    fm=os.path.join(pc, 'ck-cache-meta.json')
+    if not os.path.isfile(fm):
+       return {'return':0, 'found':'no'}
+
+    r=ck.load_json_file({'json_file':fm})
+    if r['return']>0: return {'return':0, 'found':'no'}
+    d=r['dict']
+
+    te=i['target_exe']
+
+    try:
+       shutil.copy2(os.path.join(pc, 'binary'), te)
+       for q in d.get('extra_files',[]):
+           shutil.copy2(os.path.join(pc, 'binary'+q), te+q)
+       for q in i.get('obj_files',[]):
+           if q in d.get('obj_files',[]):
+              shutil.copy2(os.path.join(pc, 'obj', q), q)
+    except Exception as e:
+       # Broken entry (maybe evicted in parallel) - simply rebuild
+       return {'return':0, 'found':'no'}
+
+    # Mark as recently used (for LRU eviction)
+    try:
+       os.utime(fm, None)
+    except Exception as e:
+       pass
+
+    return {'return':0, 'found':'yes', 'compilation_time':d.get('compilation_time',0.0)}
+
+##############################################################################
+# add binary to cache (and remove least recently used binaries if cache is too large)
+
+def add_to_binary_cache(i):
+    """
+    Input:  {
+              key                - key (see get_binary_cache_key)
+              target_exe         - name of target binary in current directory
+              (obj_files)        - list of object files in current directory
+              (compilation_time) - compilation time
+              (cache_dir)        - explicit cache directory
+              (max_size)         - (MB) max size of cache
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+            }
+
+    """
+
+    import os
+    import shutil
+
+    r=get_binary_cache_dir(i)
+    if r['return']>0: return r
+    pcd=r['path']
+
+    pc=os.path.join(pcd, i['key'])
+    if os.path.isdir(pc):
+       return {'return':0}
+
+    te=i['target_exe']
+
+    # Prepare entry in tmp directory and then rename (atomic when cache is shared by parallel workers)
+    r=ck.gen_uid({})
+    if r['return']>0: return r
+    pt=os.path.join(pcd, 'tmp-'+r['data_uid'])
+
+    d={'target_exe':te,
+       'compilation_time':i.get('compilation_time',0.0),
+       'extra_files':[],
+       'obj_files':[]}
+
+    try:
+       os.makedirs(os.path.join(pt, 'obj'))
+
+       shutil.copy2(te, os.path.join(pt, 'binary'))
+
+       for q in ['.md5', '.git_hash']:
+           if os.path.isfile(te+q):
+              shutil.copy2(te+q, os.path.join(pt, 'binary'+q))
+              d['extra_files'].append(q)
+
+       for q in i.get('obj_files',[]):
+           if os.path.isfile(q):
+              shutil.copy2(q, os.path.join(pt, 'obj', q))
+              d['obj_files'].append(q)
+
+       r=ck.save_json_to_file({'json_file':os.path.join(pt, 'ck-cache-meta.json'), 'dict':d})
+       if r['return']>0:
+          shutil.rmtree(pt, ignore_errors=True)
+          return r
+
+       os.rename(pt, pc)
+    except Exception as e:
+       shutil.rmtree(pt, ignore_errors=True)
+       if not os.path.isdir(pc):
+          return {'return':1, 'error':'can\'t add binary to cache ('+format(e)+')'}
+
+    # Check size and remove least recently used binaries
+    ms=i.get('max_size','')
+    if ms!='':
+       ms=float(ms)*1024*1024
+
+       entries=[]
+       ts=0
+       for q in os.listdir(pcd):
+           if q.startswith('tmp-'): continue
+
+           px=os.path.join(pcd, q)
+           fm=os.path.join(px, 'ck-cache-meta.json')
+           if not os.path.isfile(fm): continue
+
+           s=0
+           for root, dirs, fns in os.walk(px):
+               for fn in fns:
+                   s+=os.path.getsize(os.path.join(root, fn))
+
+           entries.append((os.path.getmtime(fm), s, px))
+           ts+=s
+
+       for e in sorted(entries):
+           if ts<=ms: break
+           if e[2]==pc: continue
+
+           shutil.rmtree(e[2], ignore_errors=True)
+           ts-=e[1]
+
+    return {'return':0}
+
+##############################################################################
+# calculate key of measured run characteristics (MD5 of a binary and run-time setup)
+
+def get_result_cache_key(i):
+    """
+    Input:  {
+              md5                      - MD5 of a binary (objdump)
+              (cmd_key)                - CMD key
+              (dataset_uoa)            - dataset UOA
+              (dataset_file)           - dataset file
+              (env)                    - run-time environment
+              (statistical_repetition) - statistical repetition number
+              ...                      - all other keys are also added to the key
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              key          - key
+            }
+
+    """
+
+    import json
+    import hashlib
+
+    try:
+       s=json.dumps(i, sort_keys=True)
+    except Exception as e:
+       return {'return':1, 'error':'can\'t serialize run-time setup to calculate key ('+format(e)+')'}
+
+    return {'return':0, 'key':i['md5']+'-'+hashlib.sha256(s.encode('utf8')).hexdigest()}
+
+##############################################################################
+# load persistent cache of pipeline preparation (once per session)
+
+def load_prepare_cache(i):
+    """
+    Input:  {
+              (cache_file) - JSON file with cache (~/.ck-prepare-cache.json by default)
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              (cache in module variable "prepare_cache")
+            }
+
+    """
+
+    import os
+
+    fn=i.get('cache_file','')
+    if fn=='': fn=cfg.get('prepare_cache_file','')
+    if fn=='': fn=os.path.join(os.path.expanduser('~'), '.ck-prepare-cache.json')
+
+    if prepare_cache.get('file','')==fn:
+       return {'return':0}
+
+    rx=get_prepare_cache_stamp({})
+    if rx['return']>0: return rx
+    stamp=rx['stamp']
+
+    d={}
+    if os.path.isfile(fn):
+       rx=ck.load_json_file({'json_file':fn})
+       if rx['return']==0: d=rx['dict']
+
+    # Invalidate if repos or entries changed
+    if d.get('stamp','')!=stamp:
+       d={}
+
+    prepare_cache.clear()
+    prepare_cache['file']=fn
+    prepare_cache['stamp']=stamp
+    prepare_cache['platform']=d.get('platform',{})
+    prepare_cache['compiler']=d.get('compiler',{})
+
+    return {'return':0}
+
+##############################################################################
+# save persistent cache of pipeline preparation
+
+def save_prepare_cache(i):
+    """
+    Input:  {}
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+            }
+
+    """
+
+    import os
+
+    fn=prepare_cache.get('file','')
+    if fn=='': return {'return':0}
+
+    d={'stamp':prepare_cache['stamp'],
+       'platform':prepare_cache['platform'],
+       'compiler':prepare_cache['compiler']}
+
+    rx=ck.save_json_to_file({'json_file':fn+'.tmp', 'dict':d})
+    if rx['return']>0: return rx
+
+    try:
+       os.rename(fn+'.tmp', fn)
+    except Exception as e:
+       return {'return':1, 'error':'can\'t update preparation cache ('+format(e)+')'}
+
+    return {'return':0}
+
+##############################################################################
+# get stamp of repos used during pipeline preparation
+# (added or removed entries change modification time of directories of modules in repos
+#  and invalidate preparation cache; entries are not listed to keep it cheap)
+
+def get_prepare_cache_stamp(i):
+    """
+    Input:  {}
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              stamp        - stamp
+            }
+
+    """
+
+    import os
+    import hashlib
+
+    h=hashlib.md5()
+
+    # Paths of repos
+    paths=[]
+    for k in ['dir_default_repo', 'dir_local_repo']:
+        p=ck.work.get(k,'')
+        if p!='': paths.append(p)
+
+    rx=ck.access({'action':'list', 'module_uoa':cfg['module_deps']['repo'], 'add_meta':'yes'})
+    if rx['return']>0 and rx['return']!=16: return rx
+
+    for q in rx.get('lst',[]):
+        p=q.get('meta',{}).get('dict',{}).get('path','')
+        if p!='' and p not in paths: paths.append(p)
+
+    h.update(str(len(paths)).encode('utf8'))
+
+    for p in sorted(paths):
+        for m in ['env', 'machine', 'compiler', 'platform.os']:
+            for pm in [os.path.join(p, m), os.path.join(p, m, ck.cfg['subdir_ck_ext'])]:
+                x=p+':'+m
+                if os.path.isdir(pm):
+                   x+=':'+str(os.path.getmtime(pm))
+                h.update(x.encode('utf8'))
+
+    return {'return':0, 'stamp':h.hexdigest()}
+
+##############################################################################
+# get modification times of descriptions of entries used by cached preparation
+# (updated entries invalidate only cache items which used them)
+
+def get_prepare_cache_entries(i):
+    """
+    Input:  {
+              entries      - list of "module_key:data_uoa" (module_key from module_deps)
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              entries      - dict with above keys and modification times of their meta ('' if not found)
+            }
+
+    """
+
+    import os
+
+    d={}
+    for x in i.get('entries',[]):
+        j=x.find(':')
+
+        t=''
+        rx=ck.access({'action':'load', 'module_uoa':cfg['module_deps'][x[:j]], 'data_uoa':x[j+1:]})
+        if rx['return']==0:
+           pm=os.path.join(rx['path'], ck.cfg['subdir_ck_ext'], ck.cfg['file_meta'])
+           if os.path.isfile(pm):
+              t=str(os.path.getmtime(pm))
+
+        d[x]=t
+
+    return {'return':0, 'entries':d}
+
+##############################################################################
+# get key of preparation cache
+
+def get_prepare_cache_key(x):
+    import json
+    import hashlib
+
+    return hashlib.md5(json.dumps(x, sort_keys=True).encode('utf8')).hexdigest()
+
+##############################################################################
+# prepare direct execution of a generated batch script (without shell)
+#
+# Setup part of the script (sourcing env scripts of deps and exporting vars)
+# is executed by shell only once and resulting environment is cached.
+# Other lines should be simple commands with redirections, echo, export
+# and quit-if-error checks using only $VAR or ${VAR} of variables which are set
+# (no escapes, $ in single quotes, arithmetic or special parameters),
+# otherwise plan is not returned (use batch file).
+
+def prepare_direct_exec(i):
+    """
+    Input:  {
+              script            - batch script (Linux shell)
+              (quit_if_error)   - line of script checking return code of previous command
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              (plan)       - commands to run via "run_direct_exec" or None if script is not supported
+            }
+
+    """
+
+    import os
+    import re
+    import shlex
+    import hashlib
+    import subprocess
+
+    sqie=i.get('quit_if_error','').strip()
+
+    lines=i['script'].split('\n')
+
+    # Setup part
+    j=0
+    while j<len(lines):
+        l=lines[j].strip()
+        if l!='' and not l.startswith('#') and not l.startswith('export ') and \
+           not l.startswith('. ') and not l.startswith('source '):
+           break
+        j+=1
+
+    pre='\n'.join(lines[:j])
+
+    # Commands
+    cmds=[]
+    for l in lines[j:]:
+        l=l.strip()
+
+        if l=='' or l.startswith('#'):
+           continue
+
+        if sqie!='' and l==sqie:
+           cmds.append({'type':'check'})
+           continue
+
+        # Expansion is simplified (see "run_direct_exec"), so use shell for other constructs
+        if '\\' in l or re.search(r"'[^']*\$[^']*'", l) or re.search(r'\$(?![A-Za-z_{])', l) or \
+           re.search(r'\$\{(?!\w+\})', l) or re.search(r'\$\{?[0-9]', l):
+           return {'return':0, 'plan':None}
+
+        if l=='echo' or l.startswith('echo '):
+           cmds.append({'type':'echo', 'string':l[5:]})
+           continue
+
+        x=re.sub(r'\$\{\w+\}', '', l).replace('2>&1','')
+        for q in '|&;`()*?[]{}~!':
+            if q in x: return {'return':0, 'plan':None}
+
+        if l.startswith('export '):
+           k,_,v=l[7:].partition('=')
+           if not re.match(r'^\w+$', k.strip()): return {'return':0, 'plan':None}
+           cmds.append({'type':'env', 'key':k.strip(), 'value':v})
+           continue
+
+        if l.split()[0] in ['cd','exit','set','unset','.','source','if','for','while','ulimit','time','exec','eval','alias','trap']:
+           return {'return':0, 'plan':None}
+
+        cmds.append({'type':'cmd', 'string':l})
+
+    # Environment after setup part (once per setup and directory)
+    cwd=os.getcwd()
+
+    key=hashlib.md5((cwd+'\n'+pre).encode('utf8')).hexdigest()
+
+    env=direct_exec_env.get(key,None)
+    if env==None:
+       m='### CK DIRECT EXEC ENV ###'
+       try:
+          x=subprocess.check_output(['bash', '-c', pre+'\necho "'+m+'"\nenv -0'])
+       except Exception as e:
+          return {'return':0, 'plan':None}
+
+       x=x.decode('utf8', 'ignore')
+       x=x[x.rfind(m)+len(m)+1:]
+
+       env={}
+       for q in x.split('\0'):
+           if '=' in q:
+              k,_,v=q.partition('=')
+              env[k]=v
+
+       for k in ['SHLVL','_','OLDPWD']:
+           if k in env: del(env[k])
+       env['PWD']=cwd
+
+       if len(direct_exec_env)>64: direct_exec_env.clear()
+       direct_exec_env[key]=env
+
+    # All used variables should be set (in environment or by previous export)
+    defined=set(env.keys())
+    for c in cmds:
+        x=c.get('string', c.get('value',''))
+        for k in re.findall(r'\$\{?(\w+)', x):
+            if k not in defined: return {'return':0, 'plan':None}
+        if c['type']=='env':
+           defined.add(c['key'])
+
+    return {'return':0, 'plan':{'env':env, 'cmds':cmds, 'cwd':cwd}}
+
+##############################################################################
+# run commands prepared by "prepare_direct_exec" (only child processes are timed)
+
+def run_direct_exec(i):
+    """
+    Input:  {
+              plan         - plan from "prepare_direct_exec"
+              (timeout)    - (sec.) - kill command if total time is too long
+              (out)        - if 'con', print echo lines
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error (8 if timeout)
+              (error)      - error text if return > 0
+
+              return_code  - return code of the last command (as in shell script)
+              exec_time    - total execution time of commands (sec.)
+            }
+
+    """
+
+    import os
+    import re
+    import sys
+    import time
+    import shlex
+    import subprocess
+
+    o=i.get('out','')
+
+    plan=i['plan']
+    env=dict(plan['env'])
+    cwd=plan['cwd']
+
+    xto=i.get('timeout','')
+    if xto!='': xto=float(xto)
+
+    # Only $VAR and ${VAR} of set variables outside single quotes (checked by "prepare_direct_exec")
+    def expand(s):
+        return re.sub(r'\$(\w+|\{\w+\})', lambda m: env[m.group(1).strip('{}')], s)
+
+    rc=0
+    et=0.0
+    for c in plan['cmds']:
+        tp=c['type']
+
+        if tp=='check':
+           if rc!=0: return {'return':0, 'return_code':1, 'exec_time':et}
+
+        elif tp=='echo':
+           if o=='con':
+              x=expand(c['string'])
+              try:
+                 x=' '.join(shlex.split(x))
+              except ValueError:
+                 pass
+              ck.out(x)
+
+        elif tp=='env':
+           x=shlex.split(expand(c['value']))
+           env[c['key']]=x[0] if len(x)>0 else ''
+
+        else:
+           argv=[]
+           rd={}
+           xa=shlex.split(expand(c['string']))
+           q=0
+           while q<len(xa):
+               a=xa[q]
+               rf=re.match(r'^(2>>|2>|1>>|1>|>>|>|<)(.*)$', a)
+               if a=='2>&1':
+                  rd['2>']='&1'
+               elif rf!=None:
+                  r1=rf.group(1)
+                  r2=rf.group(2)
+                  if r2=='':
+                     q+=1
+                     if q<len(xa): r2=xa[q]
+                  if r1.startswith('1'): r1=r1[1:]
+                  rd[r1]=r2
+               else:
+                  argv.append(a)
+               q+=1
+
+           if len(argv)==0: continue
+
+           fs=[]
+           try:
+              fi=None
+              if '<' in rd:
+                 fi=open(os.path.join(cwd, rd['<']), 'rb')
+                 fs.append(fi)
+
+              fo=None
+              for k in ['>','>>']:
+                  if k in rd:
+                     fo=open(os.path.join(cwd, rd[k]), 'wb' if k=='>' else 'ab')
+                     fs.append(fo)
+
+              fe=None
+              if rd.get('2>','')=='&1':
+                 fe=subprocess.STDOUT
+              else:
+                 for k in ['2>','2>>']:
+                     if k in rd:
+                        fe=open(os.path.join(cwd, rd[k]), 'wb' if k=='2>' else 'ab')
+                        fs.append(fe)
+           except Exception as e:
+              for f in fs: f.close()
+              return {'return':1, 'error':'problem opening redirected file ('+format(e)+')'}
+
+           sys.stdout.flush()
+
+           to=None
+           if xto!='':
+              to=xto-et
+              if to<=0: to=0.001
+
+           t1=time.time()
+           try:
+              p=subprocess.Popen(argv, env=env, cwd=cwd, stdin=fi, stdout=fo, stderr=fe)
+           except OSError as e:
+              p=None
+              rc=127 # as in shell (command not found)
+              if o=='con': ck.out(argv[0]+': '+format(e))
+
+           if p!=None:
+              if to==None:
+                 rc=p.wait()
+              else:
+                 # Poll as in ck.system_with_timeout (wait with timeout is not available in Python 2)
+                 while p.poll()==None and time.time()-t1<to:
+                     time.sleep(0.01)
+
+                 rc=p.poll()
+                 if rc==None:
+                    p.kill()
+                    p.wait()
+                    for f in fs: f.close()
+                    return {'return':8, 'error':'process timed out and had been terminated'}
+
+              if rc<0: rc=128-rc # killed by signal (as in shell)
+
+           et+=time.time()-t1
+
+           for f in fs: f.close()
+
+    return {'return':0, 'return_code':rc, 'exec_time':et}
+
+##############################################################################
+# copy program
+
+def cp(i):
+    """
+    Input:  {
+               CID1
+               CID2
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+            }
+
+    """
+
+    i['common_func']='yes'
+    r=ck.access(i)
+    if r['return']>0: return r
+
+    ruid=r['repo_uid']
+    muid=r['module_uid']
+    duid=r['data_uid']
+    duoa=r['data_uoa']
+
+    d=r['dict']
+
+    d['backup_data_uid']=duid
+    d['data_name']=duoa
+
+    ii={'action':'update',
+        'module_uoa':muid,
+        'repo_uoa':ruid,
+        'data_uoa':duid,
+        'dict':d,
+        'ignore_update':'yes',
+        'sort_keys':'yes'}
+
+    return ck.access(ii)
+
+##############################################################################
+# Common action: copy (or move) data entry
+
+def copy(i):
+    """
+    See "cp" API
 
     """
 
@@ -6512,6 +7817,158 @@ def benchmark(i):
 
     return r
 
+##############################################################################
+# resolve deps via "env resolve" with persistent cache across sessions
+
+def resolve_deps(i):
+    """
+    Input:  {
+              input        - input for "ck resolve env"
+              (cache)      - if 'yes', reuse deps resolved earlier with the same input
+                             (tags and other keys of deps, host/target OS and device)
+              (cache_file) - JSON file with cache (~/.ck-resolve-cache.json by default)
+            }
+
+    Output: {
+              output from "ck resolve env"
+
+              (cached)     - 'yes' if restored from cache
+            }
+
+    """
+
+    import os
+    import copy
+    import json
+    import hashlib
+
+    ii=i['input']
+
+    if i.get('cache','')!='yes' or ii.get('random','')=='yes':
+       return ck.access(ii)
+
+    fn=i.get('cache_file','')
+    if fn=='': fn=cfg.get('resolve_cache_file','')
+    if fn=='': fn=os.path.join(os.path.expanduser('~'), '.ck-resolve-cache.json')
+
+    if resolve_cache.get('file','')!=fn:
+       resolve_cache.clear()
+       resolve_cache['file']=fn
+       resolve_cache['entries']={}
+
+       if os.path.isfile(fn):
+          rx=ck.load_json_file({'json_file':fn})
+          if rx['return']==0: resolve_cache['entries']=rx['dict']
+
+    entries=resolve_cache['entries']
+
+    # Key (deps without keys added during resolution)
+    dk={}
+    deps=ii.get('deps',{})
+    for k in deps:
+        dk[k]={}
+        for q in deps[k]:
+            if q not in ['dict','bat','cus','deps','choices','ver','num_entries']:
+               dk[k][q]=deps[k][q]
+
+    x=[ii.get('host_os',''), ii.get('target_os',''), ii.get('device_id',''), ii.get('install_to_env',''),
+       ii.get('install_env',{}), ii.get('add_customize',''), ii.get('safe',''), dk]
+
+    try:
+       key=hashlib.md5(json.dumps(x, sort_keys=True).encode('utf8')).hexdigest()
+    except Exception as e:
+       return ck.access(ii)
+
+    # Check that env entries still exist and were not changed
+    e=entries.get(key,None)
+    if e!=None:
+       valid=True
+       for q in e.get('env_entries',{}):
+           rx=get_env_entry_fingerprint(q)
+           if rx['return']>0 or rx['fingerprint']!=e['env_entries'][q]:
+              valid=False
+              break
+
+       if valid:
+          r=copy.deepcopy(e['output'])
+          r['return']=0
+          r['cached']='yes'
+
+          if ii.get('out','')=='con':
+             ck.out('Dependencies are restored from resolve cache ...')
+             for q in r.get('deps',{}):
+                 ck.out('  '+q+' env = '+r['deps'][q].get('uoa',''))
+
+          # Deps are updated in place by "env resolve"
+          deps.update(copy.deepcopy(r.get('deps',{})))
+
+          return r
+
+       del(entries[key])
+
+    r=ck.access(ii)
+    if r['return']>0: return r
+
+    # Fingerprints of all resolved env entries (including sub-deps)
+    fp={}
+    ok=True
+
+    xdeps=[r.get('deps',{})]
+    while len(xdeps)>0 and ok:
+        d=xdeps.pop()
+        for q in d:
+            u=d[q].get('uoa','')
+            if u!='' and u not in fp:
+               rx=get_env_entry_fingerprint(u)
+               if rx['return']>0:
+                  ok=False
+                  break
+               fp[u]=rx['fingerprint']
+            xdeps.append(d[q].get('deps',{}))
+
+    if ok:
+       o={}
+       for q in r:
+           if q!='return': o[q]=r[q]
+
+       try:
+          o=json.loads(json.dumps(o))
+       except Exception as e:
+          ok=False
+
+    if ok:
+       entries[key]={'env_entries':fp, 'output':o}
+
+       rx=ck.save_json_to_file({'json_file':fn+'.tmp', 'dict':entries})
+       if rx['return']>0: return rx
+
+       try:
+          os.rename(fn+'.tmp', fn)
+       except Exception as e:
+          return {'return':1, 'error':'can\'t update resolve cache ('+format(e)+')'}
+
+    return r
+
+##############################################################################
+# get fingerprint of env entry (to check that resolved deps are still valid)
+
+def get_env_entry_fingerprint(uoa):
+    import os
+
+    rx=ck.access({'action':'find',
+                  'module_uoa':cfg['module_deps']['env'],
+                  'data_uoa':uoa})
+    if rx['return']>0: return rx
+
+    p=rx['path']
+
+    x=[]
+    for fn in [os.path.join(p, '.cm', 'meta.json'), os.path.join(p, 'env.sh'), os.path.join(p, 'env.bat')]:
+        if os.path.isfile(fn):
+           x.append(str(os.path.getmtime(fn)))
+
+    return {'return':0, 'fingerprint':':'.join(x)}
+
 ##############################################################################
 # Update run-time deps
 
@@ -6525,6 +7982,8 @@ def update_run_time_deps(i):
               (deps)       - possibly resolved deps
               (deps_cache) - deps cache (to reuse deps if needed)
               (reuse_deps) - if 'yes', always attempt to reuse deps from above cache
+              (resolve_cache)      - if 'yes', reuse deps resolved in earlier sessions (see "resolve_deps")
+              (resolve_cache_file) - JSON file with resolved deps
 
               (meta)       - program meta
               (cmd_key)    - command line key
@@ -6571,6 +8030,8 @@ def update_run_time_deps(i):
 
     deps_cache=i.get('deps_cache','')
     reuse_deps=i.get('reuse_deps','')
+    rvcache=i.get('resolve_cache','')
+    rvcache_file=i.get('resolve_cache_file','')
 
     o=i.get('out','')
     oo=''
@@ -6642,7 +8103,7 @@ def update_run_time_deps(i):
        if meta.get('pass_env_to_resolve', '')=='yes':
             ii.update({ 'install_env': i.get('env_for_resolve',{}) })
 
-       rx=ck.access(ii)
+       rx=resolve_deps({'input':ii, 'cache':rvcache, 'cache_file':rvcache_file})
        if rx['return']>0: return rx
 
        rr['resolve']=rx
@@ -0,0 +1,240 @@
+#
+# Adaptive probabilistic autotuner plugin
+# (learns probability of each choice value to improve objective; see "custom_autotuner" in "ck autotune pipeline")
+#
+# Collective Knowledge (CK)
+#
+# See CK LICENSE.txt for licensing details.
+# See CK COPYRIGHT.txt for copyright details.
+#
+# Usage:
+#  ck autotune program:xyz --iterations=100
+#     --custom_autotuner={"module_uoa":"script","data_uoa":"autotuner.adaptive","script":"adaptive"}
+#     --custom_autotuner_vars={"objective":"##characteristics#run#execution_time#min","persist":"yes"}
+#
+
+import copy
+import json
+import os
+
+##############################################################################
+# make next choices (one candidate per autotuning iteration)
+
+def make(i):
+    """
+    Input:  {
+              (ck_kernel)            - CK kernel
+              autotuner_common       - helpers shared by autotuner plugins (script:autotuner.common, loaded by pipeline)
+              choices_desc           - dict with description of choices (flat format)
+              choices_order          - list of list of flat choice keys (to select tuned keys)
+              state                  - state preserved across iterations (probabilities are kept in state['adaptive'])
+              (random_module)        - random module with seed
+              (pipeline)             - pipeline (to get compiler description and program for persistent probabilities)
+
+              (last_stat_dict)       - flat dict with statistical analysis of previous iteration
+              (last_pipeline_state)  - pipeline state of previous iteration (to check fail)
+              (frontier_keys)        - if objective is not specified, the first key is used
+
+              (vars)                 - {
+                                         (objective)         - flat key of minimized characteristic
+                                                               (such as ##characteristics#run#execution_time#min)
+                                         (objective_reverse) - if 'yes', maximize
+                                         (keys)              - list of wildcards of tuned keys (default ["##compiler_flags#*"])
+                                         (improvement)       - minimal relative improvement over reference to count
+                                                               as a success (default=0.0)
+                                         (explore)           - probability to select a value uniformly (default=0.1)
+                                         (start_from_default)- if 'yes' (default), first candidate is the default one
+                                                               (all keys are empty) and is used as reference
+                                         (persist)           - if 'yes', keep probabilities per compiler description
+                                                               and program in a JSON file to start next sessions warm
+                                         (probabilities_file)- JSON file with above probabilities
+                                                               (~/.ck-adaptive-probabilities.json by default)
+                                       }
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              keys         - dict with flat keys and values to set in pipeline
+              finish       - False (iterations are limited by autotuning)
+            }
+
+    """
+
+    from random import Random
+
+    ck=i.get('ck_kernel',None)
+
+    o=i.get('out','')
+
+    cdesc=i.get('choices_desc',{})
+    corder=i.get('choices_order',[])
+    state=i.get('state',{})
+
+    my_random=i.get('random_module',None)
+    if my_random==None: my_random=Random()
+
+    v=i.get('vars',{})
+
+    cm=i.get('autotuner_common',None)
+    if cm==None:
+       return {'return':1, 'error':'helpers shared by autotuner plugins (script:autotuner.common) are not passed by pipeline'}
+
+    r=cm.get_objectives_desc({'vars':v, 'frontier_keys':i.get('frontier_keys',[]),
+                              'frontier_keys_reverse':i.get('frontier_keys_reverse',[]),
+                              'name':'adaptive autotuner'})
+    if r['return']>0: return r
+    ok=r['objectives'][0]
+    orev=r['reverse']
+
+    # Keys to tune (in the order of choices)
+    kw=v.get('keys',['##compiler_flags#*'])
+
+    r=cm.get_tuned_keys({'choices_order':corder, 'keys':kw})
+    if r['return']>0: return r
+    keys=r['keys']
+
+    dom={}
+    for k in keys:
+        dom[k]=cm.get_domain(cdesc.get(k,{}))
+
+    imp=float(v.get('improvement',0.0))
+    expl=float(v.get('explore',0.1))
+    sfd=v.get('start_from_default','yes')
+
+    # Persistent probabilities (per compiler description and program)
+    pf=''
+    pk=''
+    if v.get('persist','')=='yes':
+       pf=v.get('probabilities_file','')
+       if pf=='': pf=os.path.join(os.path.expanduser('~'), '.ck-adaptive-probabilities.json')
+
+       pc=i.get('pipeline',{}).get('choices',{})
+       pk=pc.get('compiler_description_uoa','')+':'+pc.get('data_uoa','')+':'+ok
+
+    # Restore search state
+    if 'adaptive' not in state:
+       prob={}
+       if pf!='' and os.path.isfile(pf):
+          r=load_probabilities(pf)
+          if r['return']>0: return r
+          prob=r['dict'].get(pk,{})
+
+       state['adaptive']={'probabilities':prob,
+                          'reference':None,
+                          'pending':None,
+                          'iterations':0}
+    s=state['adaptive']
+    prob=s['probabilities']
+
+    # Take result of the candidate proposed at previous iteration
+    x=s.get('pending',None)
+    if x!=None:
+       y=cm.get_objective_values({'stat_dict':i.get('last_stat_dict',{}),
+                                  'pipeline_state':i.get('last_pipeline_state',{}),
+                                  'objectives':[ok],
+                                  'reverse':orev})
+       if y!=None: y=y[0]
+
+       ref=s.get('reference',None)
+       if ref==None:
+          # The first successful result is the reference
+          s['reference']=y
+       else:
+          success=(y!=None and y<ref-abs(ref)*imp)
+
+          for k in x:
+              update_probability(prob, k, x[k], success)
+
+          if pf!='':
+             r=save_probabilities(pf, pk, prob)
+             if r['return']>0: return r
+
+       s['pending']=None
+
+    # Select next candidate
+    genes={}
+    if s['iterations']==0 and sfd=='yes':
+       for k in keys: genes[k]=''
+    else:
+       for k in keys:
+           genes[k]=sample_value(prob.get(k,{}), dom[k], expl, my_random)
+
+    s['pending']=genes
+    s['iterations']+=1
+
+    if o=='con' and ck!=None:
+       ck.out('')
+       x='  Adaptive autotuner: iteration '+str(s['iterations'])+', learned '+str(len(prob))+' choice(s)'
+       if pf!='': x+=' (persistent)'
+       ck.out(x)
+
+    return {'return':0, 'keys':copy.deepcopy(genes), 'finish':False}
+
+##############################################################################
+# update counters of successes and trials for one value of a choice
+
+def update_probability(prob, k, x, success):
+    vk=json.dumps(x)
+
+    if k not in prob: prob[k]={}
+    if vk not in prob[k]: prob[k][vk]=[0,0]
+
+    if success: prob[k][vk][0]+=1
+    prob[k][vk][1]+=1
+
+    return
+
+##############################################################################
+# sample value of a choice proportionally to its probability to improve objective
+# (Laplace estimate; values without trials get 0.5)
+
+def sample_value(pk, dom, expl, my_random):
+    if len(dom)==1 or my_random.random()<expl:
+       return my_random.choice(dom)
+
+    w=[]
+    for x in dom:
+        c=pk.get(json.dumps(x),[0,0])
+        w.append((c[0]+1.0)/(c[1]+2.0))
+
+    r=my_random.random()*sum(w)
+    for q in range(0, len(dom)):
+        r-=w[q]
+        if r<0: return dom[q]
+
+    return dom[-1]
+
+##############################################################################
+# load persistent probabilities
+
+def load_probabilities(pf):
+    try:
+       with open(pf) as f:
+          d=json.load(f)
+    except Exception as e:
+       return {'return':1, 'error':'problem loading adaptive probabilities from '+pf+' ('+format(e)+')'}
+
+    return {'return':0, 'dict':d}
+
+##############################################################################
+# save persistent probabilities (merged with other compiler descriptions and programs)
+
+def save_probabilities(pf, pk, prob):
+    d={}
+    if os.path.isfile(pf):
+       r=load_probabilities(pf)
+       if r['return']==0: d=r['dict']
+
+    d[pk]=prob
+
+    try:
+       with open(pf+'.tmp','w') as f:
+          json.dump(d, f, indent=1, sort_keys=True)
+       os.rename(pf+'.tmp', pf)
+    except Exception as e:
+       return {'return':1, 'error':'problem saving adaptive probabilities to '+pf+' ('+format(e)+')'}
+
+    return {'return':0}
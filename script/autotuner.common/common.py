@@ -0,0 +1,175 @@
+#
+# Helpers shared by autotuner plugins (script:autotuner.adaptive, script:autotuner.nsga2, script:autotuner.surrogate)
+#
+# Collective Knowledge (CK)
+#
+# See CK LICENSE.txt for licensing details.
+# See CK COPYRIGHT.txt for copyright details.
+#
+# Loaded once by autotuning pipeline and passed to "make" of plugin as "autotuner_common"
+#
+
+import fnmatch
+import json
+
+##############################################################################
+# select tuned keys (in the order of choices)
+
+def get_tuned_keys(i):
+    """
+    Input:  {
+              choices_order - list of list of flat choice keys
+              keys          - list of wildcards of tuned keys
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              keys         - list of tuned flat keys
+            }
+
+    """
+
+    kw=i['keys']
+
+    keys=[]
+    for cx in i.get('choices_order',[]):
+        for k in cx:
+            if k not in keys:
+               for w in kw:
+                   if fnmatch.fnmatch(k,w):
+                      keys.append(k)
+                      break
+
+    if len(keys)==0:
+       return {'return':1, 'error':'no choices to tune matched '+json.dumps(kw)}
+
+    return {'return':0, 'keys':keys}
+
+##############################################################################
+# get objectives from plugin vars or frontier keys
+
+def get_objectives_desc(i):
+    """
+    Input:  {
+              vars                    - plugin vars with (objective) and (objective_reverse) - one objective,
+                                        or (objectives) and (objectives_reverse) - list of objectives
+              (frontier_keys)         - used if objectives are not specified in vars
+              (frontier_keys_reverse) - list of True/False for above keys
+              (multi)                 - if 'yes', use all frontier keys (otherwise only the first one)
+              (name)                  - name of autotuner (for error)
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              objectives   - list of flat keys of objectives (minimized)
+              reverse      - list of True/False for above keys (if True, maximize)
+            }
+
+    """
+
+    v=i.get('vars',{})
+    multi=i.get('multi','')
+
+    obj=v.get('objectives',[])
+    objr=v.get('objectives_reverse',[])
+
+    ok=v.get('objective','')
+    orev=v.get('objective_reverse','')
+    if ok!='':
+       obj=[ok]
+       objr=[]
+
+    if len(obj)==0:
+       obj=i.get('frontier_keys',[])
+       objr=i.get('frontier_keys_reverse',[])
+       if multi!='yes':
+          obj=obj[:1]
+          objr=objr[:1]
+
+    if multi!='yes' and orev!='':
+       objr=[orev==True or orev=='yes']
+
+    if len(obj)==0:
+       x='objectives (frontier_keys or "objectives" var)'
+       if multi!='yes': x='objective (var "objective" or frontier_keys)'
+       return {'return':1, 'error':i.get('name','autotuner')+' needs '+x}
+
+    return {'return':0, 'objectives':obj, 'reverse':objr}
+
+##############################################################################
+# get values of objectives from statistical analysis (None if failed)
+# (values of maximized objectives are negated)
+
+def get_objective_values(i):
+    """
+    Input:  {
+              stat_dict      - flat dict with statistical analysis
+              pipeline_state - pipeline state (to check fail)
+              objectives     - list of flat keys of objectives
+              (reverse)      - list of True/False for above keys
+            }
+
+    Output: list of values or None
+    """
+
+    sd=i.get('stat_dict',{})
+    ps=i.get('pipeline_state',{})
+
+    if ps.get('fail','')=='yes': return None
+
+    rev=i.get('reverse',[])
+
+    ov=[]
+    for q in range(0, len(i['objectives'])):
+        k=i['objectives'][q]
+
+        x=sd.get(k,None)
+        if x==None or x=='': return None
+
+        x=float(x)
+        if q<len(rev) and rev[q]: x=-x
+
+        ov.append(x)
+
+    return ov
+
+##############################################################################
+# get all possible values of a choice (as in choice.make)
+
+def get_domain(d):
+    yhc=d.get('choice',[])
+    if len(yhc)==0: yhc=d.get('choices',[])
+
+    yep=d.get('explore_prefix','')
+
+    dom=[]
+    if len(yhc)>0:
+       dom=list(yhc)
+    elif d.get('explore_start','')!='':
+       tp=d.get('type','')
+       if tp=='float':
+          r1=float(d['explore_start'])
+          r2=float(d['explore_stop'])
+          rs=float(d['explore_step'])
+       else:
+          r1=int(d['explore_start'])
+          r2=int(d['explore_stop'])
+          rs=int(d['explore_step'])
+
+       x=r1
+       while x<=r2:
+           if yep!='': dom.append(yep+str(x))
+           else: dom.append(x)
+           if rs<=0: break
+           x+=rs
+
+    if d.get('can_omit','')=='yes' or len(dom)==0:
+       dom.insert(0,'')
+
+    return dom
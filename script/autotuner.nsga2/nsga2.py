@@ -0,0 +1,331 @@
+#
+# NSGA-II multi-objective autotuner plugin
+# (see "custom_autotuner" in "ck autotune pipeline")
+#
+# Collective Knowledge (CK)
+#
+# See CK LICENSE.txt for licensing details.
+# See CK COPYRIGHT.txt for copyright details.
+#
+# Usage:
+#  ck autotune program:xyz --iterations=200 @frontier_keys.json
+#     --custom_autotuner={"module_uoa":"script","data_uoa":"autotuner.nsga2","script":"nsga2"}
+#     --custom_autotuner_vars={"population_size":20}
+#
+
+import copy
+import json
+
+##############################################################################
+# make next choices (one candidate per autotuning iteration)
+
+def make(i):
+    """
+    Input:  {
+              (ck_kernel)            - CK kernel
+              autotuner_common       - helpers shared by autotuner plugins (script:autotuner.common, loaded by pipeline)
+              choices_desc           - dict with description of choices (flat format)
+              choices_order          - list of list of flat choice keys (to select tuned keys)
+              state                  - state preserved across iterations (population is kept in state['nsga2'])
+              (random_module)        - random module with seed
+
+              (last_stat_dict)       - flat dict with statistical analysis of previous iteration
+              (last_pipeline_state)  - pipeline state of previous iteration (to check fail)
+              (frontier_keys)        - flat keys of objectives (minimized)
+              (frontier_keys_reverse)- list of True/False for above keys (if True, maximize)
+
+              (vars)                 - {
+                                         (keys)                  - list of wildcards of tuned keys (default ["##compiler_flags#*"])
+                                         (objectives)            - flat keys of objectives (default frontier_keys)
+                                         (objectives_reverse)    - list of True/False for above keys
+                                         (population_size)       - default 20
+                                         (crossover_probability) - default 0.9
+                                         (mutation_probability)  - default 1/number of keys
+                                         (start_from_default)    - if 'yes' (default), first individual is the default one
+                                                                   (all keys are empty)
+                                       }
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              keys         - dict with flat keys and values to set in pipeline
+              finish       - False (iterations are limited by autotuning)
+            }
+
+    """
+
+    from random import Random
+
+    ck=i.get('ck_kernel',None)
+
+    o=i.get('out','')
+
+    cdesc=i.get('choices_desc',{})
+    corder=i.get('choices_order',[])
+    state=i.get('state',{})
+
+    my_random=i.get('random_module',None)
+    if my_random==None: my_random=Random()
+
+    v=i.get('vars',{})
+
+    cm=i.get('autotuner_common',None)
+    if cm==None:
+       return {'return':1, 'error':'helpers shared by autotuner plugins (script:autotuner.common) are not passed by pipeline'}
+
+    # Objectives
+    r=cm.get_objectives_desc({'vars':v, 'frontier_keys':i.get('frontier_keys',[]),
+                              'frontier_keys_reverse':i.get('frontier_keys_reverse',[]),
+                              'multi':'yes', 'name':'NSGA-II autotuner'})
+    if r['return']>0: return r
+    obj=r['objectives']
+    objr=r['reverse']
+
+    # Keys to tune (in the order of choices)
+    kw=v.get('keys',['##compiler_flags#*'])
+
+    r=cm.get_tuned_keys({'choices_order':corder, 'keys':kw})
+    if r['return']>0: return r
+    keys=r['keys']
+
+    dom={}
+    for k in keys:
+        dom[k]=cm.get_domain(cdesc.get(k,{}))
+
+    ps=int(v.get('population_size',20))
+    if ps<2: ps=2
+    if ps % 2==1: ps+=1
+
+    pc=float(v.get('crossover_probability',0.9))
+
+    pm=v.get('mutation_probability','')
+    if pm=='': pm=1.0/len(keys)
+    pm=float(pm)
+
+    sfd=v.get('start_from_default','yes')
+
+    # Restore search state
+    if 'nsga2' not in state:
+       state['nsga2']={'population':[],
+                       'offspring':[],
+                       'evaluated':{},
+                       'pending':None,
+                       'generation':0}
+    s=state['nsga2']
+
+    # Take objectives of the candidate proposed at previous iteration
+    x=s.get('pending',None)
+    if x!=None:
+       ov=cm.get_objective_values({'stat_dict':i.get('last_stat_dict',{}),
+                          'pipeline_state':i.get('last_pipeline_state',{}),
+                          'objectives':obj,
+                          'reverse':objr})
+
+       s['evaluated'][x['id']]=ov
+
+       x['objectives']=ov
+       if len(s['population'])<ps and s['generation']==0:
+          s['population'].append(x)
+       else:
+          s['offspring'].append(x)
+
+       s['pending']=None
+
+    # Select next candidate to evaluate
+    ind=None
+    while ind==None:
+        if len(s['population'])<ps and s['generation']==0:
+           # Initial population
+           genes={}
+           if sfd=='yes' and len(s['population'])==0:
+              for k in keys: genes[k]=''
+           else:
+              for k in keys:
+                  genes[k]=my_random.choice(dom[k])
+        else:
+           if len(s['offspring'])>=ps:
+              # New generation from parents and offspring (elitism)
+              s['population']=select_population(s['population']+s['offspring'], ps)
+              s['offspring']=[]
+              s['generation']+=1
+
+           genes=make_offspring(s['population'], keys, dom, pc, pm, my_random)
+
+        xid=json.dumps(genes, sort_keys=True)
+
+        if xid in s['evaluated']:
+           # Do not evaluate the same vector again
+           x={'id':xid, 'genes':genes, 'objectives':s['evaluated'][xid]}
+           if len(s['population'])<ps and s['generation']==0:
+              s['population'].append(x)
+           else:
+              s['offspring'].append(x)
+
+           # Avoid infinite loop when the space is small
+           if len(s['evaluated'])>=space_size(dom):
+              ind=x
+        else:
+           ind={'id':xid, 'genes':genes}
+
+    s['pending']=ind
+
+    if o=='con' and ck!=None:
+       ck.out('')
+       ck.out('  NSGA-II generation: '+str(s['generation'])+' (population: '+str(len(s['population']))+
+              ', offspring: '+str(len(s['offspring']))+')')
+
+    return {'return':0, 'keys':copy.deepcopy(ind['genes']), 'finish':False}
+
+##############################################################################
+# size of the space (to stop avoiding duplicates)
+
+def space_size(dom):
+    n=1
+    for k in dom:
+        n*=len(dom[k])
+        if n>1000000: break
+    return n
+
+##############################################################################
+# check if a dominates b (None - failed candidate, dominated by all others)
+
+def dominates(a, b):
+    if a==None: return False
+    if b==None: return True
+
+    better=False
+    for q in range(0, len(a)):
+        if a[q]>b[q]: return False
+        if a[q]<b[q]: better=True
+
+    return better
+
+##############################################################################
+# fast non-dominated sorting (list of fronts with indexes)
+
+def non_dominated_sort(pop):
+    n=len(pop)
+
+    sp=[[] for q in range(0,n)]
+    nd=[0]*n
+
+    fronts=[[]]
+    for p in range(0, n):
+        for q in range(0, n):
+            if p==q: continue
+            if dominates(pop[p]['objectives'], pop[q]['objectives']):
+               sp[p].append(q)
+            elif dominates(pop[q]['objectives'], pop[p]['objectives']):
+               nd[p]+=1
+        if nd[p]==0:
+           pop[p]['rank']=0
+           fronts[0].append(p)
+
+    f=0
+    while len(fronts[f])>0:
+        nf=[]
+        for p in fronts[f]:
+            for q in sp[p]:
+                nd[q]-=1
+                if nd[q]==0:
+                   pop[q]['rank']=f+1
+                   nf.append(q)
+        f+=1
+        fronts.append(nf)
+
+    return fronts[:-1]
+
+##############################################################################
+# crowding distance inside one front
+
+def crowding_distance(pop, front):
+    for p in front:
+        pop[p]['crowding']=0.0
+
+    valid=[p for p in front if pop[p]['objectives']!=None]
+    if len(valid)==0: return
+
+    no=len(pop[valid[0]]['objectives'])
+
+    for m in range(0, no):
+        sf=sorted(valid, key=lambda p: pop[p]['objectives'][m])
+
+        vmin=pop[sf[0]]['objectives'][m]
+        vmax=pop[sf[-1]]['objectives'][m]
+
+        # Boundary points are always kept (large value instead of inf to keep state JSON compatible)
+        pop[sf[0]]['crowding']=1e30
+        pop[sf[-1]]['crowding']=1e30
+
+        if vmax==vmin: continue
+
+        for q in range(1, len(sf)-1):
+            pop[sf[q]]['crowding']+=(pop[sf[q+1]]['objectives'][m]-pop[sf[q-1]]['objectives'][m])/(vmax-vmin)
+
+##############################################################################
+# select next population (by rank and crowding distance)
+
+def select_population(pop, n):
+    fronts=non_dominated_sort(pop)
+
+    npop=[]
+    for f in fronts:
+        crowding_distance(pop, f)
+
+        if len(npop)+len(f)<=n:
+           npop+=[pop[p] for p in f]
+        else:
+           sf=sorted(f, key=lambda p: -pop[p]['crowding'])
+           npop+=[pop[p] for p in sf[:n-len(npop)]]
+           break
+
+    return npop
+
+##############################################################################
+# binary tournament (by rank, then by crowding distance)
+
+def tournament(pop, my_random):
+    a=pop[my_random.randrange(0, len(pop))]
+    b=pop[my_random.randrange(0, len(pop))]
+
+    ra=a.get('rank',0)
+    rb=b.get('rank',0)
+
+    if ra<rb: return a
+    if rb<ra: return b
+
+    if a.get('crowding',0.0)>=b.get('crowding',0.0): return a
+    return b
+
+##############################################################################
+# make one offspring (uniform crossover and mutation of choice vectors)
+
+def make_offspring(pop, keys, dom, pc, pm, my_random):
+    if len(pop)>0 and 'rank' not in pop[0]:
+       # Initial population was not yet ranked
+       fronts=non_dominated_sort(pop)
+       for f in fronts:
+           crowding_distance(pop, f)
+
+    p1=tournament(pop, my_random)['genes']
+    p2=tournament(pop, my_random)['genes']
+
+    genes={}
+    cross=(my_random.random()<pc)
+    for k in keys:
+        x=p1.get(k,'')
+        if cross and my_random.random()<0.5:
+           x=p2.get(k,'')
+
+        if my_random.random()<pm and len(dom[k])>1:
+           y=x
+           while y==x:
+               y=my_random.choice(dom[k])
+           x=y
+
+        genes[k]=x
+
+    return genes
@@ -0,0 +1,326 @@
+#
+# Surrogate-model (Bayesian) autotuner plugin for numeric and categorical choices
+# (Gaussian process with expected improvement; see "custom_autotuner" in "ck autotune pipeline")
+#
+# Collective Knowledge (CK)
+#
+# See CK LICENSE.txt for licensing details.
+# See CK COPYRIGHT.txt for copyright details.
+#
+# Usage:
+#  ck autotune program:xyz --iterations=50
+#     --custom_autotuner={"module_uoa":"script","data_uoa":"autotuner.surrogate","script":"surrogate"}
+#     --custom_autotuner_vars={"objective":"##characteristics#run#execution_time#min"}
+#
+
+import copy
+import json
+
+##############################################################################
+# make next choices (one candidate per autotuning iteration)
+
+def make(i):
+    """
+    Input:  {
+              (ck_kernel)            - CK kernel
+              autotuner_common       - helpers shared by autotuner plugins (script:autotuner.common, loaded by pipeline)
+              choices_desc           - dict with description of choices (flat format)
+              choices_order          - list of list of flat choice keys (to select tuned keys)
+              state                  - state preserved across iterations (observations are kept in state['surrogate'])
+              (random_module)        - random module with seed
+
+              (last_stat_dict)       - flat dict with statistical analysis of previous iteration
+              (last_pipeline_state)  - pipeline state of previous iteration (to check fail)
+              (frontier_keys)        - if objective is not specified, the first key is used
+
+              (vars)                 - {
+                                         (objective)         - flat key of minimized characteristic
+                                                               (such as ##characteristics#run#execution_time#min)
+                                         (objective_reverse) - if 'yes', maximize
+                                         (keys)              - list of wildcards of tuned keys (default - all keys from choices_order)
+                                         (initial_samples)   - number of random samples before using the model (default=5)
+                                         (candidates)        - number of random candidates to evaluate expected improvement (default=1000)
+                                         (length_scale)      - kernel length scale for normalized choices (default=0.3)
+                                         (noise)             - observation noise (relative to variance; default=0.01)
+                                         (xi)                - exploration parameter of expected improvement (default=0.01)
+                                       }
+            }
+
+    Output: {
+              return       - return code =  0, if successful
+                                         >  0, if error
+              (error)      - error text if return > 0
+
+              keys         - dict with flat keys and values to set in pipeline
+              finish       - False (iterations are limited by autotuning)
+            }
+
+    """
+
+    from random import Random
+
+    try:
+       import numpy as np
+    except ImportError:
+       return {'return':1, 'error':'surrogate autotuner needs NumPy (pip install numpy)'}
+
+    ck=i.get('ck_kernel',None)
+
+    o=i.get('out','')
+
+    cdesc=i.get('choices_desc',{})
+    corder=i.get('choices_order',[])
+    state=i.get('state',{})
+
+    my_random=i.get('random_module',None)
+    if my_random==None: my_random=Random()
+
+    v=i.get('vars',{})
+
+    cm=i.get('autotuner_common',None)
+    if cm==None:
+       return {'return':1, 'error':'helpers shared by autotuner plugins (script:autotuner.common) are not passed by pipeline'}
+
+    r=cm.get_objectives_desc({'vars':v, 'frontier_keys':i.get('frontier_keys',[]),
+                              'frontier_keys_reverse':i.get('frontier_keys_reverse',[]),
+                              'name':'surrogate autotuner'})
+    if r['return']>0: return r
+    ok=r['objectives'][0]
+    orev=r['reverse']
+
+    # Keys to tune (in the order of choices)
+    kw=v.get('keys',['*'])
+
+    r=cm.get_tuned_keys({'choices_order':corder, 'keys':kw})
+    if r['return']>0: return r
+    keys=r['keys']
+
+    dims=[]
+    for k in keys:
+        r=get_dimension(k, cdesc.get(k,{}), cm)
+        if r['return']>0: return r
+        dims.append(r['dimension'])
+
+    nis=int(v.get('initial_samples',5))
+    nc=int(v.get('candidates',1000))
+    ls=float(v.get('length_scale',0.3))
+    noise=float(v.get('noise',0.01))
+    xi=float(v.get('xi',0.01))
+
+    # Restore search state
+    if 'surrogate' not in state:
+       state['surrogate']={'observations':[], 'pending':None}
+    s=state['surrogate']
+
+    # Take result of the candidate proposed at previous iteration
+    x=s.get('pending',None)
+    if x!=None:
+       y=cm.get_objective_values({'stat_dict':i.get('last_stat_dict',{}),
+                                  'pipeline_state':i.get('last_pipeline_state',{}),
+                                  'objectives':[ok],
+                                  'reverse':orev})
+       if y!=None: y=y[0]
+
+       s['observations'].append({'keys':x, 'value':y})
+       s['pending']=None
+
+    obs=s['observations']
+    valid=[q for q in obs if q['value']!=None]
+
+    seen=set()
+    for q in obs:
+        seen.add(json.dumps(q['keys'], sort_keys=True))
+
+    genes=None
+    if len(valid)<nis:
+       # Random sampling first
+       for attempt in range(0, 100):
+           genes=random_point(keys, dims, my_random)
+           if json.dumps(genes, sort_keys=True) not in seen: break
+    else:
+       X=np.array([encode(q['keys'], keys, dims) for q in valid])
+       Y=np.array([q['value'] for q in valid])
+
+       # Failed candidates get the worst value so that the model avoids them
+       worst=Y.max()
+       fX=[encode(q['keys'], keys, dims) for q in obs if q['value']==None]
+       if len(fX)>0:
+          X=np.vstack([X, np.array(fX)])
+          Y=np.concatenate([Y, np.full(len(fX), worst)])
+
+       # Candidates: random points and mutations of the best ones
+       cands=[]
+       for q in range(0, nc//2):
+           cands.append(random_point(keys, dims, my_random))
+
+       sv=sorted(valid, key=lambda q: q['value'])
+       nb=min(5, len(sv))
+       for q in range(0, nc-len(cands)):
+           cands.append(mutate_point(sv[q % nb]['keys'], keys, dims, my_random))
+
+       cands=[c for c in cands if json.dumps(c, sort_keys=True) not in seen]
+
+       if len(cands)==0:
+          genes=random_point(keys, dims, my_random)
+       else:
+          C=np.array([encode(c, keys, dims) for c in cands])
+
+          ei=expected_improvement(X, Y, C, ls, noise, xi, np)
+
+          genes=cands[int(np.argmax(ei))]
+
+    s['pending']=genes
+
+    if o=='con' and ck!=None:
+       ck.out('')
+       x='  Surrogate autotuner: '+str(len(valid))+' observation(s)'
+       if len(valid)<nis: x+=' (random sampling)'
+       ck.out(x)
+
+    return {'return':0, 'keys':copy.deepcopy(genes), 'finish':False}
+
+##############################################################################
+# describe one choice dimension (numeric range or categorical list)
+
+def get_dimension(k, d, cm):
+    yhc=d.get('choice',[])
+    if len(yhc)==0: yhc=d.get('choices',[])
+
+    yep=d.get('explore_prefix','')
+    tp=d.get('type','')
+
+    if len(yhc)==0 and d.get('explore_start','')!='':
+       if tp=='float':
+          r1=float(d['explore_start'])
+          r2=float(d['explore_stop'])
+          rs=float(d['explore_step'])
+       else:
+          r1=int(d['explore_start'])
+          r2=int(d['explore_stop'])
+          rs=int(d['explore_step'])
+
+       if rs<=0:
+          return {'return':1, 'error':'explore_step of choice '+k+' must be positive (surrogate autotuner)'}
+
+       return {'return':0, 'dimension':{'type':'numeric', 'start':r1, 'stop':r2, 'step':rs, 'prefix':yep,
+                                        'float':(tp=='float'), 'can_omit':d.get('can_omit','')}}
+
+    vals=cm.get_domain(d)
+
+    # Numeric list (such as unroll factors) is treated as ordered
+    numeric=True
+    for q in vals:
+        if type(q)!=int and type(q)!=float:
+           numeric=False
+           break
+
+    if numeric and len(vals)>1:
+       return {'return':0, 'dimension':{'type':'ordered', 'values':vals}}
+
+    return {'return':0, 'dimension':{'type':'categorical', 'values':vals}}
+
+##############################################################################
+# random point
+
+def random_point(keys, dims, my_random):
+    p={}
+    for q in range(0, len(keys)):
+        d=dims[q]
+        if d['type']=='numeric':
+           n=int((d['stop']-d['start'])/d['step'])+1
+           x=d['start']+my_random.randrange(0, max(n,1))*d['step']
+           p[keys[q]]=numeric_value(x, d)
+        else:
+           p[keys[q]]=my_random.choice(d['values'])
+    return p
+
+##############################################################################
+# mutate one or two dimensions of a point (local search around good points)
+
+def mutate_point(p, keys, dims, my_random):
+    p=copy.deepcopy(p)
+    for k in range(0, my_random.randrange(1,3)):
+        q=my_random.randrange(0, len(keys))
+        d=dims[q]
+        if d['type']=='numeric':
+           n=int((d['stop']-d['start'])/d['step'])+1
+           x=d['start']+my_random.randrange(0, max(n,1))*d['step']
+           p[keys[q]]=numeric_value(x, d)
+        else:
+           p[keys[q]]=my_random.choice(d['values'])
+    return p
+
+##############################################################################
+# numeric value with explore prefix (as in choice.make)
+
+def numeric_value(x, d):
+    if not d['float']: x=int(x)
+    if d['prefix']!='': return d['prefix']+str(x)
+    return x
+
+##############################################################################
+# encode point as a vector in [0,1] (one-hot for categorical choices)
+
+def encode(p, keys, dims):
+    vec=[]
+    for q in range(0, len(keys)):
+        d=dims[q]
+        x=p.get(keys[q],'')
+
+        if d['type']=='numeric':
+           if d['prefix']!='' and type(x)!=int and type(x)!=float and x.startswith(d['prefix']):
+              x=x[len(d['prefix']):]
+           try:
+              x=float(x)
+           except (TypeError, ValueError):
+              x=d['start']
+           r=d['stop']-d['start']
+           vec.append((x-d['start'])/r if r!=0 else 0.0)
+
+        elif d['type']=='ordered':
+           vals=d['values']
+           j=vals.index(x) if x in vals else 0
+           vec.append(float(j)/(len(vals)-1))
+
+        else:
+           for y in d['values']:
+               vec.append(1.0 if x==y else 0.0)
+
+    return vec
+
+##############################################################################
+# expected improvement of candidates using Gaussian process (RBF kernel) fitted to observations
+
+def expected_improvement(X, Y, C, ls, noise, xi, np):
+    import math
+
+    ym=Y.mean()
+    ys=Y.std()
+    if ys==0: ys=1.0
+    Yn=(Y-ym)/ys
+
+    def kernel(A, B):
+        d=(A*A).sum(1)[:,None]+(B*B).sum(1)[None,:]-2.0*A.dot(B.T)
+        return np.exp(-0.5*np.maximum(d,0.0)/(ls*ls))
+
+    K=kernel(X, X)+noise*np.eye(len(X))
+    L=np.linalg.cholesky(K)
+
+    alpha=np.linalg.solve(L.T, np.linalg.solve(L, Yn))
+
+    Ks=kernel(C, X)
+    mu=Ks.dot(alpha)
+
+    vv=np.linalg.solve(L, Ks.T)
+    var=np.maximum(1.0-(vv*vv).sum(0), 1e-12)
+    sd=np.sqrt(var)
+
+    # Minimization
+    best=Yn.min()
+    imp=best-mu-xi
+    z=imp/sd
+
+    cdf=0.5*(1.0+np.array([math.erf(q/math.sqrt(2.0)) for q in z]))
+    pdf=np.exp(-0.5*z*z)/math.sqrt(2.0*math.pi)
+
+    return imp*cdf+sd*pdf
@@ -0,0 +1,62 @@
+#
+# Load CK modules and scripts without CK kernel (for unit tests of their pure helpers)
+#
+# Collective Knowledge (CK)
+#
+# See CK LICENSE.txt for licensing details.
+# See CK COPYRIGHT.txt for copyright details.
+#
+
+import importlib.util
+import json
+import os
+
+root=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+##############################################################################
+# minimal kernel with functions used by tested helpers
+
+class Kernel(object):
+    def __init__(self, code=None):
+        self.code=code or {}
+
+    def out(self, s):
+        return
+
+    def get_by_flat_key(self, i):
+        v=i['dict']
+        for k in i['key'][2:].split('#'):
+            if type(v)!=dict or k not in v: return {'return':0, 'value':None}
+            v=v[k]
+        return {'return':0, 'value':v}
+
+    def set_by_flat_key(self, i):
+        return {'return':0, 'dict':i['dict']}
+
+    def access(self, i):
+        return {'return':0, 'path':''}
+
+    def load_module_from_path(self, i):
+        return {'return':0, 'code':self.code[i['module_code_name']]}
+
+##############################################################################
+# load python file
+
+def load(path, name):
+    spec=importlib.util.spec_from_file_location(name, os.path.join(root, path))
+    m=importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(m)
+    return m
+
+##############################################################################
+# load CK module with its meta and minimal kernel
+
+def load_module(name):
+    m=load(os.path.join('module', name, 'module.py'), 'ck_module_'+name.replace('.','_'))
+
+    with open(os.path.join(root, 'module', name, '.cm', 'meta.json')) as f:
+       m.cfg=json.load(f)
+
+    m.ck=Kernel()
+
+    return m
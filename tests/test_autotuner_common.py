@@ -0,0 +1,46 @@
+#
+# Unit tests of helpers shared by autotuner plugins
+#
+
+import unittest
+
+import ck_mock
+
+common=ck_mock.load('script/autotuner.common/common.py', 'common')
+
+class TestCommon(unittest.TestCase):
+    def test_tuned_keys(self):
+        r=common.get_tuned_keys({'choices_order':[['##compiler_flags#a','##env#x'], ['##compiler_flags#a','##compiler_flags#b']],
+                                 'keys':['##compiler_flags#*']})
+        self.assertEqual(r['keys'], ['##compiler_flags#a','##compiler_flags#b'])
+
+        r=common.get_tuned_keys({'choices_order':[['##env#x']], 'keys':['##compiler_flags#*']})
+        self.assertGreater(r['return'], 0)
+
+    def test_objectives(self):
+        r=common.get_objectives_desc({'vars':{}, 'frontier_keys':['##t','##s'], 'frontier_keys_reverse':[False,True], 'multi':'yes'})
+        self.assertEqual((r['objectives'], r['reverse']), (['##t','##s'], [False,True]))
+
+        r=common.get_objectives_desc({'vars':{'objective_reverse':'yes'}, 'frontier_keys':['##t','##s']})
+        self.assertEqual((r['objectives'], r['reverse']), (['##t'], [True]))
+
+        r=common.get_objectives_desc({'vars':{}, 'name':'x'})
+        self.assertGreater(r['return'], 0)
+
+    def test_objective_values(self):
+        sd={'##t':'2.0', '##s':3}
+        self.assertEqual(common.get_objective_values({'stat_dict':sd, 'objectives':['##t','##s'], 'reverse':[False,True]}), [2.0,-3.0])
+        self.assertIsNone(common.get_objective_values({'stat_dict':sd, 'objectives':['##x']}))
+        self.assertIsNone(common.get_objective_values({'stat_dict':sd, 'pipeline_state':{'fail':'yes'}, 'objectives':['##t']}))
+
+    def test_domain(self):
+        self.assertEqual(common.get_domain({'choice':['-a','-b'], 'can_omit':'yes'}), ['','-a','-b'])
+        self.assertEqual(common.get_domain({'explore_start':1, 'explore_stop':3, 'explore_step':1, 'explore_prefix':'-u'}), ['-u1','-u2','-u3'])
+        self.assertEqual(common.get_domain({}), [''])
+
+    def test_domain_zero_step(self):
+        self.assertEqual(common.get_domain({'explore_start':2, 'explore_stop':5, 'explore_step':0}), [2])
+        self.assertEqual(common.get_domain({'type':'float', 'explore_start':1, 'explore_stop':2, 'explore_step':-0.5}), [1.0])
+
+if __name__=='__main__':
+    unittest.main()
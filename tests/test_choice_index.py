@@ -0,0 +1,34 @@
+#
+# Unit tests of index of vectors of choices in choice module
+#
+
+import itertools
+import unittest
+
+import ck_mock
+
+choice=ck_mock.load_module('choice')
+
+def dim(**kw):
+    d={'range':False, 'r1':0, 'r2':0, 'rs':1, 'choice':[], 'first':'', 'prefix':'', 'can_omit':''}
+    d.update(kw)
+    return d
+
+class TestVectorIndex(unittest.TestCase):
+    def test_dims(self):
+        ld=choice.get_index_dims([dim(choice=['-O1','-O3']),
+                                  dim(range=True, r1=1, r2=4, rs=1, prefix='-funroll=', can_omit='yes'),
+                                  dim(first='x')])
+        self.assertEqual(ld, [['-O1','-O3'], ['','-funroll=1','-funroll=2','-funroll=3','-funroll=4'], ['x']])
+
+    def test_zero_step(self):
+        ld=choice.get_index_dims([dim(range=True, r1=2, r2=5, rs=0)])
+        self.assertEqual(ld, [[2]])
+
+    def test_vectors_as_in_loops(self):
+        ld=[['a','b'], [1,2,3], ['x','y']]
+        vv=[choice.get_vector_by_index(ld, k) for k in range(0, 12)]
+        self.assertEqual(vv, [list(x) for x in itertools.product(*ld)])
+
+if __name__=='__main__':
+    unittest.main()
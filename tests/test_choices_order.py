@@ -0,0 +1,62 @@
+#
+# Unit tests of expansion of wildcards in choices order (pipeline module)
+#
+
+import os
+import tempfile
+import unittest
+
+import ck_mock
+
+pipeline=ck_mock.load_module('pipeline')
+
+cdesc={'##compiler_flags#a':{'tags':['basic'], 'sort':2},
+       '##compiler_flags#b':{'tags':['basic','loop'], 'sort':1},
+       '##compiler_flags#c':{'tags':['experimental']},
+       '##env#x':{}}
+
+def expand(sel, desc=cdesc, **kw):
+    x={'choices_desc':desc, 'choices_order':[['##compiler_flags#*']], 'choices_selection':[sel],
+       'compiler_description_uoa':'gcc'}
+    x.update(kw)
+    return pipeline.expand_choices_order(x)
+
+class TestExpandChoicesOrder(unittest.TestCase):
+    def setUp(self):
+        pipeline.choices_index.clear()
+
+    def test_tags(self):
+        self.assertEqual(expand({})['choices_order'], [['##compiler_flags#c','##compiler_flags#b','##compiler_flags#a']])
+        self.assertEqual(expand({'tags':'basic', 'notags':'loop'})['choices_order'], [['##compiler_flags#a']])
+        self.assertEqual(expand({'anytags':'loop, experimental'})['choices_order'], [['##compiler_flags#c','##compiler_flags#b']])
+
+    def test_empty_anytags(self):
+        # as before caching: anytags made of separators do not match any tag
+        self.assertEqual(expand({'anytags':' , '})['choices_order'], [[]])
+
+    def test_cache(self):
+        self.assertNotIn('cached', expand({'tags':'basic'}))
+        self.assertEqual(expand({'tags':'basic'}).get('cached',''), 'yes')
+
+        # changed tags invalidate entry
+        d=dict(cdesc)
+        d['##compiler_flags#c']={'tags':['basic']}
+        r=expand({'tags':'basic'}, desc=d)
+        self.assertNotIn('cached', r)
+        self.assertEqual(len(r['choices_order'][0]), 3)
+
+    def test_evict_oldest(self):
+        pipeline.ck.save_json_to_file=lambda i: {'return':0}
+        pipeline.cfg['choices_index_max_size']=2
+        try:
+           for t in ['basic','loop','experimental']:
+               expand({'tags':t}, index='yes', index_file=os.path.join(tempfile.gettempdir(), 'missing-ck-choices-index.json'))
+           self.assertEqual(len(pipeline.choices_index), 2)
+           self.assertNotIn('cached', expand({'tags':'basic'}))
+           self.assertEqual(expand({'tags':'experimental'}).get('cached',''), 'yes')
+        finally:
+           del(pipeline.cfg['choices_index_max_size'])
+           del(pipeline.ck.save_json_to_file)
+
+if __name__=='__main__':
+    unittest.main()
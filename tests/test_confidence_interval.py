@@ -0,0 +1,39 @@
+#
+# Unit tests of confidence intervals in pipeline module
+#
+
+import unittest
+
+import ck_mock
+
+pipeline=ck_mock.load_module('pipeline')
+
+class TestConfidenceInterval(unittest.TestCase):
+    def test_empty(self):
+        r=pipeline.get_confidence_interval({'values':[]})
+        self.assertEqual(r['return'], 0)
+        self.assertIsNone(r['mean'])
+        self.assertIsNone(r['half_width'])
+
+    def test_one_value(self):
+        r=pipeline.get_confidence_interval({'values':[2.0]})
+        self.assertEqual(r['mean'], 2.0)
+        self.assertIsNone(r['half_width'])
+
+    def test_two_values(self):
+        # t(0.975, df=1)=12.706, s=sqrt(2), half-width=t*s/sqrt(2)
+        r=pipeline.get_confidence_interval({'values':[1.0, 3.0]})
+        self.assertAlmostEqual(r['mean'], 2.0)
+        self.assertAlmostEqual(r['half_width'], 12.706, places=3)
+        self.assertAlmostEqual(r['relative_half_width'], 12.706/2.0, places=3)
+
+    def test_constant_values(self):
+        r=pipeline.get_confidence_interval({'values':[5.0]*10})
+        self.assertEqual(r['half_width'], 0.0)
+
+    def test_unsupported_confidence(self):
+        r=pipeline.get_confidence_interval({'values':[1.0, 2.0], 'confidence':0.8})
+        self.assertGreater(r['return'], 0)
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+#
+# Unit tests of constraints between choices in choice module
+#
+
+import unittest
+
+import ck_mock
+
+choice=ck_mock.load_module('choice')
+
+class TestConstraints(unittest.TestCase):
+    desc={'##a':{'choice':['-a1','-a2']},
+          '##b':{'choice':['-b'], 'requires':['##a']},
+          '##c':{'choice':['-c'], 'conflicts':['##a=-a2']},
+          '##d':{'choice':['-d'], 'only_with':{'##a':['-a1']}}}
+    order=[['##a','##b','##c','##d']]
+
+    def check(self, vec):
+        r=choice.check_constraints({'choices_desc':self.desc, 'choices_order':self.order, 'choices_current':[vec]})
+        self.assertEqual(r['return'], 0)
+        return r
+
+    def test_valid(self):
+        self.assertEqual(self.check(['-a1','-b','-c','-d'])['valid'], 'yes')
+        self.assertEqual(self.check(['','','-c',''])['valid'], 'yes')
+
+    def test_requires(self):
+        r=self.check(['','-b','',''])
+        self.assertEqual(r['valid'], 'no')
+        self.assertIn('requires', r['reason'])
+
+    def test_conflicts(self):
+        self.assertEqual(self.check(['-a2','','-c',''])['valid'], 'no')
+        self.assertEqual(self.check(['-a1','','-c',''])['valid'], 'yes')
+
+    def test_only_with(self):
+        self.assertEqual(self.check(['-a2','','','-d'])['valid'], 'no')
+
+    def test_value_from_pipeline(self):
+        r=choice.check_constraints({'choices_desc':self.desc, 'choices_order':[['##b']], 'choices_current':[['-b']],
+                                    'pipeline':{'a':'-a1'}})
+        self.assertEqual(r['valid'], 'yes')
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+#
+# Unit tests of copying of pipelines in pipeline module
+#
+
+import unittest
+
+import ck_mock
+
+pipeline=ck_mock.load_module('pipeline')
+
+class TestCopyPipeline(unittest.TestCase):
+    def test_full_copy(self):
+        p={'choices_desc':{'a':{'choice':[1,2]}}, 'deps':{'compiler':{'dict':{'x':1}}}}
+        r=pipeline.copy_pipeline({'pipeline':p, 'shared_keys':{}})
+        pp=r['pipeline']
+        self.assertEqual(pp, p)
+        self.assertIsNot(pp['choices_desc']['a'], p['choices_desc']['a'])
+        self.assertIsNot(pp['deps']['compiler']['dict'], p['deps']['compiler']['dict'])
+
+    def test_shared_keys(self):
+        p={'choices_desc':{'a':{'choice':[1,2]}}, 'deps':{'compiler':{'dict':{'x':1}}}}
+        r=pipeline.copy_pipeline({'pipeline':p, 'shared_keys':{'choices_desc':1}})
+        pp=r['pipeline']
+        self.assertEqual(pp, p)
+        self.assertIsNot(pp['choices_desc'], p['choices_desc'])
+        self.assertIs(pp['choices_desc']['a'], p['choices_desc']['a'])
+        self.assertIsNot(pp['deps']['compiler']['dict'], p['deps']['compiler']['dict'])
+
+    def test_default_from_meta(self):
+        p={'choices_desc':{'a':{}}, 'deps':{'compiler':{}}}
+        r=pipeline.copy_pipeline({'pipeline':p})
+        pp=r['pipeline']
+        self.assertIs(pp['choices_desc']['a'], p['choices_desc']['a'])
+        self.assertIsNot(pp['deps']['compiler'], p['deps']['compiler'])
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,23 @@
+#
+# Unit tests of NSGA-II autotuner plugin
+#
+
+import unittest
+
+import ck_mock
+
+nsga2=ck_mock.load('script/autotuner.nsga2/nsga2.py', 'nsga2')
+
+class TestNonDominatedSort(unittest.TestCase):
+    def test_fronts(self):
+        pop=[{'objectives':x} for x in [[1,5], [2,2], [5,1], [3,3], [4,4], None]]
+        fronts=nsga2.non_dominated_sort(pop)
+        self.assertEqual([sorted(f) for f in fronts], [[0,1,2], [3], [4], [5]])
+        self.assertEqual([p['rank'] for p in pop], [0,0,0,1,2,3])
+
+    def test_equal_points(self):
+        pop=[{'objectives':[1,1]}, {'objectives':[1,1]}]
+        self.assertEqual(nsga2.non_dominated_sort(pop), [[0,1]])
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+#
+# Unit tests of parallel evaluation of candidates in pipeline module
+#
+
+import os
+import time
+import unittest
+
+import ck_mock
+
+pipeline=ck_mock.load_module('pipeline')
+
+run_repetitions=pipeline.run_repetitions
+
+def fake_run_repetitions(i):
+    time.sleep(i.get('sleep',0))
+    if i.get('fail','')=='yes':
+       return {'return':1, 'error':'candidate '+str(i['id'])+' failed'}
+    return {'return':0, 'id':i['id'], 'pid':os.getpid()}
+
+@unittest.skipIf(os.name!='posix', 'parallel evaluation needs fork')
+class TestEvaluateCandidates(unittest.TestCase):
+    def setUp(self):
+        pipeline.run_repetitions=fake_run_repetitions
+
+    def tearDown(self):
+        pipeline.run_repetitions=run_repetitions
+
+    def test_sequential(self):
+        r=pipeline.evaluate_candidates({'candidates':[{'id':0}, {'id':1}], 'workers':1})
+        self.assertEqual(r['return'], 0)
+        self.assertEqual([x['id'] for x in r['results']], [0,1])
+        self.assertEqual([x['pid'] for x in r['results']], [os.getpid()]*2)
+
+    def test_parallel_keeps_order(self):
+        # later candidates finish first
+        cands=[{'id':k, 'sleep':0.05*(5-k)} for k in range(0,5)]
+        r=pipeline.evaluate_candidates({'candidates':cands, 'workers':2})
+        self.assertEqual(r['return'], 0)
+        self.assertEqual([x['id'] for x in r['results']], list(range(0,5)))
+        self.assertNotIn(os.getpid(), [x['pid'] for x in r['results']])
+
+    def test_error_stops_workers(self):
+        t=time.time()
+        r=pipeline.evaluate_candidates({'candidates':[{'id':0, 'sleep':30}, {'id':1, 'fail':'yes'}], 'workers':2})
+        self.assertEqual(r['return'], 1)
+        self.assertIn('candidate 1', r['error'])
+        self.assertLess(time.time()-t, 10)
+
+if __name__=='__main__':
+    unittest.main()
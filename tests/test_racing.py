@@ -0,0 +1,60 @@
+#
+# Unit tests of racing of candidates in pipeline module
+#
+
+import unittest
+
+import ck_mock
+
+pipeline=ck_mock.load_module('pipeline')
+
+key='##characteristics#run#execution_time'
+
+def chars(vals):
+    return [{'run':{'execution_time':v}} for v in vals]
+
+class TestRace(unittest.TestCase):
+    def race(self, **kw):
+        x={'key':key, 'best_mean':None, 'best_half_width':None}
+        x.update(kw)
+        return x
+
+    def test_no_best(self):
+        r=pipeline.check_race({'characteristics_list':chars([10.0, 10.0]), 'race':self.race()})
+        self.assertEqual(r['return'], 0)
+        self.assertEqual(r['stop'], '')
+
+    def test_single_sample_never_stops(self):
+        # race_after=1 is raised to 2 (no confidence interval for one sample)
+        r=pipeline.check_race({'characteristics_list':chars([100.0]),
+                               'race':self.race(best_mean=1.0, best_half_width=0.0, after=1)})
+        self.assertEqual(r['stop'], '')
+
+    def test_clearly_worse_stops(self):
+        r=pipeline.check_race({'characteristics_list':chars([10.0, 10.0, 10.0]),
+                               'race':self.race(best_mean=5.0, best_half_width=0.1)})
+        self.assertEqual(r['stop'], 'yes')
+        self.assertAlmostEqual(r['mean'], 10.0)
+
+    def test_overlapping_intervals_continue(self):
+        r=pipeline.check_race({'characteristics_list':chars([5.0, 6.0]),
+                               'race':self.race(best_mean=5.0, best_half_width=0.5)})
+        self.assertEqual(r['stop'], '')
+
+    def test_reverse(self):
+        r=pipeline.check_race({'characteristics_list':chars([1.0, 1.0]),
+                               'race':self.race(best_mean=10.0, best_half_width=0.0, reverse='yes')})
+        self.assertEqual(r['stop'], 'yes')
+
+    def test_update_race(self):
+        race=self.race()
+        r=pipeline.update_race({'characteristics_list':chars([4.0, 6.0]), 'race':race})
+        self.assertEqual(r['updated'], 'yes')
+        self.assertAlmostEqual(race['best_mean'], 5.0)
+
+        r=pipeline.update_race({'characteristics_list':chars([7.0, 7.0]), 'race':race})
+        self.assertEqual(r['updated'], '')
+        self.assertAlmostEqual(race['best_mean'], 5.0)
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+#
+# Unit tests of surrogate-model autotuner plugin
+#
+
+import unittest
+
+import ck_mock
+
+surrogate=ck_mock.load('script/autotuner.surrogate/surrogate.py', 'surrogate')
+common=ck_mock.load('script/autotuner.common/common.py', 'common')
+
+try:
+   import numpy
+except ImportError:
+   numpy=None
+
+@unittest.skipIf(numpy==None, 'NumPy is not installed')
+class TestExpectedImprovement(unittest.TestCase):
+    def test_prefers_promising_region(self):
+        X=numpy.array([[0.0], [0.5], [1.0]])
+        Y=numpy.array([3.0, 1.0, 3.0])
+        C=numpy.array([[0.45], [0.95]])
+        ei=surrogate.expected_improvement(X, Y, C, 0.3, 0.01, 0.01, numpy)
+        self.assertEqual(len(ei), 2)
+        self.assertTrue((ei>=0).all())
+        self.assertGreater(ei[0], ei[1])
+
+    def test_constant_observations(self):
+        X=numpy.array([[0.0], [1.0]])
+        Y=numpy.array([2.0, 2.0])
+        ei=surrogate.expected_improvement(X, Y, numpy.array([[0.5]]), 0.3, 0.01, 0.01, numpy)
+        self.assertTrue(numpy.isfinite(ei).all())
+
+class TestDimension(unittest.TestCase):
+    def test_range(self):
+        r=surrogate.get_dimension('##a', {'explore_start':1, 'explore_stop':8, 'explore_step':1}, common)
+        self.assertEqual(r['return'], 0)
+        self.assertEqual((r['dimension']['type'], r['dimension']['step']), ('numeric', 1))
+
+    def test_zero_step(self):
+        r=surrogate.get_dimension('##a', {'explore_start':1, 'explore_stop':8, 'explore_step':0}, common)
+        self.assertGreater(r['return'], 0)
+        self.assertIn('##a', r['error'])
+
+    def test_values(self):
+        r=surrogate.get_dimension('##a', {'choice':[1,2,4]}, common)
+        self.assertEqual(r['dimension'], {'type':'ordered', 'values':[1,2,4]})
+
+        r=surrogate.get_dimension('##a', {'choice':['-a','-b']}, common)
+        self.assertEqual(r['dimension']['type'], 'categorical')
+
+if __name__=='__main__':
+    unittest.main()
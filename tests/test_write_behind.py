@@ -0,0 +1,62 @@
+#
+# Unit tests of write-behind recording of experiments in pipeline module (forked writer process)
+#
+
+import os
+import unittest
+
+import ck_mock
+
+pipeline=ck_mock.load_module('pipeline')
+
+class Kernel(ck_mock.Kernel):
+    def gen_uid(self, i):
+        return {'return':0, 'data_uid':'0123456789abcdef'}
+
+    def access(self, i):
+        d=i['dict']
+        if d.get('fail','')=='yes':
+           return {'return':1, 'error':'can\'t record'}
+        return {'return':0, 'recorded_uid':'u'+str(d['n']), 'dict_flat':{'##n#min':d['n'], '##pid':os.getpid()}}
+
+@unittest.skipIf(os.name!='posix', 'write-behind recording needs fork')
+class TestWriteBehind(unittest.TestCase):
+    def setUp(self):
+        pipeline.ck=Kernel()
+
+    def tearDown(self):
+        pipeline.ck=ck_mock.Kernel()
+
+    def test_records_copies_in_writer(self):
+        r=pipeline.start_write_behind({'batch':2})
+        wid=r['id']
+        self.assertNotEqual(wid, '')
+
+        # The same dict is updated by the main loop after queuing
+        d={'n':0}
+        for n in range(0, 5):
+            d['n']=n
+            r=pipeline.add_to_write_behind({'id':wid, 'input':{'dict':d}})
+            self.assertEqual(r['return'], 0)
+            self.assertLessEqual(r['queued'], 2)
+
+        r=pipeline.stop_write_behind({'id':wid})
+        self.assertEqual(r['return'], 0)
+        self.assertEqual(r['recorded'], 5)
+        self.assertEqual(r['recorded_uid'], 'u4')
+        self.assertEqual(r['dict_flat']['##n#min'], 4)
+        self.assertNotEqual(r['dict_flat']['##pid'], os.getpid())
+
+    def test_writer_error(self):
+        wid=pipeline.start_write_behind({})['id']
+
+        pipeline.add_to_write_behind({'id':wid, 'input':{'dict':{'fail':'yes'}}})
+
+        r=pipeline.collect_write_behind({'id':wid, 'wait':0})
+        self.assertGreater(r['return'], 0)
+
+        r=pipeline.stop_write_behind({'id':wid})
+        self.assertNotIn(wid, pipeline.write_behind)
+
+if __name__=='__main__':
+    unittest.main()